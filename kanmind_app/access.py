@@ -0,0 +1,178 @@
+"""
+Answers "which boards can this user access" for the permission classes and views.
+
+A user can access a board if they own it or are one of its members, and the
+board is not waiting to be deleted by a background job.
+
+accessible_board_ids() returns the ids of all those boards, so list views
+can filter on a plain id list instead of a subquery with an OR across the
+members join. can_access_board() checks a single board with a single EXISTS
+query. Both memoize their result on the request.
+
+Both only cache across requests with a cache shared by all processes (see
+shared_cache()): accessible_board_ids() then keeps the ids for
+KANMIND_ACCESSIBLE_BOARDS_CACHE_TIMEOUT seconds and can_access_board()
+answers from them, and, if KANMIND_BOARD_ACCESS_CACHE_TIMEOUT is set, caches
+single checks. A per-process cache is only invalidated in the process that
+made the change, so others would keep granting access that was revoked;
+without a shared cache every request queries the primary.
+
+The signal handlers in kanmind_app.signals invalidate both caches when the
+members or the owner of a board change, or a board is deleted, and again
+once the change has committed, so a read that refilled the cache with the
+data from before the commit does not survive it. Access is
+always checked on the primary database, never on a read replica, so a
+lagging replica cannot restore access that was just revoked.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Board
+from .replicas import primary_reads
+
+
+def can_access_board(request, board):
+    """
+    Returns True if the requesting user owns or is a member of the board.
+    'board' can be a Board instance or a board id.
+    """
+    user = request.user
+    if not user or not user.is_authenticated:
+        return False
+    if isinstance(board, Board):
+        if board.owner_id == user.id and not board.pending_deletion:
+            return True
+        board_id = board.pk
+    else:
+        board_id = int(board)
+
+    memo = request.__dict__.setdefault('_board_access', {})
+    if board_id not in memo:
+        board_ids = request.__dict__.get('_accessible_board_ids')
+        if board_ids is None and shared_cache():
+            board_ids = cache.get(_accessible_boards_key(user.id))
+        if board_ids is not None:
+            memo[board_id] = board_id in board_ids
+        else:
+            memo[board_id] = _cached_board_access(user.id, board_id)
+    return memo[board_id]
+
+
+# Cache backends whose entries only live in the process that wrote them.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache():
+    """
+    Returns True if all processes see the same default cache, so an
+    invalidation in one of them reaches all. KANMIND_SHARED_CACHE overrides
+    the guess from the cache backend.
+    """
+    shared = getattr(settings, 'KANMIND_SHARED_CACHE', None)
+    if shared is None:
+        shared = settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+    return shared
+
+
+def accessible_board_ids(user, request=None):
+    """
+    Returns the set of ids of the boards the user owns or is a member of,
+    from the cache if it is shared, otherwise from the primary. With a
+    request, the result is also memoized on it.
+    """
+    if request is not None:
+        if '_accessible_board_ids' not in request.__dict__:
+            request._accessible_board_ids = accessible_board_ids(user)
+        return request._accessible_board_ids
+
+    shared = shared_cache()
+    key = _accessible_boards_key(user.id)
+    board_ids = cache.get(key) if shared else None
+    if board_ids is None:
+        with primary_reads():
+            board_ids = set(Board.objects.accessible_to(user).values_list('pk', flat=True))
+        timeout = getattr(settings, 'KANMIND_ACCESSIBLE_BOARDS_CACHE_TIMEOUT', 300)
+        if shared and timeout:
+            cache.set(key, board_ids, timeout)
+    return board_ids
+
+
+def invalidate_accessible_boards(user_ids):
+    """Drops the cached accessible board ids of the given users, now and after the commit."""
+    keys = [_accessible_boards_key(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _accessible_boards_key(user_id):
+    return f'accessible-boards:{user_id}'
+
+
+def _cached_board_access(user_id, board_id):
+    timeout = getattr(settings, 'KANMIND_BOARD_ACCESS_CACHE_TIMEOUT', None)
+    if not timeout or not shared_cache():
+        return _query_board_access(user_id, board_id)
+
+    key = f'board-access:{board_id}:{_board_version(board_id)}:{user_id}'
+    allowed = cache.get(key)
+    if allowed is None:
+        allowed = _query_board_access(user_id, board_id)
+        cache.set(key, allowed, timeout)
+    return allowed
+
+
+def check_board_access_now(user, board_id):
+    """
+    Checks access with a query on the primary, bypassing the request memo and
+    the caches, for connections that outlive a request such as the change feed.
+    """
+    return _query_board_access(user.id, board_id)
+
+
+def _query_board_access(user_id, board_id):
+    """Single EXISTS query using the board primary key and the unique (board, user) member index."""
+    is_member = Board.members.through.objects.filter(board_id=board_id, user_id=user_id)
+    with primary_reads():
+        return Board.objects.filter(
+            Q(owner_id=user_id) | Q(pk__in=is_member.values('board_id')),
+            pk=board_id,
+            pending_deletion=False,
+        ).exists()
+
+
+def _board_version_key(board_id):
+    return f'board-access-version:{board_id}'
+
+
+def _board_version(board_id):
+    """
+    Cached access results are keyed by a per-board version, so a whole board
+    can be invalidated without knowing which users were cached for it.
+    """
+    key = _board_version_key(board_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.set(key, version, None)
+    return version
+
+
+def invalidate_board_access(board_ids):
+    """Drops the cached access results of the given boards, now and after the commit."""
+    if not getattr(settings, 'KANMIND_BOARD_ACCESS_CACHE_TIMEOUT', None):
+        return
+    keys = [_board_version_key(board_id) for board_id in board_ids]
+
+    def bump():
+        version = time.time_ns()
+        cache.set_many({key: version for key in keys}, None)
+
+    bump()
+    transaction.on_commit(bump)
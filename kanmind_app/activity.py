@@ -0,0 +1,146 @@
+"""
+Buffered writer of the board activity log (ActivityEvent).
+
+The signal handlers in kanmind_app.signals call record() for every task,
+comment and membership change. An event is only kept once its change has
+committed: record() hands it to transaction.on_commit, so a rolled back
+change leaves no trace. During a request ActivityMiddleware collects the
+committed events and writes them with one bulk insert after the response
+has been sent to the client. Outside of requests (management commands, the
+shell) events are written as soon as their transaction commits.
+
+The actor of an event is the authenticated user of the current request.
+"""
+import logging
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ActivityEvent
+
+logger = logging.getLogger('kanmind.activity')
+
+_request_buffer = ContextVar('kanmind_activity_buffer', default=None)
+
+# Longer text values of task changes are cut to this many characters.
+MAX_VALUE_LENGTH = 200
+
+
+class RequestBuffer:
+    """The committed events of one request."""
+
+    def __init__(self, request):
+        self.request = request
+        self.events = []
+
+    def actor_id(self):
+        # DRF sets the user of the underlying request once it authenticated it.
+        user = getattr(self.request, 'user', None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+    def flush(self):
+        events, self.events = self.events, []
+        try:
+            write(events)
+        except Exception:
+            # The response is already sent, so there is nobody to report the error to.
+            logger.exception('Could not write %d activity event(s).', len(events))
+
+
+def record(board_id, verb, task_id=None, data=None):
+    """Adds an event to the activity log of the board once the current transaction commits."""
+    buffer = _request_buffer.get()
+    event = ActivityEvent(
+        board_id=board_id,
+        task_id=task_id,
+        actor_id=buffer.actor_id() if buffer is not None else None,
+        verb=verb,
+        data=data or {},
+        created_at=timezone.now(),
+    )
+    transaction.on_commit(partial(_committed, event))
+
+
+def record_task_changes(task, previous_board_id=None):
+    """Records the changes of the tracked fields of a saved task, on both boards if it moved."""
+    changes = {
+        name: [_truncate(old), _truncate(new)] for name, (old, new) in task.tracked_changes().items()
+    }
+    if not changes:
+        return
+    for board_id in {task.board_id, previous_board_id} - {None}:
+        record(board_id, ActivityEvent.Verb.TASK_UPDATED, task.pk, {'changes': changes})
+
+
+def _truncate(value):
+    if isinstance(value, str) and len(value) > MAX_VALUE_LENGTH:
+        return value[:MAX_VALUE_LENGTH - 3] + '...'
+    return value
+
+
+def _committed(event):
+    buffer = _request_buffer.get()
+    if buffer is None:
+        write([event])
+    else:
+        buffer.events.append(event)
+
+
+def write(events, batch_size=500):
+    ActivityEvent.objects.bulk_create(events, batch_size=batch_size)
+
+
+class ActivityMiddleware:
+    """
+    Collects the committed events of a request and writes them when the
+    response is closed. Works in both the sync and the async handler, so
+    ASGI requests do not have to be passed through a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        buffer = RequestBuffer(request)
+        token = _request_buffer.set(buffer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_buffer.reset(token)
+        return self.flush_on_close(buffer, response)
+
+    async def __acall__(self, request):
+        buffer = RequestBuffer(request)
+        token = _request_buffer.set(buffer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_buffer.reset(token)
+        return self.flush_on_close(buffer, response)
+
+    def flush_on_close(self, buffer, response):
+        """
+        Writes the buffered events when the server closes the response,
+        after the body was sent. Under ASGI the buffer only gets the events
+        of sync views once they ran, so it is always hooked up.
+        """
+        close = response.close
+
+        def flush_and_close():
+            try:
+                if buffer.events:
+                    buffer.flush()
+            finally:
+                close()
+
+        response.close = flush_and_close
+        return response
@@ -1,8 +1,13 @@
 from django.contrib import admin
-from .models import Board, Task, Comment
+from .models import ActivityEvent, Board, BoardStats, DueDigest, Job, Task, Comment, Tombstone
 # Register your models here.
 
 class CustomerAdmin(admin.ModelAdmin):
     admin.site.register(Board)
     admin.site.register(Task)
-    admin.site.register(Comment)
\ No newline at end of file
+    admin.site.register(Comment)
+    admin.site.register(BoardStats)
+    admin.site.register(Tombstone)
+    admin.site.register(ActivityEvent)
+    admin.site.register(Job)
+    admin.site.register(DueDigest)
\ No newline at end of file
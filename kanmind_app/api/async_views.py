@@ -0,0 +1,163 @@
+"""
+Async implementations of the read-heavy endpoints, served under /api/async/.
+
+They return the same payloads as the DRF views of the same name, but query
+with Django's async ORM, so under ASGI a request waiting on the database
+does not hold a worker thread. Serialization runs on prefetched or joined
+data only; any lazy query would raise SynchronousOnlyOperation instead of
+silently blocking the event loop. The sync views remain the default.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+
+from user_auth_app.api.authentication import CachedTokenAuthentication
+from ..access import accessible_board_ids, can_access_board, check_board_access_now
+from ..models import Board, Comment, Task
+from ..replicas import reads_from_replica
+from .serializers import BoardDetailSerializer, BoardSerializer, CommentSerializer, TaskSerializer
+from .streaming import stream_board_changes
+
+
+def authenticate_token(request, allow_query_token=False):
+    """Returns the user of the request's token, or None if it is missing or invalid."""
+    authenticator = CachedTokenAuthentication()
+    try:
+        key = request.GET.get('token') if allow_query_token else None
+        result = authenticator.authenticate_credentials(key) if key else authenticator.authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def token_authenticated(view=None, *, allow_query_token=False):
+    """
+    Authenticates the request with its token and sets request.user, or returns 401.
+    With allow_query_token, the token may also be passed as 'token' query parameter.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            user = await sync_to_async(authenticate_token)(request, allow_query_token)
+            if user is None:
+                return error_response(401, 'Authentication credentials were not provided.')
+            request.user = user
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator(view) if view is not None else decorator
+
+
+def error_response(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def json_response(data):
+    return JsonResponse(data, encoder=JSONEncoder, safe=False)
+
+
+async def check_board_access(request, board_id):
+    return await sync_to_async(can_access_board)(request, board_id)
+
+
+@reads_from_replica
+@token_authenticated
+async def board_list(request):
+    """Async version of BoardListCreateView (GET)."""
+    board_ids = await sync_to_async(accessible_board_ids)(request.user)
+    boards = [board async for board in Board.objects.filter(pk__in=board_ids).with_counts().aiterator()]
+    return json_response(BoardSerializer(boards, many=True).data)
+
+
+@token_authenticated
+async def board_detail(request, pk):
+    """Async version of BoardDetailView (GET) with all tasks."""
+    if not await Board.objects.filter(pk=pk).aexists():
+        return error_response(404, 'No Board matches the given query.')
+    if not await check_board_access(request, pk):
+        return error_response(403, 'You do not have permission to perform this action.')
+
+    board = await Board.objects.prefetch_related(
+        'members', Prefetch('tasks', queryset=Task.objects.for_api().order_by('id'))
+    ).aget(pk=pk)
+    return json_response(BoardDetailSerializer(board).data)
+
+
+async def task_list_response(request, queryset):
+    tasks = [task async for task in queryset.for_api().aiterator()]
+    return json_response(TaskSerializer(tasks, many=True, context={'request': request}).data)
+
+
+@reads_from_replica
+@token_authenticated
+async def task_list(request):
+    """Async version of TaskListCreateView (GET)."""
+    board_ids = await sync_to_async(accessible_board_ids)(request.user)
+    return await task_list_response(request, Task.objects.filter(board_id__in=board_ids))
+
+
+@reads_from_replica
+@token_authenticated
+async def assigned_to_me_tasks(request):
+    """Async version of AssignedToMeTasksView."""
+    return await task_list_response(request, Task.objects.filter(assignee=request.user))
+
+
+@reads_from_replica
+@token_authenticated
+async def reviewing_tasks(request):
+    """Async version of ReviewingTasksView."""
+    return await task_list_response(request, Task.objects.filter(reviewer=request.user))
+
+
+@reads_from_replica
+@token_authenticated
+async def comment_list(request, task_pk):
+    """Async version of the comment list of CommentViewSet."""
+    try:
+        task = await Task.objects.only('board_id').aget(pk=task_pk)
+    except Task.DoesNotExist:
+        return error_response(404, 'No Task matches the given query.')
+    if not await check_board_access(request, task.board_id):
+        return error_response(403, 'You do not have permission to perform this action.')
+
+    comments = Comment.objects.filter(task_id=task_pk).select_related('author').order_by('created_at', 'id')
+    comments = [comment async for comment in comments.aiterator()]
+    return json_response(CommentSerializer(comments, many=True).data)
+
+
+@token_authenticated(allow_query_token=True)
+async def board_change_feed(request, pk):
+    """
+    Streams the changes of a board as Server-Sent Events: task, comment,
+    membership and board events with small JSON payloads, so clients can
+    update their copy of the board instead of re-downloading it.
+
+    Authenticates with the 'Authorization: Token ...' header, or a 'token'
+    query parameter for EventSource clients, which cannot set headers.
+    Access is checked again while streaming, and the stream ends when the
+    user loses it.
+
+    The feed needs an ASGI server: a WSGI worker would be blocked for as
+    long as the client stays connected, so it answers 501 under WSGI.
+    """
+    if not isinstance(request, ASGIRequest):
+        return error_response(501, 'The change feed needs the app to be served with ASGI.')
+    if not await check_board_access(request, pk):
+        return error_response(403, 'You do not have permission to perform this action.')
+
+    user = request.user
+
+    async def has_access():
+        return await sync_to_async(check_board_access_now)(user, pk)
+
+    stream = stream_board_changes(pk, has_access=has_access)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
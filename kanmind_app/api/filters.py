@@ -0,0 +1,143 @@
+from datetime import date
+
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from ..models import Task
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _parse_ids(name, value):
+    try:
+        return [int(item) for item in _split(value)]
+    except ValueError:
+        raise ValidationError({name: 'Expected a comma-separated list of ids.'})
+
+
+def _parse_choices(name, value, choices):
+    values = _split(value)
+    unknown = [item for item in values if item not in choices.values]
+    if unknown:
+        raise ValidationError({name: f"Unknown value(s): {', '.join(unknown)}."})
+    return values
+
+
+def _parse_date(name, value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: 'Expected a date in YYYY-MM-DD format.'})
+
+
+def _parse_user(name, value):
+    """A user id, or 'none' for tasks without one."""
+    if value == 'none':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: "Expected a user id or 'none'."})
+
+
+class TaskFilter(BaseFilterBackend):
+    """
+    Filters task lists by query parameters. All of them are optional and combined with AND:
+
+    - status, priority: comma-separated values, e.g. ?status=to-do,review
+    - board: comma-separated board ids
+    - due_date_after, due_date_before: inclusive YYYY-MM-DD bounds
+    - overdue=true: due before today and not done
+    - assignee, reviewer: a user id, or 'none' for tasks without one
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        if 'status' in params:
+            queryset = queryset.filter(status__in=_parse_choices('status', params['status'], Task.Status))
+        if 'priority' in params:
+            queryset = queryset.filter(priority__in=_parse_choices('priority', params['priority'], Task.Priority))
+        if 'board' in params:
+            queryset = queryset.filter(board_id__in=_parse_ids('board', params['board']))
+        if 'due_date_after' in params:
+            queryset = queryset.filter(due_date__gte=_parse_date('due_date_after', params['due_date_after']))
+        if 'due_date_before' in params:
+            queryset = queryset.filter(due_date__lte=_parse_date('due_date_before', params['due_date_before']))
+        if params.get('overdue') == 'true':
+            queryset = queryset.filter(due_date__lt=timezone.localdate()).exclude(status=Task.Status.DONE)
+        for name in ('assignee', 'reviewer'):
+            if name in params:
+                user_id = _parse_user(name, params[name])
+                queryset = queryset.filter(**{f'{name}_id': user_id} if user_id is not None else {f'{name}__isnull': True})
+        return queryset
+
+
+class TaskOrdering(BaseFilterBackend):
+    """
+    Orders task lists by ?ordering=field[,field...], '-' for descending, with
+    the id as tie-breaker. Priority is ordered by rank (low < medium < high).
+
+    Paginated lists are ordered by a single key of the cursor, so there only
+    created_at, updated_at and title can be used; the choice is handed to
+    KeysetCursorPagination through the view's cursor_ordering.
+    """
+    fields = ('created_at', 'updated_at', 'due_date', 'priority', 'title')
+    cursor_fields = ('created_at', 'updated_at', 'title')
+    priority_rank = Case(
+        When(priority=Task.Priority.LOW, then=Value(0)),
+        When(priority=Task.Priority.MEDIUM, then=Value(1)),
+        When(priority=Task.Priority.HIGH, then=Value(2)),
+        output_field=IntegerField(),
+    )
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = _split(request.query_params.get('ordering', ''))
+        if not ordering:
+            return queryset
+        unknown = [item for item in ordering if item.lstrip('-') not in self.fields]
+        if unknown:
+            raise ValidationError({'ordering': f"Unknown field(s): {', '.join(unknown)}."})
+
+        params = request.query_params
+        if 'page_size' in params or 'cursor' in params:
+            if len(ordering) > 1 or ordering[0].lstrip('-') not in self.cursor_fields:
+                raise ValidationError({
+                    'ordering': f"Paginated lists can only be ordered by one of: {', '.join(self.cursor_fields)}."
+                })
+            sign = '-' if ordering[0].startswith('-') else ''
+            view.cursor_ordering = (ordering[0], f'{sign}id')
+            return queryset
+
+        if any(item.lstrip('-') == 'priority' for item in ordering):
+            queryset = queryset.annotate(priority_rank=self.priority_rank)
+            ordering = [item.replace('priority', 'priority_rank') for item in ordering]
+        return queryset.order_by(*ordering, 'id')
+
+
+class SparseFieldsMixin:
+    """
+    Lets list views return only the TaskSerializer fields named in ?fields=.
+    The queryset loads only the columns and joins those fields need, see
+    TaskQuerySet.for_api().
+    """
+
+    def get_requested_fields(self):
+        """Returns the requested field names, or None for all fields."""
+        value = self.request.query_params.get('fields')
+        if self.request.method != 'GET' or not value:
+            return None
+        fields = _split(value)
+        readable = [name for name, field in self.get_serializer_class()().fields.items() if not field.write_only]
+        unknown = [name for name in fields if name not in readable]
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}."})
+        return fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_requested_fields()
+        return context
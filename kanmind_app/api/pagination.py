@@ -0,0 +1,130 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over a stable ordering, by default (created_at, id).
+
+    Each page is fetched with a WHERE clause on the last row of the previous
+    page instead of an OFFSET, so the cost of a page does not depend on how
+    deep into the list it is. Views can change the ordering by setting
+    'cursor_ordering'; the last field must be unique.
+
+    Pagination is opt-in: lists are only paginated when the client sends
+    'page_size' or 'cursor', so existing clients keep receiving plain lists.
+    Subclasses for new endpoints can make it mandatory with optional = False.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 200
+    ordering = ('created_at', 'id')
+    optional = True
+
+    def paginates(self, request):
+        """True if the list of the request is split into pages."""
+        params = request.query_params
+        return not self.optional or self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.paginates(request):
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position))
+
+        # Fetch one extra row to know if there is a next page.
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        """Returns the requested page size, capped at max_page_size."""
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_keyset_filter(self, position):
+        """
+        Builds the 'after this row' condition for the ordering, e.g. for
+        (created_at, id): created_at > x OR (created_at = x AND id > y).
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.get_field_names(), position):
+            lookup = 'lt' if self.is_descending() else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def get_field_names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def is_descending(self):
+        return self.ordering[0].startswith('-')
+
+    def encode_cursor(self, instance):
+        position = [getattr(instance, field) for field in self.get_field_names()]
+        data = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in position])
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound('Invalid cursor')
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+        return replace_query_param(url, self.page_size_query_param, self.page_size)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class ActivityPagination(KeysetCursorPagination):
+    """Pages of the activity log, always paginated and newest first."""
+    ordering = ('-created_at', '-id')
+    optional = False
@@ -1,11 +1,12 @@
 from rest_framework import permissions
+from ..access import can_access_board
 
 class IsOwnerOrMember(permissions.BasePermission):
     """
     Allows access only to the board's owner or its members.
     """
     def has_object_permission(self, request, view, obj):
-        return obj.owner == request.user or request.user in obj.members.all()
+        return can_access_board(request, obj)
 
 class IsTaskOnAccessibleBoard(permissions.BasePermission):
     """
@@ -13,15 +14,14 @@ class IsTaskOnAccessibleBoard(permissions.BasePermission):
     or a member of the board that the task belongs to.
     """
     def has_object_permission(self, request, view, obj):
-        board = obj.board
-        return board.owner == request.user or request.user in board.members.all()
+        return can_access_board(request, obj.board_id)
     
 class IsOwner(permissions.BasePermission):
     """
     Allows access only to the owner of the object.
     """
     def has_object_permission(self, request, view, obj):
-        return obj.owner == request.user
+        return obj.owner_id == request.user.id
     
 
 class IsAuthorOrReadOnly(permissions.BasePermission):
@@ -34,7 +34,7 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         # Write permissions are only allowed to the author of the object.
-        return obj.author == request.user
+        return obj.author_id == request.user.id
     
 class CanDeleteTask(permissions.BasePermission):
     """
@@ -42,7 +42,7 @@ class CanDeleteTask(permissions.BasePermission):
     or if the user is the owner of the board the task is on.
     """
     def has_object_permission(self, request, view, obj):
-        return obj.created_by == request.user or obj.board.owner == request.user
+        return obj.created_by_id == request.user.id or obj.board.owner_id == request.user.id
     
 class CanAccessTaskComments(permissions.BasePermission):
     """
@@ -58,6 +58,4 @@ class CanAccessTaskComments(permissions.BasePermission):
             # Fails safely if the view doesn't have the required method.
             return False
 
-        user = request.user
-        board = task.board
-        return board.owner == user or user in board.members.all()
\ No newline at end of file
+        return can_access_board(request, task.board)
\ No newline at end of file
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from ..models import Board, Task, Comment
+from ..models import ActivityEvent, Board, DueDigest, Job, Task, Comment
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -22,6 +22,55 @@ class UserDetailSerializer(serializers.ModelSerializer):
         return f"{obj.first_name} {obj.last_name}"
 
 
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Looks the object up in the objects TaskListSerializer loaded for all
+    items, instead of with one query per item. Outside of it, or for values
+    that were not loaded, it works like PrimaryKeyRelatedField.
+    """
+
+    def to_internal_value(self, data):
+        loaded = getattr(self.root, 'preloaded', {}).get(self.get_queryset().model)
+        if loaded is None or isinstance(data, bool) or not isinstance(data, int):
+            return super().to_internal_value(data)
+        if data not in loaded:
+            self.fail('does_not_exist', pk_value=data)
+        return loaded[data]
+
+
+class TaskListSerializer(serializers.ListSerializer):
+    """
+    Validates many tasks with one query per related model: the boards and
+    users the items refer to are loaded up front. If 'instance' is a list
+    of tasks, item i is validated as an update of task i.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.preloaded = self.preload(data)
+        if isinstance(self.instance, list):
+            self.instances = iter(self.instance)
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        if isinstance(self.instance, list):
+            self.child.instance = next(self.instances)
+        return super().run_child_validation(data)
+
+    def preload(self, data):
+        """Returns {model: {pk: object}} for the integer pks in the related fields of the items."""
+        pks = {}
+        for name, field in self.child.fields.items():
+            if isinstance(field, PreloadedPrimaryKeyRelatedField) and not field.read_only:
+                queryset = field.get_queryset()
+                model_pks = pks.setdefault(queryset.model, (queryset, set()))[1]
+                model_pks.update(
+                    item[name] for item in data
+                    if isinstance(item, dict) and isinstance(item.get(name), int) and not isinstance(item[name], bool)
+                )
+        return {model: queryset.in_bulk(model_pks) for model, (queryset, model_pks) in pks.items()}
+
+
 class TaskSerializer(serializers.ModelSerializer):
     """Serializer for the Task model, handles both read and write operations."""
     # Read-only fields to display nested user data.
@@ -30,13 +79,13 @@ class TaskSerializer(serializers.ModelSerializer):
     comments_count = serializers.IntegerField(read_only=True)
 
     # Field to select the board when creating/updating a task.
-    board = serializers.PrimaryKeyRelatedField(
+    board = PreloadedPrimaryKeyRelatedField(
         queryset=Board.objects.all(),
     )
 
     # Write-only fields to accept user IDs for assigning tasks.
     # 'source' points to the actual model field to populate.
-    assignee_id = serializers.PrimaryKeyRelatedField(
+    assignee_id = PreloadedPrimaryKeyRelatedField(
         queryset=User.objects.all(),
         source='assignee',
         write_only=True,
@@ -44,7 +93,7 @@ class TaskSerializer(serializers.ModelSerializer):
         allow_null=True           
     )
 
-    reviewer_id = serializers.PrimaryKeyRelatedField(
+    reviewer_id = PreloadedPrimaryKeyRelatedField(
         queryset=User.objects.all(),
         source='reviewer',
         write_only=True,
@@ -54,21 +103,48 @@ class TaskSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
+        list_serializer_class = TaskListSerializer
         fields = [
             'id', 'board', 'title', 'description', 'status', 'priority', 
             'due_date', 'assignee', 'reviewer', 'comments_count',
             # Include the write-only fields in the Meta class.
             'assignee_id', 'reviewer_id'
         ]
+
+    def __init__(self, *args, **kwargs):
+        """Drops the fields not listed in the 'fields' context entry, if there is one."""
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
     
 
+class TaskBulkOperationSerializer(serializers.Serializer):
+    """
+    A single operation of a bulk task request. 'data' holds the TaskSerializer
+    fields for 'create' and 'update', 'id' the target task for 'update' and 'delete'.
+    """
+    action = serializers.ChoiceField(choices=['create', 'update', 'delete'])
+    id = serializers.IntegerField(required=False)
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if attrs['action'] != 'create' and 'id' not in attrs:
+            raise serializers.ValidationError({'id': f"This field is required for '{attrs['action']}'."})
+        return attrs
+
+
 class BoardSerializer(serializers.ModelSerializer):
-    """Serializer for Board list views, includes calculated summary fields."""
-    member_count = serializers.SerializerMethodField()
-    ticket_count = serializers.SerializerMethodField()
-    tasks_to_do_count = serializers.SerializerMethodField()
-    tasks_high_prio_count = serializers.SerializerMethodField()
-    owner_id = serializers.IntegerField(source='owner.id', read_only=True)
+    """
+    Serializer for Board list views, includes calculated summary fields.
+    The counters are read from annotations, see BoardQuerySet.with_counts().
+    """
+    member_count = serializers.IntegerField(read_only=True)
+    ticket_count = serializers.IntegerField(read_only=True)
+    tasks_to_do_count = serializers.IntegerField(read_only=True)
+    tasks_high_prio_count = serializers.IntegerField(read_only=True)
+    owner_id = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Board
@@ -82,22 +158,6 @@ class BoardSerializer(serializers.ModelSerializer):
             'owner_id'
         ]
 
-    def get_member_count(self, obj):
-        """Calculates the total number of members on the board."""
-        return obj.members.count()
-
-    def get_ticket_count(self, obj):
-        """Calculates the total number of tasks on the board."""
-        return obj.tasks.count()
-
-    def get_tasks_to_do_count(self, obj):
-        """Calculates the number of tasks with 'To Do' status."""
-        return obj.tasks.filter(status=Task.Status.TODO).count()
-
-    def get_tasks_high_prio_count(self, obj):
-        """Calculates the number of tasks with 'High' priority."""
-        return obj.tasks.filter(priority=Task.Priority.HIGH).count()
-
 
 class BoardUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating a Board, specifically for changing title and members."""
@@ -148,4 +208,46 @@ class CommentSerializer(serializers.ModelSerializer):
         """Returns the author's full name if available, otherwise their username."""
         if obj.author.first_name and obj.author.last_name:
             return f"{obj.author.first_name} {obj.author.last_name}"
-        return obj.author.username
\ No newline at end of file
+        return obj.author.username
+
+
+class SyncCommentSerializer(CommentSerializer):
+    """Comment representation of the sync endpoint, which also needs the task."""
+
+    class Meta(CommentSerializer.Meta):
+        fields = ['id', 'task', 'created_at', 'author', 'content']
+
+
+class ActivityEventSerializer(serializers.ModelSerializer):
+    """An entry of a board's activity log. The actor is null for deleted users and summaries."""
+    actor = UserDetailSerializer(read_only=True)
+    task = serializers.IntegerField(source='task_id', read_only=True)
+
+    class Meta:
+        model = ActivityEvent
+        fields = ['id', 'created_at', 'verb', 'task', 'actor', 'data']
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Status of a background job, with a link to poll it."""
+    url = serializers.HyperlinkedIdentityField(view_name='job-detail')
+
+    class Meta:
+        model = Job
+        fields = ['id', 'url', 'name', 'status', 'attempts', 'created_at', 'started_at', 'finished_at', 'result', 'error']
+
+
+class DueDigestSerializer(serializers.ModelSerializer):
+    """A daily digest with the summaries of the overdue and soon due tasks."""
+    overdue = serializers.SerializerMethodField()
+    due_soon = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DueDigest
+        fields = ['day', 'overdue_count', 'due_soon_count', 'overdue', 'due_soon', 'built_at']
+
+    def get_overdue(self, obj):
+        return obj.data.get('overdue', [])
+
+    def get_due_soon(self, obj):
+        return obj.data.get('due_soon', [])
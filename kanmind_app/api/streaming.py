@@ -0,0 +1,66 @@
+import asyncio
+from itertools import islice
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from ..feed import get_hub
+from .serializers import TaskSerializer
+
+HEARTBEAT_SECONDS = 15
+
+# Events after which the subscriber may have lost access to the board.
+ACCESS_EVENTS = frozenset({'members.removed', 'board.updated', 'board.deleted'})
+
+
+def stream_board_detail(header, tasks, context, chunk_size=500):
+    """
+    Yields the JSON of a board detail piece by piece: the board fields and
+    members first, then the tasks serialized chunk by chunk. The task
+    queryset is iterated with a server-side cursor, so only one chunk of
+    tasks is held in memory at a time.
+    """
+    encoder = JSONEncoder()
+    head = encoder.encode(header)
+    yield head[:-1] + (', ' if header else '') + '"tasks": ['
+
+    rows = tasks.iterator(chunk_size=chunk_size)
+    separator = ''
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        data = TaskSerializer(chunk, many=True, context=context).data
+        yield separator + ', '.join(encoder.encode(item) for item in data)
+        separator = ', '
+    yield ']}'
+
+
+async def stream_board_changes(board_id, heartbeat=HEARTBEAT_SECONDS, has_access=None):
+    """
+    Yields the change events of a board as Server-Sent Events until the
+    client disconnects. A comment line is sent as heartbeat when idle, so
+    proxies keep the connection open.
+
+    has_access is an async callable that checks whether the subscriber may
+    still read the board. It is called before every heartbeat and every
+    event that can revoke access, and the stream ends once it returns False.
+    """
+    hub = get_hub()
+    queue = hub.subscribe(board_id)
+    encoder = JSONEncoder()
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                event = None
+            if has_access is not None and (event is None or event['type'] in ACCESS_EVENTS):
+                if not await has_access():
+                    return
+            if event is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield f"event: {event['type']}\ndata: {encoder.encode(event)}\n\n"
+    finally:
+        hub.unsubscribe(board_id, queue)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter, SimpleRouter
-from . import views
+from . import async_views, views
 
 # A simple router for nesting comment URLs under tasks.
 comment_router = SimpleRouter()
@@ -10,6 +10,9 @@ urlpatterns = [
     # URLs for Boards
     path('boards/', views.BoardListCreateView.as_view(), name='board-list-create'),
     path('boards/<int:pk>/', views.BoardDetailView.as_view(), name='board-detail'),
+    path('boards/<int:pk>/changes/', async_views.board_change_feed, name='board-change-feed'),
+    path('boards/<int:pk>/activity/', views.BoardActivityView.as_view(), name='board-activity'),
+    path('boards/<int:pk>/export/', views.BoardExportView.as_view(), name='board-export'),
 
     # URLs for Tasks
     path('tasks/', views.TaskListCreateView.as_view(), name='task-list-create'),
@@ -18,7 +21,30 @@ urlpatterns = [
     # URLs for specialized task lists
     path('tasks/assigned-to-me/', views.AssignedToMeTasksView.as_view(), name='tasks-assigned-to-me'),
     path('tasks/reviewing/', views.ReviewingTasksView.as_view(), name='tasks-reviewing'),
+    path('tasks/bulk/', views.TaskBulkView.as_view(), name='task-bulk'),
+
+    # Deadlines of the current user
+    path('tasks/due/', views.DueTasksView.as_view(), name='tasks-due'),
+    path('tasks/overdue/', views.OverdueTasksView.as_view(), name='tasks-overdue'),
+    path('digest/', views.DueDigestView.as_view(), name='due-digest'),
+
+    # Changes since the last sync
+    path('sync/', views.SyncView.as_view(), name='sync'),
+
+    # Full-text search over tasks and comments
+    path('search/', views.SearchView.as_view(), name='search'),
+
+    # Status of background jobs
+    path('jobs/<int:pk>/', views.JobDetailView.as_view(), name='job-detail'),
 
     # Nested URL for comments related to a specific task
     path('tasks/<int:task_pk>/comments/', include(comment_router.urls)),
+
+    # Async versions of the read endpoints for ASGI deployments
+    path('async/boards/', async_views.board_list, name='async-board-list'),
+    path('async/boards/<int:pk>/', async_views.board_detail, name='async-board-detail'),
+    path('async/tasks/', async_views.task_list, name='async-task-list'),
+    path('async/tasks/assigned-to-me/', async_views.assigned_to_me_tasks, name='async-tasks-assigned-to-me'),
+    path('async/tasks/reviewing/', async_views.reviewing_tasks, name='async-tasks-reviewing'),
+    path('async/tasks/<int:task_pk>/comments/', async_views.comment_list, name='async-task-comments-list'),
 ]
\ No newline at end of file
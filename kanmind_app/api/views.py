@@ -1,41 +1,186 @@
+import re
+from datetime import timedelta
+
 from rest_framework import viewsets, permissions, generics, mixins
-from rest_framework.exceptions import PermissionDenied, status
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError, status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from django.db.models import Q, Count, Prefetch
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+from django.db.models import Prefetch
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from ..models import Board, Task, Comment 
-from .serializers import BoardSerializer, BoardDetailSerializer, BoardUpdateSerializer, TaskSerializer, CommentSerializer
+from django.utils import timezone
+from .. import activity, jobs, response_cache, search
+from ..portability import export_board
+from ..access import accessible_board_ids, can_access_board, invalidate_accessible_boards, invalidate_board_access
+from ..feed import publish_on_commit, task_data
+from ..models import ActivityEvent, Board, BoardStats, DueDigest, Job, Task, Comment, Tombstone
+from ..sync import InvalidSyncToken, changes_since
+from .serializers import ActivityEventSerializer, DueDigestSerializer, JobSerializer, BoardSerializer, BoardDetailSerializer, BoardUpdateSerializer, TaskSerializer, TaskBulkOperationSerializer, CommentSerializer, SyncCommentSerializer
+from .conditional import ConditionalGetMixin
+from .filters import SparseFieldsMixin, TaskFilter, TaskOrdering
+from .pagination import ActivityPagination
+from .streaming import stream_board_detail
 from .permissions import IsOwnerOrMember, IsOwner, IsTaskOnAccessibleBoard, IsAuthorOrReadOnly, CanDeleteTask, CanAccessTaskComments
 
-class BoardListCreateView(generics.ListCreateAPIView):
+class BoardListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """Handles listing and creating boards for the logged-in user."""
+    query_budget = {'GET': 5}
+    read_replica = True
     serializer_class = BoardSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_validator_querysets(self):
+        """The boards and their tasks, which the counters are computed from."""
+        board_ids = accessible_board_ids(self.request.user, self.request)
+        return [
+            (Board.objects.filter(pk__in=board_ids), 'updated_at'),
+            (Task.objects.filter(board_id__in=board_ids), 'updated_at'),
+        ]
+
     def get_queryset(self):
-        """Returns boards where the user is either the owner or a member."""
-        user = self.request.user
-        return Board.objects.filter(Q(owner=user) | Q(members=user)).distinct()
+        """
+        Returns boards where the user is either the owner or a member,
+        annotated with the summary counters used by BoardSerializer.
+        """
+        board_ids = accessible_board_ids(self.request.user, self.request)
+        return Board.objects.filter(pk__in=board_ids).with_counts()
 
     def perform_create(self, serializer):
         """Sets the current user as the board owner and adds them as a member."""
         board_instance = serializer.save(owner=self.request.user)
         board_instance.members.add(self.request.user)
 
+    def create(self, request, *args, **kwargs):
+        """
+        Overrides the default create so the response contains the
+        annotated counters of the new board.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+
+        refreshed_instance = self.get_queryset().get(pk=serializer.instance.pk)
+        response_serializer = self.get_serializer(refreshed_instance)
+
+        headers = self.get_success_headers(response_serializer.data)
+        return Response(response_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+
+class BoardDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
+    """
+    Handles retrieving, updating, and deleting a single board.
+
+    Retrieving supports two query parameters for large boards:
+    '?tasks=all|none|first:N' limits the embedded tasks (the rest can be loaded
+    from the paginated task list), and '?stream=true' streams the JSON body,
+    writing the board and its members first and then the tasks in chunks.
 
-class BoardDetailView(generics.RetrieveUpdateDestroyAPIView):
-    """Handles retrieving, updating, and deleting a single board."""
+    Boards with many tasks are deleted by a background job, see destroy().
+    """
+    query_budget = {'GET': 8}
+    stream_chunk_size = 500
+
+    def get_validator_querysets(self):
+        """The board, its tasks and their comments. Membership changes touch the board."""
+        board_id = self.kwargs['pk']
+        if not can_access_board(self.request, board_id):
+            return None
+        return [
+            (Board.objects.filter(pk=board_id), 'updated_at'),
+            (Task.objects.filter(board_id=board_id), 'updated_at'),
+            (Comment.objects.filter(task__board_id=board_id), 'created_at'),
+        ]
 
     def get_queryset(self):
         """
         Optimizes the query by prefetching related tasks and annotating
         them with a comment count to prevent N+1 query problems.
+        Only the requested tasks are prefetched, and none when streaming
+        or deleting.
         """
-        tasks_with_comment_count = Task.objects.annotate(
-            comments_count=Count('comments')
-        )
-        prefetch_tasks = Prefetch('tasks', queryset=tasks_with_comment_count)
-        return Board.objects.prefetch_related(prefetch_tasks) 
+        queryset = Board.objects.filter(pending_deletion=False).prefetch_related('members')
+        if self.request.method == 'DELETE':
+            return queryset
+        if self.request.method == 'GET' and (self.is_streaming() or self.get_task_limit() is not None):
+            # The tasks are loaded separately in retrieve().
+            return queryset.prefetch_related(Prefetch('tasks', queryset=Task.objects.none()))
+        return queryset.prefetch_related(Prefetch('tasks', queryset=self.get_task_queryset()))
+
+    def get_task_queryset(self):
+        """Tasks as shown in the board detail, in a stable order."""
+        return Task.objects.for_api().order_by('id')
+
+    def get_task_limit(self):
+        """
+        Parses '?tasks=all|none|first:N'. Returns None for all tasks,
+        otherwise the maximum number of tasks to include.
+        """
+        value = self.request.query_params.get('tasks', 'all')
+        if value == 'all':
+            return None
+        if value == 'none':
+            return 0
+        prefix, _, count = value.partition(':')
+        if prefix == 'first' and count.isdigit():
+            return int(count)
+        raise ValidationError({'tasks': "Use 'all', 'none' or 'first:N'."})
+
+    def is_streaming(self):
+        return self.request.query_params.get('stream', '').lower() in ('1', 'true')
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Returns the board with all its tasks by default. With a task limit
+        or in streaming mode, the tasks are queried and serialized separately.
+        Regular responses are served from the response cache when possible.
+        """
+        if self.is_streaming():
+            return self.stream(request)
+
+        board_id = self.kwargs['pk']
+        cacheable = response_cache.get_backend() is not None and can_access_board(request, board_id)
+        if not cacheable:
+            return self.render_board(request, *args, **kwargs)
+
+        variant = f'tasks={self.get_task_limit()}'
+        content = response_cache.get_board_response(board_id, variant)
+        if content is not None:
+            return HttpResponse(content, content_type='application/json', headers={'X-Cache': 'HIT'})
+
+        # The version is read before rendering, so a concurrent write makes this entry unreachable.
+        version = response_cache.board_version(board_id)
+        response = self.render_board(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response_cache.set_board_response(board_id, variant, JSONRenderer().render(response.data), version)
+            response['X-Cache'] = 'MISS'
+        return response
+
+    def render_board(self, request, *args, **kwargs):
+        limit = self.get_task_limit()
+        if limit is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        instance = self.get_object()
+        data = self.get_serializer(instance).data
+        tasks = self.get_task_queryset().filter(board=instance)[:limit]
+        data['tasks'] = TaskSerializer(tasks, many=True, context=self.get_serializer_context()).data
+        return Response(data)
+
+    def stream(self, request):
+        instance = self.get_object()
+        data = self.get_serializer(instance).data
+        del data['tasks']
+
+        tasks = self.get_task_queryset().filter(board=instance)
+        limit = self.get_task_limit()
+        if limit is not None:
+            tasks = tasks[:limit]
+
+        body = stream_board_detail(data, tasks, self.get_serializer_context(), self.stream_chunk_size)
+        return StreamingHttpResponse(body, content_type='application/json')
 
     def get_serializer_class(self):
         """Uses a different serializer for update actions versus retrieve actions."""
@@ -43,6 +188,25 @@ class BoardDetailView(generics.RetrieveUpdateDestroyAPIView):
             return BoardUpdateSerializer
         return BoardDetailSerializer
 
+    def destroy(self, request, *args, **kwargs):
+        """
+        Deletes boards with up to KANMIND_JOBS['INLINE_DELETE_LIMIT'] tasks
+        right away. Larger boards are hidden at once and deleted by a
+        background job; the response is 202 with the job to poll.
+        """
+        board = self.get_object()
+        if board.tasks.count() <= jobs.get_config()['INLINE_DELETE_LIMIT']:
+            self.perform_destroy(board)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        with transaction.atomic():
+            Board.objects.filter(pk=board.pk).update(pending_deletion=True)
+            job = jobs.enqueue('delete_board', user=request.user, board_id=board.pk)
+        invalidate_accessible_boards({board.owner_id, *(member.pk for member in board.members.all())})
+        invalidate_board_access([board.pk])
+        response_cache.bump_board_versions([board.pk])
+        return Response(JobSerializer(job, context=self.get_serializer_context()).data, status=status.HTTP_202_ACCEPTED)
+
     def get_permissions(self):
         """Sets stricter permissions for the DELETE action (owner only)."""
         if self.request.method == 'DELETE':
@@ -50,26 +214,76 @@ class BoardDetailView(generics.RetrieveUpdateDestroyAPIView):
         return [permissions.IsAuthenticated(), IsOwnerOrMember()]
 
 
-class TaskListCreateView(generics.ListCreateAPIView):
-    """Handles listing all accessible tasks and creating a new task on a board."""
+class BoardActivityView(generics.ListAPIView):
+    """
+    Lists the activity log of a board newest first, in pages of 'page_size'
+    events with a 'next' link. '?task=<id>' narrows it to one task. Events
+    older than KANMIND_ACTIVITY_RETENTION days are summarized per day.
+    """
+    query_budget = {'GET': 4}
+    read_replica = True
+    serializer_class = ActivityEventSerializer
+    pagination_class = ActivityPagination
+
+    def get_queryset(self):
+        board = get_object_or_404(Board.objects.only('owner_id', 'pending_deletion'), pk=self.kwargs['pk'])
+        if not can_access_board(self.request, board):
+            raise PermissionDenied()
+        queryset = ActivityEvent.objects.filter(board_id=board.pk).select_related('actor')
+        task_id = self.request.query_params.get('task')
+        if task_id is not None:
+            if not task_id.isdigit():
+                raise ValidationError({'task': 'Expected a task id.'})
+            queryset = queryset.filter(task_id=task_id)
+        return queryset
+
+
+class BoardExportView(APIView):
+    """
+    Streams a board with its members, tasks and comments as NDJSON, one
+    object per line, in the format read by the 'import_board' management
+    command (see kanmind_app.portability). The budget includes the four
+    queries that run while the body is streamed.
+    """
+    query_budget = {'GET': 7}
+
+    def get(self, request, pk):
+        board = get_object_or_404(
+            Board.objects.only('title', 'owner_id', 'created_at', 'pending_deletion'), pk=pk
+        )
+        if not can_access_board(request, board):
+            raise PermissionDenied()
+        response = StreamingHttpResponse(export_board(board), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="board-{board.pk}.ndjson"'
+        return response
+
+
+class TaskListCreateView(ConditionalGetMixin, SparseFieldsMixin, generics.ListCreateAPIView):
+    """
+    Handles listing all accessible tasks and creating a new task on a board.
+    The list can be filtered, ordered and narrowed to some fields, see .filters.
+    """
+    query_budget = {'GET': 5}
+    read_replica = True
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated, IsTaskOnAccessibleBoard]
+    filter_backends = [TaskFilter, TaskOrdering]
+
+    def get_validator_querysets(self):
+        """The tasks the filters select and their comments."""
+        board_ids = accessible_board_ids(self.request.user, self.request)
+        tasks = self.filter_queryset(Task.objects.filter(board_id__in=board_ids))
+        return [(tasks, 'updated_at'), (Comment.objects.filter(task__in=tasks.values('pk')), 'created_at')]
 
     def get_queryset(self):
         """Returns tasks from all boards the user has access to."""
-        user = self.request.user
-        accessible_boards = Board.objects.filter(Q(owner=user) | Q(members=user))
-        return Task.objects.filter(board__in=accessible_boards).annotate(
-            comments_count=Count('comments')
-        )
+        board_ids = accessible_board_ids(self.request.user, self.request)
+        return Task.objects.filter(board_id__in=board_ids).for_api(self.get_requested_fields())
 
     def perform_create(self, serializer):
         """Sets the current user as the creator of the task."""
         board = serializer.validated_data['board']
-        is_owner = board.owner == self.request.user
-        is_member = self.request.user in board.members.all()
-
-        if not (is_owner or is_member):
+        if not can_access_board(self.request, board):
             raise PermissionDenied("You don't have permission to create a task on this board.")
         
         serializer.save(created_by=self.request.user)
@@ -86,9 +300,8 @@ class TaskListCreateView(generics.ListCreateAPIView):
         board = get_object_or_404(Board, pk=board_id)
 
         # Check if the user is a member of the board before proceeding.
-        user = request.user
-        if not (board.owner == user or user in board.members.all()):
-             raise PermissionDenied("You don't have permission to create a task on this board.")
+        if not can_access_board(request, board):
+            raise PermissionDenied("You don't have permission to create a task on this board.")
         return self.create(request, *args, **kwargs)
     
     def create(self, request, *args, **kwargs):
@@ -109,13 +322,22 @@ class TaskListCreateView(generics.ListCreateAPIView):
         return Response(response_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
-class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TaskDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Handles retrieving, updating, and deleting a single task."""
+    query_budget = {'GET': 5}
     serializer_class = TaskSerializer
 
+    def get_validator_querysets(self):
+        board_ids = accessible_board_ids(self.request.user, self.request)
+        task_id = self.kwargs['pk']
+        return [
+            (Task.objects.filter(pk=task_id, board_id__in=board_ids), 'updated_at'),
+            (Comment.objects.filter(task_id=task_id, task__board_id__in=board_ids), 'created_at'),
+        ]
+
     def get_queryset(self):
-        """Returns all tasks, annotated with their comment count."""
-        return Task.objects.annotate(comments_count=Count('comments'))
+        """Returns all tasks, with their users joined and their comment count annotated."""
+        return Task.objects.for_api()
 
     def get_permissions(self):
         """Sets stricter permissions for deleting a task."""
@@ -124,46 +346,352 @@ class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
         return [permissions.IsAuthenticated(), IsTaskOnAccessibleBoard()]
 
 
-class AssignedToMeTasksView(generics.ListAPIView):
-    """Provides a list of tasks assigned to the current user."""
+class AssignedToMeTasksView(ConditionalGetMixin, SparseFieldsMixin, generics.ListAPIView):
+    """Provides a list of tasks assigned to the current user, with the filters of TaskListCreateView."""
+    query_budget = {'GET': 4}
+    read_replica = True
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [TaskFilter, TaskOrdering]
+
+    def get_validator_querysets(self):
+        """The tasks the filters select and their comments."""
+        tasks = self.filter_queryset(Task.objects.filter(assignee=self.request.user))
+        return [(tasks, 'updated_at'), (Comment.objects.filter(task__in=tasks.values('pk')), 'created_at')]
 
     def get_queryset(self):
         """Filters tasks where the assignee is the logged-in user."""
-        return Task.objects.filter(assignee=self.request.user).annotate(
-            comments_count=Count('comments')
-        )
+        return Task.objects.filter(assignee=self.request.user).for_api(self.get_requested_fields())
 
-class ReviewingTasksView(generics.ListAPIView):
-    """Provides a list of tasks the current user is responsible for reviewing."""
+class ReviewingTasksView(ConditionalGetMixin, SparseFieldsMixin, generics.ListAPIView):
+    """
+    Provides a list of tasks the current user is responsible for reviewing,
+    with the filters of TaskListCreateView.
+    """
+    query_budget = {'GET': 4}
+    read_replica = True
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [TaskFilter, TaskOrdering]
+
+    def get_validator_querysets(self):
+        """The tasks the filters select and their comments."""
+        tasks = self.filter_queryset(Task.objects.filter(reviewer=self.request.user))
+        return [(tasks, 'updated_at'), (Comment.objects.filter(task__in=tasks.values('pk')), 'created_at')]
 
     def get_queryset(self):
         """Filters tasks where the reviewer is the logged-in user."""
-        return Task.objects.filter(reviewer=self.request.user).annotate(
-            comments_count=Count('comments')
+        return Task.objects.filter(reviewer=self.request.user).for_api(self.get_requested_fields())
+
+
+class DueTasksView(SparseFieldsMixin, generics.ListAPIView):
+    """
+    Lists the open tasks assigned to the current user that are due from today
+    to '?within=' days ahead ('7d' by default, also 'Nw' or a plain number),
+    soonest first, with the filters of TaskListCreateView. The tasks are read
+    from the partial index task_assignee_open_due_idx. No conditional GET:
+    the result changes with the date even when no task does.
+    """
+    query_budget = {'GET': 3}
+    read_replica = True
+    serializer_class = TaskSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [TaskFilter]
+    cursor_ordering = ('due_date', 'id')
+    default_within = '7d'
+    max_within_days = 365
+
+    def get_due_range(self):
+        """Returns the first and last due date to list, None for no bound."""
+        value = self.request.query_params.get('within', self.default_within)
+        match = re.fullmatch(r'(\d+)([dw]?)', value.strip().lower())
+        if match is None:
+            raise ValidationError({'within': "Use a number of days or weeks, like '7d' or '2w'."})
+        days = int(match.group(1)) * (7 if match.group(2) == 'w' else 1)
+        if days > self.max_within_days:
+            raise ValidationError({'within': f'At most {self.max_within_days} days are allowed.'})
+        today = timezone.localdate()
+        return today, today + timedelta(days=days)
+
+    def get_queryset(self):
+        first, last = self.get_due_range()
+        queryset = Task.objects.open_with_due_date().filter(assignee=self.request.user)
+        if first is not None:
+            queryset = queryset.filter(due_date__gte=first)
+        if last is not None:
+            queryset = queryset.filter(due_date__lte=last)
+        fields = self.get_requested_fields()
+        # The cursor of a page is built from the due date.
+        fields = fields and [*fields, 'due_date']
+        return queryset.for_api(fields).order_by(*self.cursor_ordering)
+
+
+class OverdueTasksView(DueTasksView):
+    """Lists the open tasks assigned to the current user that were due before today, oldest first."""
+
+    def get_due_range(self):
+        return None, timezone.localdate() - timedelta(days=1)
+
+
+class DueDigestView(generics.RetrieveAPIView):
+    """Returns the latest daily digest of the current user, see the 'build_due_digests' command."""
+    query_budget = {'GET': 2}
+    serializer_class = DueDigestSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_object(self):
+        digest = DueDigest.objects.filter(user=self.request.user).order_by('-day').first()
+        if digest is None:
+            raise NotFound('No digest has been built for you yet.')
+        return digest
+
+
+class TaskBulkView(APIView):
+    """
+    Applies a list of task create, update and delete operations in one request.
+
+    All operations are validated first, the creates and the updates each with
+    one list serializer; if any is invalid, nothing is written and the errors
+    are returned in the order of the operations. A task can only be the
+    target of one operation per request. Board access
+    is checked once per distinct board, and the changes are applied with
+    bulk_create/bulk_update in a single transaction, which also rebuilds the
+    counters of the touched boards. The search index is updated afterwards by
+    a background job.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_operations = 500
+
+    def post(self, request, *args, **kwargs):
+        if isinstance(request.data, list) and len(request.data) > self.max_operations:
+            raise ValidationError(f'At most {self.max_operations} operations are allowed per request.')
+        operations = TaskBulkOperationSerializer(data=request.data, many=True)
+        operations.is_valid(raise_exception=True)
+        operations = operations.validated_data
+
+        context = {'request': request, 'view': self}
+        target_ids = [op['id'] for op in operations if op['action'] != 'create']
+        targets = Task.objects.select_related('board').in_bulk(target_ids)
+
+        errors = [{} for _ in operations]
+        creates, updates, deletes = [], [], []
+        seen = {}
+        for index, op in enumerate(operations):
+            if op['action'] == 'create':
+                creates.append((index, op['data']))
+            elif op['id'] in seen:
+                errors[index] = {'id': f"Task {op['id']} is already changed by operation {seen[op['id']]}."}
+            elif op['id'] not in targets:
+                errors[index] = {'id': 'Task not found.'}
+            elif op['action'] == 'update':
+                updates.append((index, targets[op['id']], op['data']))
+            else:
+                deletes.append((index, targets[op['id']]))
+            if op['action'] != 'create':
+                seen.setdefault(op['id'], index)
+
+        create_serializer = TaskSerializer(data=[data for _, data in creates], many=True, context=context)
+        if not create_serializer.is_valid():
+            for (index, _), item_errors in zip(creates, create_serializer.errors):
+                errors[index] = item_errors
+        update_serializer = TaskSerializer(
+            [task for _, task, _ in updates], data=[data for _, _, data in updates],
+            many=True, partial=True, context=context,
         )
+        if not update_serializer.is_valid():
+            for (index, _, _), item_errors in zip(updates, update_serializer.errors):
+                errors[index] = item_errors
+        if any(errors):
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        updates = [(index, task, validated_data)
+                   for (index, task, _), validated_data in zip(updates, update_serializer.validated_data)]
+        self.check_board_access(request, create_serializer.validated_data, updates, deletes)
+        for index, task in deletes:
+            if not (task.created_by_id == request.user.id or task.board.owner_id == request.user.id):
+                raise PermissionDenied(f"You don't have permission to delete task {task.pk}.")
+
+        # Bulk writes bypass the signal handlers, so the counters of every
+        # board touched before or after the changes are rebuilt.
+        board_ids = {task.board_id for _, task in deletes}
+        board_ids |= {task.board_id for _, task, _ in updates}
+        with transaction.atomic():
+            created = Task.objects.bulk_create(
+                Task(created_by=request.user, **validated_data)
+                for validated_data in create_serializer.validated_data
+            )
+            updated = self.apply_updates(updates)
+            Task.objects.filter(pk__in=[task.pk for _, task in deletes]).delete()
+            board_ids |= {task.board_id for task in created + updated}
+            BoardStats.rebuild(board_ids=board_ids)
+            if created or updated:
+                jobs.enqueue('index_tasks', user=request.user, task_ids=[task.pk for task in created + updated])
+            for task in created:
+                publish_on_commit(task.board_id, 'task.created', lambda task=task: task_data(task))
+                activity.record(task.board_id, ActivityEvent.Verb.TASK_CREATED, task.pk, {'title': task.title})
+            for task in updated:
+                publish_on_commit(task.board_id, 'task.updated', lambda task=task: task_data(task))
+        response_cache.bump_board_versions(board_ids)
+
+        rendered = Task.objects.for_api().in_bulk([task.pk for task in created + updated])
+        results = [None] * len(operations)
+        for (index, _), task in zip(creates, created):
+            results[index] = {'action': 'create', 'id': task.pk, 'status': status.HTTP_201_CREATED,
+                              'data': TaskSerializer(rendered[task.pk], context=context).data}
+        for index, task, _ in updates:
+            results[index] = {'action': 'update', 'id': task.pk, 'status': status.HTTP_200_OK,
+                              'data': TaskSerializer(rendered[task.pk], context=context).data}
+        for index, task in deletes:
+            results[index] = {'action': 'delete', 'id': task.pk, 'status': status.HTTP_204_NO_CONTENT}
+        return Response({'results': results})
+
+    def check_board_access(self, request, creates, updates, deletes):
+        """Checks access once for every board an operation reads from or writes to."""
+        board_ids = {validated_data['board'].pk for validated_data in creates}
+        for _, task, validated_data in updates:
+            board_ids.add(task.board_id)
+            if 'board' in validated_data:
+                board_ids.add(validated_data['board'].pk)
+        board_ids |= {task.board_id for _, task in deletes}
+
+        for board_id in board_ids:
+            if not can_access_board(request, board_id):
+                raise PermissionDenied(f"You don't have permission to change tasks on board {board_id}.")
+
+    def apply_updates(self, updates):
+        """
+        Writes all updates with one bulk_update over the union of the changed
+        fields. Tasks moved to another board get a tombstone on the old one
+        and their comments move along in the search index and in delta sync. The changes are
+        recorded in the activity log.
+        """
+        tasks, fields, tombstones, moved = [], {'updated_at'}, [], []
+        previous_board_ids = {}
+        now = timezone.now()
+        for _, task, validated_data in updates:
+            previous_board_ids[task.pk] = task.board_id
+            new_board = validated_data.get('board')
+            if new_board is not None and new_board.pk != task.board_id:
+                tombstones.append(Tombstone(kind=Tombstone.Kind.TASK, object_id=task.pk, board_id=task.board_id))
+                moved.append(task)
+            for name, value in validated_data.items():
+                setattr(task, name, value)
+                fields.add(name)
+            task.updated_at = now
+            tasks.append(task)
+        if tasks:
+            Task.objects.bulk_update(tasks, fields)
+        Tombstone.objects.bulk_create(tombstones)
+        if moved:
+            # Delta sync sends the comments to the members of the new boards.
+            Comment.objects.filter(task__in=moved).update(updated_at=now)
+        for task in moved:
+            search.get_backend().move_comments(task.pk, task.board_id)
+        for task in tasks:
+            activity.record_task_changes(task, previous_board_ids[task.pk])
+        return tasks
+
+
+class SyncView(APIView):
+    """
+    Returns the boards, tasks and comments changed since the 'since' sync token
+    and the ids of those deleted, see kanmind_app.sync. Without 'since', all
+    accessible data is returned. Clients apply 'deleted' before the upserts and
+    send the returned 'sync_token' with the next request.
+    """
+    query_budget = {'GET': 6}
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            changes = changes_since(request.user, request.query_params.get('since'))
+        except InvalidSyncToken as error:
+            raise ValidationError({'since': str(error)})
+
+        context = {'request': request}
+        return Response({
+            'sync_token': changes['sync_token'],
+            'full': changes['full'],
+            'boards': BoardSerializer(changes['boards'], many=True).data,
+            'tasks': TaskSerializer(changes['tasks'], many=True, context=context).data,
+            'comments': SyncCommentSerializer(changes['comments'], many=True).data,
+            'deleted': changes['deleted'],
+        })
+
+
+class SearchView(APIView):
+    """
+    Searches the tasks and comments of the user's accessible boards for 'q',
+    best matches first, see kanmind_app.search. Results are paged with
+    'page_size' (max. 100) and 'offset'; 'next' links to the following page.
+    """
+    query_budget = {'GET': 5}
+    read_replica = True
+    permission_classes = [permissions.IsAuthenticated]
+    page_size = 20
+    max_page_size = 100
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'This parameter is required.'})
+        try:
+            page_size = min(int(request.query_params.get('page_size', self.page_size)), self.max_page_size)
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            raise ValidationError('page_size and offset must be integers.')
+        if page_size <= 0 or offset < 0:
+            raise ValidationError('page_size must be positive and offset must not be negative.')
+
+        # Fetch one extra match to know if there is a next page.
+        board_ids = sorted(accessible_board_ids(request.user, request))
+        hits = search.get_backend().search(query, board_ids, page_size + 1, offset)
+        next_url = None
+        if len(hits) > page_size:
+            hits = hits[:page_size]
+            next_url = replace_query_param(request.build_absolute_uri(), 'offset', offset + page_size)
+
+        titles = dict(Task.objects.filter(pk__in={hit['task'] for hit in hits}).values_list('pk', 'title'))
+        for hit in hits:
+            hit['task_title'] = titles.get(hit['task'])
+        return Response({'next': next_url, 'results': hits})
 
 
 class CommentViewSet(viewsets.ModelViewSet):
-    """Handles all CRUD operations for comments on a specific task."""
+    """
+    Handles all CRUD operations for comments on a specific task.
+    The thread is listed oldest first and can be paginated with 'page_size'.
+    """
+    query_budget = {'GET': 4}
+    read_replica = True
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated, CanAccessTaskComments, IsAuthorOrReadOnly]
 
     def get_task(self):
-        """Helper method to retrieve the parent task from the URL."""
-        task_pk = self.kwargs['task_pk']
-        task = get_object_or_404(Task, pk=task_pk)
-        return task
+        """
+        Helper method to retrieve the parent task from the URL. The task and
+        its board are loaded once per request and reused by the permission
+        check, the queryset and perform_create.
+        """
+        if not hasattr(self, '_task'):
+            self._task = get_object_or_404(Task.objects.select_related('board'), pk=self.kwargs['task_pk'])
+        return self._task
 
     def get_queryset(self):
-        """Filters comments to only show those belonging to the parent task."""
+        """Filters comments to only show those belonging to the parent task, with their authors joined."""
         task = self.get_task()
-        return Comment.objects.filter(task=task)
+        return Comment.objects.filter(task_id=task.pk).select_related('author').order_by('created_at', 'id')
 
     def perform_create(self, serializer):
         """Automatically sets the comment's author and parent task upon creation."""
         task = self.get_task()
-        serializer.save(author=self.request.user, task=task)
\ No newline at end of file
+        serializer.save(author=self.request.user, task=task)
+
+
+class JobDetailView(generics.RetrieveAPIView):
+    """Shows the status of a background job to the user who started it."""
+    query_budget = {'GET': 2}
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        return Job.objects.filter(created_by=self.request.user)
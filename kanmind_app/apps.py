@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class KanmindAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'kanmind_app'
+
+    def ready(self):
+        # Registers the signal handlers that keep the denormalized data in sync.
+        from . import signals  # noqa: F401
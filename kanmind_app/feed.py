@@ -0,0 +1,112 @@
+"""
+In-process publish/subscribe hub for the board change feed.
+
+The signal handlers in kanmind_app.signals publish small change events (task,
+comment and membership deltas) once the writing transaction has committed,
+and the change feed view streams them to the subscribed clients as
+Server-Sent Events.
+
+The hub is configured with the KANMIND_CHANGE_FEED_HUB setting (an import
+path). InMemoryHub only reaches subscribers in the same process; deployments
+with several processes can plug in a hub backed by a broker (e.g. Redis
+pub/sub) that implements the same three methods.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+class InMemoryHub:
+    """Fans out events to asyncio queues of the subscribers of a board."""
+
+    def __init__(self, max_queue_size=1000):
+        self.max_queue_size = max_queue_size
+        self.subscribers = defaultdict(dict)
+        self.lock = threading.Lock()
+
+    def subscribe(self, board_id):
+        """Returns a queue that receives the events of the board. Must be called from the event loop."""
+        queue = asyncio.Queue(maxsize=self.max_queue_size)
+        with self.lock:
+            self.subscribers[board_id][queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, board_id, queue):
+        with self.lock:
+            self.subscribers[board_id].pop(queue, None)
+            if not self.subscribers[board_id]:
+                del self.subscribers[board_id]
+
+    def has_subscribers(self, board_id):
+        return board_id in self.subscribers
+
+    def publish(self, board_id, event):
+        """Delivers an event to every subscriber of the board. Safe to call from any thread."""
+        with self.lock:
+            queues = list(self.subscribers.get(board_id, {}).items())
+        for queue, loop in queues:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, event)
+            except RuntimeError:
+                # The loop of a disconnected subscriber is already closed.
+                self.unsubscribe(board_id, queue)
+
+    @staticmethod
+    def _put(queue, event):
+        # A client that stops reading loses events instead of growing the queue.
+        if not queue.full():
+            queue.put_nowait(event)
+
+
+@lru_cache(maxsize=None)
+def get_hub():
+    return import_string(getattr(settings, 'KANMIND_CHANGE_FEED_HUB', 'kanmind_app.feed.InMemoryHub'))()
+
+
+@receiver(setting_changed)
+def reset_hub(setting, **kwargs):
+    if setting == 'KANMIND_CHANGE_FEED_HUB':
+        get_hub.cache_clear()
+
+
+def publish_on_commit(board_id, event_type, build_data):
+    """
+    Publishes an event to the subscribers of a board after the current
+    transaction commits. The payload is only built if someone listens.
+    """
+    hub = get_hub()
+    if board_id is None or not hub.has_subscribers(board_id):
+        return
+    event = {'type': event_type, 'board': board_id, 'data': build_data()}
+    transaction.on_commit(lambda: hub.publish(board_id, event))
+
+
+def task_data(task):
+    return {
+        'id': task.pk,
+        'board': task.board_id,
+        'title': task.title,
+        'description': task.description,
+        'status': task.status,
+        'priority': task.priority,
+        'due_date': task.due_date,
+        'assignee_id': task.assignee_id,
+        'reviewer_id': task.reviewer_id,
+    }
+
+
+def comment_data(comment):
+    return {
+        'id': comment.pk,
+        'task': comment.task_id,
+        'author_id': comment.author_id,
+        'content': comment.content,
+        'created_at': comment.created_at,
+    }
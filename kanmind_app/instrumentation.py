@@ -0,0 +1,224 @@
+"""
+Per-request performance instrumentation.
+
+PerformanceMiddleware records for every request the number and total time of
+its database queries, the time spent in the view and in rendering the
+response, and the response size. The numbers are grouped by the resolved URL
+name and
+
+- added to the response as a Server-Timing header,
+- logged as one JSON line to the 'kanmind.performance' logger,
+- summed up per URL name in route_stats().
+
+Query budgets cap the number of queries per URL name, either for all methods
+or per method ({'GET': 5}). A view can declare its own with a 'query_budget'
+attribute; the QUERY_BUDGETS setting overrides it. The budgets of the API
+views cover the worst case of a request with cold token and access caches.
+Exceeding a budget logs a warning, or raises QueryBudgetExceeded with
+RAISE_ON_BUDGET, which makes the test client fail the test.
+
+Streamed responses are measured until their body has been sent: the queries
+run while the body is generated count towards the budget, and the record is
+logged when the stream ends. Their headers go out before that, so they get
+no Server-Timing header. Async streams, such as the change feed, never end
+and are measured up to the start of the body only.
+
+Configured with the KANMIND_INSTRUMENTATION setting:
+
+    KANMIND_INSTRUMENTATION = {
+        'ENABLED': True,
+        'SERVER_TIMING': True,
+        'LOG': True,
+        'QUERY_BUDGETS': {'board-list-create': 4},
+        'RAISE_ON_BUDGET': False,
+    }
+
+When it is not enabled the middleware removes itself from the middleware
+chain at startup, so it costs nothing.
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('kanmind.performance')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestMetrics:
+    """Timings of one request, in seconds."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.start = time.perf_counter()
+        self.view_end = None
+        self.render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper counting and timing every query."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+_stats_lock = threading.Lock()
+_route_stats = defaultdict(lambda: defaultdict(float))
+
+
+def route_stats():
+    """Returns the summed up metrics per URL name since the last reset."""
+    with _stats_lock:
+        return {route: dict(values) for route, values in _route_stats.items()}
+
+
+def reset_route_stats():
+    with _stats_lock:
+        _route_stats.clear()
+
+
+class PerformanceMiddleware:
+    """Works in both the sync and the async handler, see ActivityMiddleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = getattr(settings, 'KANMIND_INSTRUMENTATION', None) or {}
+        if not config.get('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = config.get('SERVER_TIMING', True)
+        self.log = config.get('LOG', True)
+        self.budgets = config.get('QUERY_BUDGETS', {})
+        self.raise_on_budget = config.get('RAISE_ON_BUDGET', False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # A sync hook would be run in a thread by the async handler.
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = request._performance_metrics = RequestMetrics()
+        with self.counting(metrics):
+            response = self.get_response(request)
+        return self.measure(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = request._performance_metrics = RequestMetrics()
+        # The sync views run their queries in the thread of sync_to_async,
+        # on its connections, so the wrappers are installed there.
+        counting = await sync_to_async(self.counting)(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(counting.close)()
+        return self.measure(request, response, metrics)
+
+    def measure(self, request, response, metrics):
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.stream(request, response, metrics, response.streaming_content)
+        else:
+            self.finish(request, response, metrics, None if response.streaming else len(response.content))
+        return response
+
+    def counting(self, metrics):
+        """Counts the queries on all connections while the returned context is entered."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        return stack
+
+    def stream(self, request, response, metrics, content):
+        """Passes the body on chunk by chunk, counting the queries that produce each chunk."""
+        size = 0
+        try:
+            while True:
+                with self.counting(metrics):
+                    chunk = next(content, None)
+                if chunk is None:
+                    break
+                size += len(chunk)
+                yield chunk
+        finally:
+            self.finish(request, response, metrics, size)
+
+    def finish(self, request, response, metrics, size):
+        total = time.perf_counter() - metrics.start
+        match = request.resolver_match
+        route = match.view_name if match else None
+        view_time = (metrics.view_end or metrics.start + total) - metrics.start
+        record = {
+            'route': route,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'view_ms': round(max(view_time - metrics.db_time, 0) * 1000, 2),
+            'render_ms': round(metrics.render_time * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+            'bytes': size,
+        }
+
+        if self.server_timing and not response.streaming:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={record["db_ms"]};desc="{metrics.queries} queries"',
+                f'view;dur={record["view_ms"]}',
+                f'render;dur={record["render_ms"]}',
+                f'total;dur={record["total_ms"]}',
+            ])
+        if self.log:
+            logger.info(json.dumps(record))
+        if route is not None:
+            self.add_to_stats(route, record)
+            self.check_budget(request, route, metrics.queries)
+
+    def process_template_response(self, request, response):
+        """Called after the view and before rendering, so rendering can be timed separately."""
+        return self.time_rendering(request, response)
+
+    async def aprocess_template_response(self, request, response):
+        return self.time_rendering(request, response)
+
+    def time_rendering(self, request, response):
+        metrics = request._performance_metrics
+        metrics.view_end = time.perf_counter()
+
+        def rendered(response):
+            metrics.render_time = time.perf_counter() - metrics.view_end
+        response.add_post_render_callback(rendered)
+        return response
+
+    def add_to_stats(self, route, record):
+        with _stats_lock:
+            stats = _route_stats[route]
+            stats['requests'] += 1
+            for name in ('queries', 'db_ms', 'view_ms', 'render_ms', 'total_ms'):
+                stats[name] += record[name]
+            stats['bytes'] += record['bytes'] or 0
+
+    def check_budget(self, request, route, queries):
+        func = request.resolver_match.func
+        view_class = getattr(func, 'view_class', None) or getattr(func, 'cls', None)
+        budget = self.budgets.get(route, getattr(view_class, 'query_budget', None))
+        if isinstance(budget, dict):
+            budget = budget.get(request.method)
+        if budget is None or queries <= budget:
+            return
+        message = f'{request.method} {route} ran {queries} queries, its budget is {budget}.'
+        if self.raise_on_budget:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,223 @@
+"""
+Background jobs stored in the database.
+
+Work that does not have to finish within the request, like deleting a large
+board or indexing tasks for search, is enqueued
+as a Job row and run by the 'run_jobs' worker command. The row is inserted in
+the transaction of the change that needs it, so a job never runs for changes
+that were rolled back and never runs before they are visible.
+
+Job functions are registered by name with @register and take JSON-serializable
+keyword arguments. They must be idempotent: a failing job is retried with an
+exponential back-off up to its max_attempts, and a job whose worker died is
+queued again after KANMIND_JOBS['TIMEOUT'] seconds.
+
+Configured with the KANMIND_JOBS setting, see DEFAULTS. With 'EAGER' (the
+default), jobs run in the same process, so setups without a worker work as
+well; turn it off when a worker runs. During a request EagerJobsMiddleware
+holds the committed jobs back until the response has been sent to the client,
+so the request does not wait for them. Outside of requests they run as soon
+as the enqueuing transaction commits.
+"""
+import logging
+from contextvars import ContextVar
+from datetime import timedelta
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import search
+from .models import Board, Job, Task
+
+logger = logging.getLogger('kanmind.jobs')
+
+_request_jobs = ContextVar('kanmind_request_jobs', default=None)
+
+DEFAULTS = {
+    'EAGER': True,
+    'MAX_ATTEMPTS': 3,
+    # Seconds before the first retry; doubled for every further attempt.
+    'RETRY_DELAY': 10,
+    # Seconds after which a running job is considered lost with its worker.
+    'TIMEOUT': 600,
+    # Days finished jobs are kept for the status endpoint.
+    'KEEP_FINISHED': 7,
+    # Boards with more tasks are deleted by a job instead of in the request.
+    'INLINE_DELETE_LIMIT': 200,
+}
+
+_registry = {}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'KANMIND_JOBS', {})}
+
+
+def register(name):
+    """Registers a job function under the given name."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, user=None, **kwargs):
+    """Adds a job to the queue within the current transaction and returns it."""
+    if name not in _registry:
+        raise ValueError(f'Unknown job {name!r}.')
+    config = get_config()
+    job = Job.objects.create(name=name, kwargs=kwargs, created_by=user, max_attempts=config['MAX_ATTEMPTS'])
+    if config['EAGER']:
+        transaction.on_commit(partial(_committed, job.pk))
+    return job
+
+
+def _committed(job_id):
+    pending = _request_jobs.get()
+    if pending is None:
+        run_pending(job_ids=[job_id])
+    else:
+        pending.append(job_id)
+
+
+def claim(limit=1, job_ids=None):
+    """
+    Marks up to 'limit' due jobs as running and returns them. Each job is
+    claimed with a conditional UPDATE, so concurrent workers never run the
+    same job twice.
+    """
+    now = timezone.now()
+    requeue_lost_jobs(now)
+    candidates = Job.objects.filter(status=Job.Status.QUEUED, run_after__lte=now)
+    if job_ids is not None:
+        candidates = candidates.filter(pk__in=job_ids)
+    claimed = [
+        pk
+        for pk in candidates.order_by('run_after', 'id').values_list('pk', flat=True)[:limit]
+        if Job.objects.filter(pk=pk, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING, started_at=now, attempts=F('attempts') + 1
+        )
+    ]
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_after', 'id'))
+
+
+def requeue_lost_jobs(now):
+    """Queues jobs again whose worker stopped while running them, or fails them if they are out of attempts."""
+    lost = Job.objects.filter(status=Job.Status.RUNNING, started_at__lt=now - timedelta(seconds=get_config()['TIMEOUT']))
+    lost.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.Status.FAILED, error='The worker stopped while running the job.', finished_at=now
+    )
+    lost.update(status=Job.Status.QUEUED, run_after=now)
+
+
+def run(job):
+    """Runs a claimed job and records its result, or schedules a retry."""
+    try:
+        func = _registry.get(job.name)
+        if func is None:
+            raise LookupError(f'Unknown job {job.name!r}.')
+        result = func(**job.kwargs)
+    except Exception as error:
+        logger.exception('Job %s (%s) failed on attempt %s.', job.pk, job.name, job.attempts)
+        job.error = f'{type(error).__name__}: {error}'
+        if job.attempts < job.max_attempts:
+            job.status = Job.Status.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=get_config()['RETRY_DELAY'] * 2 ** (job.attempts - 1))
+        else:
+            job.status = Job.Status.FAILED
+            job.finished_at = timezone.now()
+    else:
+        job.status, job.result, job.error = Job.Status.DONE, result, ''
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'run_after', 'finished_at'])
+    return job
+
+
+def run_pending(job_ids=None):
+    """Runs the due jobs one by one in this thread until none is left. Returns the number of runs."""
+    count = 0
+    while jobs := claim(job_ids=job_ids):
+        for job in jobs:
+            run(job)
+            count += 1
+    return count
+
+
+def prune_finished():
+    """Deletes finished jobs older than KANMIND_JOBS['KEEP_FINISHED'] days."""
+    cutoff = timezone.now() - timedelta(days=get_config()['KEEP_FINISHED'])
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.Status.DONE, Job.Status.FAILED], finished_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+class EagerJobsMiddleware:
+    """
+    Runs the eager jobs committed during a request when the response is
+    closed, after the body was sent. Works in both the sync and the async
+    handler, see ActivityMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pending = []
+        token = _request_jobs.set(pending)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_jobs.reset(token)
+        return self.run_on_close(pending, response)
+
+    async def __acall__(self, request):
+        pending = []
+        token = _request_jobs.set(pending)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_jobs.reset(token)
+        return self.run_on_close(pending, response)
+
+    def run_on_close(self, pending, response):
+        close = response.close
+
+        def run_and_close():
+            try:
+                if pending:
+                    run_pending(job_ids=pending)
+            except Exception:
+                # The response is already sent; the jobs stay queued for a later run.
+                logger.exception('Could not run job(s) %s.', pending)
+            finally:
+                close()
+
+        response.close = run_and_close
+        return response
+
+
+@register('delete_board')
+def delete_board(board_id):
+    """Deletes a board with its tasks and comments; the signal handlers clean up after it."""
+    with transaction.atomic():
+        deleted, _ = Board.objects.filter(pk=board_id).delete()
+    return {'deleted': deleted}
+
+
+@register('index_tasks')
+def index_tasks(task_ids):
+    """Indexes the tasks for search as they are now; tasks deleted in between are skipped."""
+    tasks = list(Task.objects.filter(pk__in=task_ids).only('board_id', 'title', 'description'))
+    search.get_backend().index_tasks(tasks)
+    return {'indexed': len(tasks)}
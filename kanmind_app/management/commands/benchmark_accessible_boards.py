@@ -0,0 +1,65 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+from django.test.utils import CaptureQueriesContext
+
+from kanmind_app.access import accessible_board_ids
+from kanmind_app.models import Board, Task
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the task list filter built from the cached accessible board ids '
+        'with the former owner-or-member subquery, on the current database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='User id, defaults to the member of most boards.')
+        parser.add_argument('--iterations', type=int, default=100)
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+
+        def subquery():
+            boards = Board.objects.filter(Q(owner=user) | Q(members=user))
+            return list(Task.objects.filter(board__in=boards).values_list('pk', flat=True))
+
+        def cached_ids():
+            return list(Task.objects.filter(board_id__in=accessible_board_ids(user)).values_list('pk', flat=True))
+
+        if sorted(subquery()) != sorted(cached_ids()):
+            raise CommandError('Both variants must return the same tasks.')
+
+        results = {
+            'user_id': user.pk,
+            'accessible_boards': len(accessible_board_ids(user)),
+            'iterations': options['iterations'],
+            'subquery': self.measure(subquery, options['iterations']),
+            'cached_ids': self.measure(cached_ids, options['iterations']),
+        }
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def get_user(self, user_id):
+        User = get_user_model()
+        if user_id is not None:
+            return User.objects.get(pk=user_id)
+        user = User.objects.annotate(boards=Count('member_of_boards')).order_by('-boards').first()
+        if user is None:
+            raise CommandError('There are no users to benchmark with.')
+        return user
+
+    def measure(self, function, iterations):
+        """Returns the mean time in milliseconds and the queries per call."""
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                function()
+            elapsed = time.perf_counter() - start
+        return {
+            'mean_ms': round(elapsed * 1000 / iterations, 3),
+            'queries_per_call': round(len(queries) / iterations, 2),
+        }
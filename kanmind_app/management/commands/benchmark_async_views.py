@@ -0,0 +1,94 @@
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+
+class Command(BaseCommand):
+    help = (
+        'Sends the same number of concurrent read requests to the sync views and '
+        'their async versions under /api/async/, on the current database.'
+    )
+
+    endpoints = [
+        ('board-list-create', 'async-board-list'),
+        ('task-list-create', 'async-task-list'),
+        ('tasks-assigned-to-me', 'async-tasks-assigned-to-me'),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='User id, defaults to the member of most boards.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and variant.')
+        parser.add_argument('--concurrency', type=int, default=10)
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        headers = {'Authorization': f'Token {token.key}'}
+        count, concurrency = options['requests'], options['concurrency']
+
+        results = {'user_id': user.pk, 'requests': count, 'concurrency': concurrency, 'endpoints': {}}
+        # The test clients send requests to the host 'testserver'.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for sync_name, async_name in self.endpoints:
+                results['endpoints'][sync_name] = {
+                    'sync': self.run_sync(reverse(sync_name), headers, count, concurrency),
+                    'async': asyncio.run(self.run_async(reverse(async_name), headers, count, concurrency)),
+                }
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def get_user(self, user_id):
+        User = get_user_model()
+        if user_id is not None:
+            return User.objects.get(pk=user_id)
+        user = User.objects.annotate(boards=Count('member_of_boards')).order_by('-boards').first()
+        if user is None:
+            raise CommandError('There are no users to benchmark with.')
+        return user
+
+    def run_sync(self, url, headers, count, concurrency):
+        """Runs the requests on a pool of threads, like a threaded WSGI server."""
+        def fetch(_):
+            start = time.perf_counter()
+            response = Client().get(url, headers=headers)
+            return response.status_code, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = list(pool.map(fetch, range(count)))
+        return self.summarize(timings, time.perf_counter() - start)
+
+    async def run_async(self, url, headers, count, concurrency):
+        """Runs the requests as tasks on one event loop, at most 'concurrency' at a time."""
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                return response.status_code, time.perf_counter() - start
+
+        start = time.perf_counter()
+        timings = await asyncio.gather(*(fetch() for _ in range(count)))
+        return self.summarize(timings, time.perf_counter() - start)
+
+    def summarize(self, timings, elapsed):
+        statuses = {status for status, _ in timings}
+        if statuses != {200}:
+            raise CommandError(f'Unexpected response status codes: {sorted(statuses)}')
+        latencies = sorted(duration * 1000 for _, duration in timings)
+        return {
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(statistics.median(latencies), 3),
+            'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        }
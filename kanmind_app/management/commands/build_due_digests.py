@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from kanmind_app.models import DueDigest, Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds today's digest of every user with overdue tasks or tasks due in "
+        'the next days. Users are processed in batches with at most four queries per '
+        'batch, however many tasks they have. Run it once a day; running it '
+        'again on the same day replaces the digests.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--within', type=int, default=7, help='Days ahead that count as due soon.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users per batch.')
+        parser.add_argument('--max-tasks', type=int, default=20, help='Tasks listed per section; all are counted.')
+        parser.add_argument('--keep-days', type=int, default=14, help='Delete digests older than this many days.')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        horizon = today + timedelta(days=options['within'])
+        users = get_user_model().objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)
+
+        built = 0
+        last_pk = 0
+        while True:
+            user_ids = list(users.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not user_ids:
+                break
+            last_pk = user_ids[-1]
+            with transaction.atomic():
+                built += self.build(user_ids, today, horizon, options['max_tasks'])
+
+        pruned, _ = DueDigest.objects.filter(day__lt=today - timedelta(days=options['keep_days'])).delete()
+        self.stdout.write(self.style.SUCCESS(f'Built {built} digest(s) for {today} and deleted {pruned} old one(s).'))
+
+    def build(self, user_ids, today, horizon, max_tasks):
+        """
+        Writes the digests of a batch of users: one query for their tasks, one
+        upsert for the digests and one delete for those that became empty.
+        Returns the number of digests written.
+        """
+        rows = (
+            Task.objects.open_with_due_date()
+            .filter(assignee_id__in=user_ids, due_date__lte=horizon)
+            .order_by('assignee_id', 'due_date', 'id')
+            .values_list('assignee_id', 'id', 'title', 'priority', 'due_date', 'board_id', 'board__title')
+        )
+        digests = {}
+        for user_id, task_id, title, priority, due_date, board_id, board_title in rows:
+            digest = digests.get(user_id)
+            if digest is None:
+                digest = digests[user_id] = DueDigest(
+                    user_id=user_id, day=today, data={'overdue': [], 'due_soon': []}
+                )
+            section = 'overdue' if due_date < today else 'due_soon'
+            setattr(digest, f'{section}_count', getattr(digest, f'{section}_count') + 1)
+            if len(digest.data[section]) < max_tasks:
+                digest.data[section].append({
+                    'id': task_id, 'title': title, 'priority': priority, 'due_date': due_date,
+                    'board': board_id, 'board_title': board_title,
+                })
+
+        DueDigest.objects.bulk_create(
+            list(digests.values()),
+            update_conflicts=True,
+            unique_fields=['user', 'day'],
+            update_fields=['overdue_count', 'due_soon_count', 'data', 'built_at'],
+        )
+        DueDigest.objects.filter(user_id__in=user_ids, day=today).exclude(user_id__in=list(digests)).delete()
+        return len(digests)
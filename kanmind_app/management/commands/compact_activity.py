@@ -0,0 +1,105 @@
+import json
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from kanmind_app.models import ActivityEvent, Board
+
+
+class Command(BaseCommand):
+    help = (
+        'Rolls activity events older than the retention up into one summary per '
+        'board and day, with the number of events per verb and per actor, and '
+        'deletes the log of boards that no longer exist. With --archive, the '
+        'removed events are appended to a file as JSON lines first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            default=getattr(settings, 'KANMIND_ACTIVITY_RETENTION', 90),
+            help='Keep every event of this many days, defaults to KANMIND_ACTIVITY_RETENTION.',
+        )
+        parser.add_argument('--archive', help='Append the compacted events to this file as JSON lines.')
+
+    def handle(self, *args, **options):
+        # Whole days only, so a day is never split across a summary and single events.
+        today = timezone.localdate()
+        cutoff = datetime.combine(today - timedelta(days=options['days']), time.min, tzinfo=timezone.get_current_timezone())
+        old_events = ActivityEvent.objects.filter(created_at__lt=cutoff).exclude(verb=ActivityEvent.Verb.SUMMARY)
+        board_ids = sorted(set(old_events.values_list('board_id', flat=True).order_by()))
+        existing = set(Board.objects.filter(pk__in=board_ids).values_list('pk', flat=True))
+
+        archive = open(options['archive'], 'a') if options['archive'] else None
+        compacted = removed = summaries = 0
+        try:
+            for board_id in board_ids:
+                with transaction.atomic():
+                    if board_id not in existing:
+                        events = ActivityEvent.objects.filter(board_id=board_id)
+                        self.archive(archive, events)
+                        removed += events.delete()[0]
+                        continue
+                    events = old_events.filter(board_id=board_id)
+                    self.archive(archive, events)
+                    summaries += self.summarize(board_id, events)
+                    compacted += events.delete()[0]
+        finally:
+            if archive is not None:
+                archive.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Compacted {compacted} event(s) into {summaries} new daily summaries and removed '
+            f'{removed} event(s) of deleted boards.'
+        ))
+
+    def summarize(self, board_id, events):
+        """Adds the events to the daily summaries of the board. Returns the number of new summaries."""
+        counts = defaultdict(lambda: {'verbs': Counter(), 'actors': Counter()})
+        rows = (
+            events.annotate(day=TruncDate('created_at'))
+            .values_list('day', 'verb', 'actor_id')
+            .annotate(total=Count('pk'))
+            .order_by()
+        )
+        for day, verb, actor_id, total in rows:
+            counts[day]['verbs'][verb] += total
+            if actor_id is not None:
+                counts[day]['actors'][str(actor_id)] += total
+
+        tz = timezone.get_current_timezone()
+        starts = {datetime.combine(day, time.min, tzinfo=tz): day for day in counts}
+        existing = {
+            summary.created_at: summary
+            for summary in ActivityEvent.objects.filter(
+                board_id=board_id, verb=ActivityEvent.Verb.SUMMARY, created_at__in=list(starts)
+            )
+        }
+        created, updated = [], []
+        for start, day in starts.items():
+            verbs, actors = counts[day]['verbs'], counts[day]['actors']
+            summary = existing.get(start)
+            if summary is None:
+                summary = ActivityEvent(board_id=board_id, verb=ActivityEvent.Verb.SUMMARY, created_at=start)
+                created.append(summary)
+            else:
+                verbs.update(summary.data['verbs'])
+                actors.update(summary.data['actors'])
+                updated.append(summary)
+            summary.data = {'events': sum(verbs.values()), 'verbs': dict(verbs), 'actors': dict(actors)}
+        ActivityEvent.objects.bulk_create(created)
+        ActivityEvent.objects.bulk_update(updated, ['data'])
+        return len(created)
+
+    def archive(self, file, events):
+        if file is None:
+            return
+        for event in events.order_by('pk').values().iterator():
+            file.write(json.dumps(event, cls=DjangoJSONEncoder) + '\n')
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from kanmind_app.models import Board
+from kanmind_app.portability import export_board
+
+
+class Command(BaseCommand):
+    help = (
+        'Writes a board with its members, tasks and comments as NDJSON, in the '
+        'format read by import_board. The rows are streamed, so boards of any '
+        'size are exported with constant memory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('board_id', type=int)
+        parser.add_argument('--output', help='Write the export to this file instead of stdout.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            board = Board.objects.get(pk=options['board_id'])
+        except Board.DoesNotExist:
+            raise CommandError(f"Board {options['board_id']} does not exist.")
+
+        file = open(options['output'], 'w') if options['output'] else None
+        lines = 0
+        try:
+            # One transaction reads a consistent snapshot of the board.
+            with transaction.atomic():
+                for line in export_board(board, chunk_size=options['chunk_size']):
+                    if file is not None:
+                        file.write(line)
+                    else:
+                        self.stdout.write(line, ending='')
+                    lines += 1
+        finally:
+            if file is not None:
+                file.close()
+        if file is not None:
+            self.stderr.write(f'Exported board {board.pk} as {lines} lines.')
@@ -0,0 +1,125 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from kanmind_app import search
+from kanmind_app.models import Board, BoardStats, Comment, Task
+from user_auth_app.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates a synthetic dataset for benchmarks with bulk inserts. Board '
+        'membership is skewed: a few users are on many boards and most boards '
+        'are small. The same --seed always generates the same data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--boards', type=int, default=50)
+        parser.add_argument('--tasks-per-board', type=int, default=50, help='Mean, varies by +-50%%.')
+        parser.add_argument('--comments-per-task', type=int, default=3, help='Mean, varies from 0 to twice this.')
+        parser.add_argument('--max-members', type=int, default=25)
+        parser.add_argument('--prefix', default='bench', help='Prefix of the generated user names.')
+        parser.add_argument('--password', default='benchmark', help='Password of all generated users.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f"Users with the prefix '{prefix}' exist already, choose another --prefix.")
+        if options['users'] < 1:
+            raise CommandError('At least one user is needed.')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        with transaction.atomic():
+            users = self.create_users(prefix, options['users'], options['password'])
+            boards = self.create_boards(users, options['boards'], options['max_members'])
+            tasks = self.create_tasks(boards, options['tasks_per_board'])
+            comments = self.create_comments(boards, tasks, options['comments_per_task'])
+            # Bulk inserts bypass the signal handlers that maintain these.
+            BoardStats.rebuild(board_ids=[board.pk for board, _ in boards])
+            search.get_backend().rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users, {len(boards)} boards, {len(tasks)} tasks and {comments} comments.'
+        ))
+
+    def create_users(self, prefix, count, password):
+        # Hashing is slow, all users share one hash.
+        password = make_password(password)
+        users = User.objects.bulk_create(
+            (
+                User(
+                    username=f'{prefix}-{i}@example.com',
+                    email=f'{prefix}-{i}@example.com',
+                    first_name='User',
+                    last_name=str(i),
+                    password=password,
+                )
+                for i in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        UserProfile.objects.bulk_create(
+            (UserProfile(user=user, fullname=f'User {i}') for i, user in enumerate(users)),
+            batch_size=self.batch_size,
+        )
+        return users
+
+    def create_boards(self, users, count, max_members):
+        """Returns (board, member list) pairs. Users are picked with Zipf-like weights."""
+        weights = [1 / (rank + 1) for rank in range(len(users))]
+        plans = []
+        for i in range(count):
+            owner = self.rng.choices(users, weights)[0]
+            size = min(max_members, len(users), int(self.rng.paretovariate(1.2)) + 1)
+            members = {owner}
+            while len(members) < size:
+                members.add(self.rng.choices(users, weights)[0])
+            plans.append((Board(title=f'Board {i}', owner=owner), sorted(members, key=lambda user: user.pk)))
+
+        boards = Board.objects.bulk_create([board for board, _ in plans], batch_size=self.batch_size)
+        Membership = Board.members.through
+        Membership.objects.bulk_create(
+            (Membership(board=board, user=user) for board, (_, members) in zip(boards, plans) for user in members),
+            batch_size=self.batch_size,
+        )
+        return [(board, members) for board, (_, members) in zip(boards, plans)]
+
+    def create_tasks(self, boards, per_board):
+        today = timezone.localdate()
+        statuses, priorities = Task.Status.values, Task.Priority.values
+        tasks = []
+        for board, members in boards:
+            for i in range(self.rng.randint(per_board // 2, per_board * 3 // 2)):
+                has_due_date = self.rng.random() < 0.6
+                tasks.append(Task(
+                    board=board,
+                    title=f'Task {i} of {board.title}',
+                    description=self.rng.choice(['', 'Needs review.', 'Blocked by another task.', 'Ship it.']),
+                    status=self.rng.choice(statuses),
+                    priority=self.rng.choice(priorities),
+                    due_date=today + timedelta(days=self.rng.randint(-30, 60)) if has_due_date else None,
+                    created_by=board.owner,
+                    assignee=self.rng.choice(members + [None]),
+                    reviewer=self.rng.choice(members + [None]),
+                ))
+        return Task.objects.bulk_create(tasks, batch_size=self.batch_size)
+
+    def create_comments(self, boards, tasks, per_task):
+        members = {board.pk: board_members for board, board_members in boards}
+        comments = [
+            Comment(task=task, author=self.rng.choice(members[task.board_id]), content=f'Comment {i} on {task.title}.')
+            for task in tasks
+            for i in range(self.rng.randint(0, per_task * 2))
+        ]
+        Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+        return len(comments)
@@ -0,0 +1,44 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from kanmind_app.portability import InvalidExport, import_board
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates a new board from an export written by export_board or the '
+        'export endpoint. Users are matched to accounts by email. The file is '
+        'read line by line and written in batches, so memory stays constant.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="The export file, or '-' for stdin.")
+        parser.add_argument('--owner', required=True, help='Email of the owner of the new board.')
+        parser.add_argument('--title', help='Title of the new board, defaults to the exported title.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        owner = get_user_model().objects.filter(email=options['owner']).order_by('pk').first()
+        if owner is None:
+            raise CommandError(f"There is no user with the email {options['owner']}.")
+
+        file = sys.stdin if options['path'] == '-' else open(options['path'])
+        try:
+            board, counts = import_board(file, owner, title=options['title'], batch_size=options['batch_size'])
+        except InvalidExport as error:
+            raise CommandError(str(error))
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported board {board.pk} with {counts['members']} member(s), {counts['tasks']} task(s) "
+            f"and {counts['comments']} comment(s)."
+        ))
+        if counts['unknown_users'] or counts['skipped_comments']:
+            self.stdout.write(self.style.WARNING(
+                f"{counts['unknown_users']} user(s) have no account here and "
+                f"{counts['skipped_comments']} comment(s) belonged to missing tasks."
+            ))
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from kanmind_app.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes tombstones older than the sync token retention. '
+        'Clients with older tokens get a full sync instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            default=getattr(settings, 'KANMIND_SYNC_TOMBSTONE_RETENTION', 30),
+            help='Keep tombstones of this many days, defaults to KANMIND_SYNC_TOMBSTONE_RETENTION.',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstone(s) older than {options["days"]} days.'))
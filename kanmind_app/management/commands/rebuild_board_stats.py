@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from kanmind_app.models import BoardStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the denormalized board counters, or only verifies them with --verify.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('board_ids', nargs='*', type=int, help='Limit to these boards.')
+        parser.add_argument('--verify', action='store_true', help='Report drift without repairing it.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        drifted = BoardStats.rebuild(
+            board_ids=options['board_ids'] or None,
+            dry_run=options['verify'],
+            batch_size=options['batch_size'],
+        )
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All board counters are up to date.'))
+            return
+
+        ids = ', '.join(str(pk) for pk in drifted)
+        if options['verify']:
+            raise CommandError(f'{len(drifted)} board(s) have drifted counters: {ids}')
+        self.stdout.write(self.style.SUCCESS(f'Repaired counters of {len(drifted)} board(s): {ids}'))
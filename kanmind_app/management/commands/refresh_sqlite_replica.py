@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copies the SQLite primary database into the file of the read replica '
+        '(KANMIND_READ_REPLICA) with the SQLite backup API. Meant for trying out '
+        'replica routing locally; run it again to let the replica catch up.'
+    )
+
+    def handle(self, *args, **options):
+        alias = getattr(settings, 'KANMIND_READ_REPLICA', None)
+        if not alias:
+            raise CommandError('No read replica is configured, set KANMIND_DB_REPLICA.')
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('Both the primary and the replica must be SQLite databases.')
+
+        # The replica's own connections are read-only, so write through a new one.
+        replica.close()
+        primary.ensure_connection()
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+        self.stdout.write(self.style.SUCCESS(f"Copied the primary database to '{alias}'."))
@@ -0,0 +1,278 @@
+import json
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from kanmind_app.access import accessible_board_ids
+from kanmind_app.models import Board, Comment, DueDigest, Job, Task
+from kanmind_app.portability import export_board, import_board
+from kanmind_app.sync import encode_token
+from user_auth_app.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        'Drives every API endpoint through the test client on the current database '
+        'and reports p50/p95 latency, query count and peak memory per endpoint as '
+        'JSON, followed by the throughput of exporting and importing the board. '
+        'Writes are rolled back, so runs on the same data are comparable. '
+        'Generate data with generate_kanmind_data first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='User id, defaults to the member of most boards.')
+        parser.add_argument('--password', default='benchmark', help='Password of the user, for the login endpoint.')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--output', help='Write the report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        self.headers = {'Authorization': f'Token {token.key}'}
+        self.client, self.async_client = Client(), AsyncClient()
+        # Rows created so that every endpoint has something to show, deleted after the run.
+        self.created = []
+
+        endpoints = self.get_endpoints(user, options['password'])
+        report = {
+            'commit': self.get_commit(),
+            'database': connection.vendor,
+            'dataset': {
+                'users': get_user_model().objects.count(),
+                'boards': Board.objects.count(),
+                'tasks': Task.objects.count(),
+                'comments': Comment.objects.count(),
+            },
+            'user_id': user.pk,
+            'iterations': options['iterations'],
+            'endpoints': {},
+            'throughput': {},
+        }
+        # The test clients send requests to the host 'testserver'.
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for name, method, url, data in endpoints:
+                    self.stderr.write(f'{method} {name}')
+                    report['endpoints'][f'{method} {name}'] = self.measure(name, method, url, data, options['iterations'])
+        finally:
+            for instance in self.created:
+                instance.delete()
+        self.stderr.write('export/import')
+        report['throughput'] = self.measure_throughput(self.get_board(user), user)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def get_user(self, user_id):
+        User = get_user_model()
+        if user_id is not None:
+            return User.objects.get(pk=user_id)
+        user = User.objects.annotate(boards=Count('member_of_boards')).order_by('-boards').first()
+        if user is None:
+            raise CommandError('There are no users, generate data with generate_kanmind_data first.')
+        return user
+
+    def get_commit(self):
+        try:
+            result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return result.stdout.strip()
+
+    def get_board(self, user):
+        """The biggest board of the user, preferably one they own: the owner may delete the board and its tasks."""
+        boards = Board.objects.annotate(tasks_total=Count('tasks')).order_by('-tasks_total')
+        board = boards.filter(owner=user).first() or boards.filter(pk__in=Board.objects.accessible_to(user)).first()
+        if board is None:
+            raise CommandError(f'User {user.pk} has no boards.')
+        return board
+
+    def get_endpoints(self, user, password):
+        """
+        Returns (name, method, url, data) of every endpoint, on the biggest
+        board of the user, preferably one they own. Names starting with 'async-' use the async client.
+        The comment endpoints need a comment of the user on that board. The
+        job and digest endpoints show the latest job and digest of the user;
+        if there is none, an empty one is created and deleted again after the
+        run. The change feed is left out, it streams until the client disconnects.
+        """
+        board = self.get_board(user)
+        task = board.tasks.annotate(comments_total=Count('comments')).order_by('-comments_total', 'pk').first()
+        if task is None:
+            raise CommandError(f'Board {board.pk} has no tasks.')
+        comment = Comment.objects.filter(author=user, task__board=board).order_by('pk').first()
+        profile = UserProfile.objects.filter(user=user).first()
+        tasks_page = list(board.tasks.order_by('pk').values_list('pk', flat=True)[:10])
+        job = Job.objects.filter(created_by=user).order_by('-pk').first()
+        if job is None:
+            job = Job.objects.create(name='benchmark', status=Job.Status.DONE, created_by=user)
+            self.created.append(job)
+        if not DueDigest.objects.filter(user=user).exists():
+            self.created.append(DueDigest.objects.create(user=user, day=timezone.localdate()))
+
+        endpoints = [
+            ('registration', 'POST', reverse('registration'), lambda: {
+                'fullname': 'Benchmark User', 'email': f'{uuid.uuid4().hex}@example.com',
+                'password': 'benchmark-secret', 'repeated_password': 'benchmark-secret',
+            }),
+            ('login', 'POST', reverse('login'), {'email': user.email, 'password': password}),
+            ('email-check', 'GET', reverse('email-check') + f'?email={user.email}', None),
+            ('userprofile-list', 'GET', reverse('userprofile-list') + '?page_size=50', None),
+            ('board-list-create', 'GET', reverse('board-list-create'), None),
+            ('board-list-create', 'POST', reverse('board-list-create'), {'title': 'Benchmark board'}),
+            ('board-detail', 'GET', reverse('board-detail', args=[board.pk]), None),
+            ('board-detail', 'PATCH', reverse('board-detail', args=[board.pk]), {'title': board.title}),
+            ('board-detail', 'DELETE', reverse('board-detail', args=[board.pk]), None),
+            ('board-activity', 'GET', reverse('board-activity', args=[board.pk]), None),
+            ('board-export', 'GET', reverse('board-export', args=[board.pk]), None),
+            ('task-list-create', 'GET', reverse('task-list-create'), None),
+            ('task-list-create', 'POST', reverse('task-list-create'), {
+                'board': board.pk, 'title': 'Benchmark task', 'status': 'to-do', 'priority': 'medium',
+            }),
+            ('task-detail', 'GET', reverse('task-detail', args=[task.pk]), None),
+            ('task-detail', 'PATCH', reverse('task-detail', args=[task.pk]), {'title': task.title}),
+            ('task-detail', 'DELETE', reverse('task-detail', args=[task.pk]), None),
+            ('tasks-assigned-to-me', 'GET', reverse('tasks-assigned-to-me'), None),
+            ('tasks-reviewing', 'GET', reverse('tasks-reviewing'), None),
+            ('tasks-due', 'GET', reverse('tasks-due'), None),
+            ('tasks-overdue', 'GET', reverse('tasks-overdue'), None),
+            ('due-digest', 'GET', reverse('due-digest'), None),
+            ('task-bulk', 'POST', reverse('task-bulk'), [
+                {'action': 'update', 'id': pk, 'data': {'priority': 'high'}} for pk in tasks_page
+            ]),
+            ('job-detail', 'GET', reverse('job-detail', args=[job.pk]), None),
+            ('sync', 'GET', reverse('sync'), None),
+            ('sync', 'GET', reverse('sync') + f'?since={encode_token(task.updated_at, accessible_board_ids(user))}', None),
+            ('search', 'GET', reverse('search') + '?q=task', None),
+            ('task-comments-list', 'GET', reverse('task-comments-list', args=[task.pk]), None),
+            ('task-comments-list', 'POST', reverse('task-comments-list', args=[task.pk]), {'content': 'Benchmark'}),
+            ('async-board-list', 'GET', reverse('async-board-list'), None),
+            ('async-board-detail', 'GET', reverse('async-board-detail', args=[board.pk]), None),
+            ('async-task-list', 'GET', reverse('async-task-list'), None),
+            ('async-tasks-assigned-to-me', 'GET', reverse('async-tasks-assigned-to-me'), None),
+            ('async-tasks-reviewing', 'GET', reverse('async-tasks-reviewing'), None),
+            ('async-task-comments-list', 'GET', reverse('async-task-comments-list', args=[task.pk]), None),
+        ]
+        if comment is not None:
+            url = reverse('task-comments-detail', args=[comment.task_id, comment.pk])
+            endpoints += [
+                ('task-comments-detail', 'GET', url, None),
+                ('task-comments-detail', 'PATCH', url, {'content': comment.content}),
+                ('task-comments-detail', 'DELETE', url, None),
+            ]
+        if profile is not None:
+            endpoints.append(('userprofile-detail', 'GET', reverse('userprofile-detail', args=[profile.pk]), None))
+        return endpoints
+
+    def request(self, name, method, url, data):
+        """
+        Sends one request. Requests other than GET are rolled back. Streamed
+        responses are read to the end, so their timings cover the whole body.
+        """
+        if callable(data):
+            data = data()
+        if method == 'GET':
+            if name.startswith('async-'):
+                return async_to_sync(self.async_client.get)(url, headers=self.headers)
+            response = self.client.get(url, headers=self.headers)
+            if response.streaming:
+                # The test client closes the response at the end of the body.
+                for _ in response.streaming_content:
+                    pass
+            return response
+        with transaction.atomic():
+            response = self.client.generic(
+                method, url, json.dumps(data) if data is not None else '',
+                content_type='application/json', headers=self.headers,
+            )
+            transaction.set_rollback(True)
+        return response
+
+    def measure(self, name, method, url, data, iterations):
+        """
+        Times the requests after one warm-up request, then repeats one request
+        with the queries captured and memory traced, which would skew the timings.
+        """
+        status = self.request(name, method, url, data).status_code
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            self.request(name, method, url, data)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                self.request(name, method, url, data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'status': status,
+            'p50_ms': round(statistics.median(latencies), 3),
+            'p95_ms': round(latencies[max(int(len(latencies) * 0.95) - 1, 0)], 3),
+            'queries': len(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def measure_throughput(self, board, user):
+        """
+        Exports the board to a temporary file and imports it again as a new
+        board, which is rolled back. Reports rows and bytes per second and the
+        peak memory of both, which should not grow with the size of the board.
+        """
+        with tempfile.TemporaryFile('w+') as file:
+            tracemalloc.start()
+            try:
+                start = time.perf_counter()
+                rows = size = 0
+                with transaction.atomic():
+                    for line in export_board(board):
+                        file.write(line)
+                        rows += 1
+                        size += len(line)
+                export_seconds = time.perf_counter() - start
+                _, export_peak = tracemalloc.get_traced_memory()
+
+                file.seek(0)
+                tracemalloc.reset_peak()
+                start = time.perf_counter()
+                with transaction.atomic():
+                    import_board(file, user)
+                    transaction.set_rollback(True)
+                import_seconds = time.perf_counter() - start
+                _, import_peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        def result(seconds, peak):
+            return {
+                'rows': rows,
+                'seconds': round(seconds, 3),
+                'rows_per_second': round(rows / seconds) if seconds else None,
+                'mb_per_second': round(size / seconds / 2 ** 20, 2) if seconds else None,
+                'peak_memory_kb': round(peak / 1024, 1),
+            }
+
+        return {'export': result(export_seconds, export_peak), 'import': result(import_seconds, import_peak)}
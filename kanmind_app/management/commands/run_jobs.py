@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from kanmind_app import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs background jobs on a pool of threads until stopped. Several '
+        'workers can run side by side, each job is run by one of them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when no job is due.')
+        parser.add_argument('--once', action='store_true', help='Exit as soon as no job is due.')
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        finished = 0
+        last_prune = 0
+        running = set()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            try:
+                while True:
+                    for future in [future for future in running if future.done()]:
+                        running.discard(future)
+                        future.result()
+                        finished += 1
+
+                    claimed = jobs.claim(limit=threads - len(running)) if len(running) < threads else []
+                    for job in claimed:
+                        running.add(pool.submit(self.run_job, job))
+                    if claimed:
+                        continue
+                    if not running and options['once']:
+                        break
+                    if time.monotonic() - last_prune > 3600:
+                        jobs.prune_finished()
+                        last_prune = time.monotonic()
+                    time.sleep(options['poll_interval'] if not running else 0.05)
+            except KeyboardInterrupt:
+                self.stderr.write('Stopping, waiting for the running jobs to finish.')
+            finally:
+                close_old_connections()
+        self.stdout.write(self.style.SUCCESS(f'Ran {finished + len(running)} job(s).'))
+
+    def run_job(self, job):
+        # Every pool thread has its own database connection.
+        try:
+            jobs.run(job)
+        except Exception:
+            # jobs.run() records failures of the job itself, so saving the outcome
+            # failed. The job is run again once it counts as lost.
+            jobs.logger.exception('Could not record the outcome of job %s.', job.pk)
+        finally:
+            close_old_connections()
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_board_stats(apps, schema_editor):
+    Board = apps.get_model('kanmind_app', 'Board')
+    BoardStats = apps.get_model('kanmind_app', 'BoardStats')
+    boards = Board.objects.annotate(
+        ticket_count=Count('tasks', distinct=True),
+        tasks_to_do_count=Count('tasks', filter=Q(tasks__status='to-do'), distinct=True),
+        tasks_high_prio_count=Count('tasks', filter=Q(tasks__priority='high'), distinct=True),
+        member_count=Count('members', distinct=True),
+    )
+    BoardStats.objects.bulk_create(
+        [
+            BoardStats(
+                board_id=board.pk,
+                member_count=board.member_count,
+                ticket_count=board.ticket_count,
+                tasks_to_do_count=board.tasks_to_do_count,
+                tasks_high_prio_count=board.tasks_high_prio_count,
+            )
+            for board in boards.iterator(chunk_size=1000)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanmind_app', '0004_task_created_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardStats',
+            fields=[
+                ('board', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='kanmind_app.board')),
+                ('member_count', models.PositiveIntegerField(default=0)),
+                ('ticket_count', models.PositiveIntegerField(default=0)),
+                ('tasks_to_do_count', models.PositiveIntegerField(default=0)),
+                ('tasks_high_prio_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'board stats',
+            },
+        ),
+        migrations.RunPython(populate_board_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Creates and fills the FTS5 table of kanmind_app.search.SQLiteFTSBackend."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE kanmind_search USING fts5("
+        "kind UNINDEXED, object_id UNINDEXED, task_id UNINDEXED, board_id UNINDEXED, title, body, "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO kanmind_search (rowid, kind, object_id, task_id, board_id, title, body) "
+        "SELECT id * 2, 'task', id, id, board_id, title, description FROM kanmind_app_task"
+    )
+    schema_editor.execute(
+        "INSERT INTO kanmind_search (rowid, kind, object_id, task_id, board_id, title, body) "
+        "SELECT c.id * 2 + 1, 'comment', c.id, c.task_id, t.board_id, '', c.content "
+        "FROM kanmind_app_comment c JOIN kanmind_app_task t ON t.id = c.task_id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS kanmind_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanmind_app', '0007_delta_sync'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanmind_app', '0008_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['board', 'due_date'], name='task_board_due_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:16
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanmind_app', '0009_task_due_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board_id', models.PositiveIntegerField()),
+                ('task_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('verb', models.CharField(choices=[('task.created', 'Task created'), ('task.updated', 'Task updated'), ('task.deleted', 'Task deleted'), ('comment.created', 'Comment created'), ('comment.updated', 'Comment updated'), ('comment.deleted', 'Comment deleted'), ('members.added', 'Members added'), ('members.removed', 'Members removed'), ('summary', 'Summary')], max_length=20)),
+                ('data', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['board_id', 'created_at', 'id'], name='activity_board_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:37
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanmind_app', '0011_background_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DueDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('overdue_count', models.PositiveIntegerField(default=0)),
+                ('due_soon_count', models.PositiveIntegerField(default=0)),
+                ('data', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('assignee__isnull', False), ('due_date__isnull', False), models.Q(('status', 'done'), _negated=True)), fields=['assignee', 'due_date', 'id'], name='task_assignee_open_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='duedigest',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='duedigest',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='duedigest_user_day_unique'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanmind_app', '0012_due_tasks'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tombstone',
+            name='board_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='tombstone',
+            name='object_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-17 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanmind_app', '0013_plain_ids_bigint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activityevent',
+            name='board_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='activityevent',
+            name='task_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,53 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
+
+
+class TaskQuerySet(models.QuerySet):
+    """
+    Shared query helpers for tasks, used by the API views.
+    """
+    USER_FIELDS = ('assignee', 'reviewer')
+
+    def for_api(self, fields=None):
+        """
+        Tasks as rendered by TaskSerializer: assignee and reviewer are joined
+        and the comment count is annotated, so serializing costs no extra queries.
+        The count is a correlated subquery rather than a join with GROUP BY,
+        so the task indexes can also serve the ORDER BY of paginated lists.
+
+        With 'fields', only the columns, joins and annotations those
+        serializer fields need are loaded.
+        """
+        queryset = self
+        users = [name for name in self.USER_FIELDS if fields is None or name in fields]
+        if users:
+            queryset = queryset.select_related(*users)
+        if fields is None or 'comments_count' in fields:
+            comments_count = (
+                Comment.objects.filter(task_id=OuterRef('pk'))
+                .order_by()
+                .values('task_id')
+                .annotate(total=Count('pk'))
+                .values('total')
+            )
+            queryset = queryset.annotate(comments_count=Coalesce(Subquery(comments_count), 0))
+        if fields is not None:
+            columns = {'id'} | {name for name in fields if name not in self.USER_FIELDS and name != 'comments_count'}
+            for name in users:
+                columns |= {f'{name}__id', f'{name}__email', f'{name}__first_name', f'{name}__last_name'}
+            queryset = queryset.only(*columns)
+        return queryset
+
+    def open_with_due_date(self):
+        """
+        Tasks that are not done and have a due date. Filtered by assignee,
+        the partial index task_assignee_open_due_idx serves them.
+        """
+        return self.filter(due_date__isnull=False).exclude(status=Task.Status.DONE)
 
 
 class Task(models.Model):
@@ -56,10 +104,128 @@ class Task(models.Model):
         related_name='reviewed_tasks'
     )
 
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Board counters and status/priority columns of a board.
+            models.Index(fields=['board', 'status'], name='task_board_status_idx'),
+            # Delta sync reads the tasks of a board changed since a point in time.
+            models.Index(fields=['board', 'updated_at'], name='task_board_updated_idx'),
+            # Due date filters of the task lists.
+            models.Index(fields=['board', 'due_date'], name='task_board_due_idx'),
+            models.Index(fields=['board', 'priority'], name='task_board_priority_idx'),
+            # Task lists, board detail and cursor pagination order on (created_at, id).
+            models.Index(fields=['board', 'created_at', 'id'], name='task_board_created_idx'),
+            models.Index(
+                fields=['assignee', 'created_at', 'id'],
+                name='task_assignee_created_idx',
+                condition=Q(assignee__isnull=False),
+            ),
+            models.Index(
+                fields=['reviewer', 'created_at', 'id'],
+                name='task_reviewer_created_idx',
+                condition=Q(reviewer__isnull=False),
+            ),
+            # Due and overdue tasks of a user and the daily digests. Done tasks
+            # and tasks without a due date are left out, which keeps it small.
+            models.Index(
+                fields=['assignee', 'due_date', 'id'],
+                name='task_assignee_open_due_idx',
+                condition=Q(assignee__isnull=False, due_date__isnull=False) & ~Q(status='done'),
+            ),
+        ]
+
+    # Fields whose changes are recorded in the activity log.
+    TRACKED_FIELDS = ('title', 'description', 'status', 'priority', 'due_date', 'board_id', 'assignee_id', 'reviewer_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remembers the loaded tracked fields for the activity log."""
+        instance = super().from_db(db, field_names, values)
+        instance._tracked_snapshot = instance.tracked_values()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        """Takes a new snapshot of the reloaded fields, see from_db()."""
+        super().refresh_from_db(*args, **kwargs)
+        self._tracked_snapshot = {**(getattr(self, '_tracked_snapshot', None) or {}), **self.tracked_values()}
+
+    def tracked_values(self):
+        """Returns the loaded tracked fields; deferred ones are left out."""
+        return {name: self.__dict__[name] for name in self.TRACKED_FIELDS if name in self.__dict__}
+
+    def tracked_changes(self):
+        """
+        Returns {field: [old, new]} for the tracked fields that differ from
+        the last loaded or saved values, with '_id' dropped from the names.
+        """
+        snapshot = getattr(self, '_tracked_snapshot', None) or {}
+        return {
+            name.removesuffix('_id'): [old, value]
+            for name, value in self.tracked_values().items()
+            if name in snapshot and (old := snapshot[name]) != value
+        }
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the task and updates its board counters in one transaction,
+        which also holds the lock on the previous row, see signals.
+        """
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return self.title
     
 
+class BoardQuerySet(models.QuerySet):
+    """
+    Shared query helpers for boards, used by the API views.
+    """
+    def accessible_to(self, user):
+        """
+        Boards the user owns or is a member of. Membership is checked through
+        a subquery on the members table, so no join or DISTINCT is needed.
+        Boards waiting for their deletion job are left out.
+        """
+        member_board_ids = Board.members.through.objects.filter(user=user).values('board_id')
+        return self.filter(Q(owner=user) | Q(pk__in=member_board_ids), pending_deletion=False)
+
+    def with_counts(self):
+        """
+        Annotates the summary counters shown in the board list. The values are
+        read from the denormalized BoardStats row, so this is a single join.
+        """
+        return self.annotate(
+            member_count=Coalesce(F('stats__member_count'), 0),
+            ticket_count=Coalesce(F('stats__ticket_count'), 0),
+            tasks_to_do_count=Coalesce(F('stats__tasks_to_do_count'), 0),
+            tasks_high_prio_count=Coalesce(F('stats__tasks_high_prio_count'), 0),
+        )
+
+    def with_live_counts(self):
+        """
+        Computes the summary counters from the task and member tables in a
+        single query. The member count uses a correlated subquery so it does
+        not multiply the rows of the task join. Used to rebuild BoardStats.
+        """
+        member_count = (
+            Board.members.through.objects
+            .filter(board_id=OuterRef('pk'))
+            .order_by()
+            .values('board_id')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return self.annotate(
+            member_count=Coalesce(Subquery(member_count), 0),
+            ticket_count=Count('tasks'),
+            tasks_to_do_count=Count('tasks', filter=Q(tasks__status=Task.Status.TODO)),
+            tasks_high_prio_count=Count('tasks', filter=Q(tasks__priority=Task.Priority.HIGH)),
+        )
+
+
 class Board(models.Model): 
     """
     Represents a project board that contains a collection of tasks.
@@ -83,10 +249,76 @@ class Board(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Set when a large board is handed to a background job for deletion.
+    # Nobody can access the board from then on.
+    pending_deletion = models.BooleanField(default=False)
+
+    objects = BoardQuerySet.as_manager()
+
     def __str__(self):
         return self.title
     
 
+class BoardStats(models.Model):
+    """
+    Denormalized summary counters of a board, one row per board.
+    Kept up to date incrementally by the signal handlers in kanmind_app.signals
+    and repairable with the 'rebuild_board_stats' management command.
+    """
+    COUNTER_FIELDS = ('member_count', 'ticket_count', 'tasks_to_do_count', 'tasks_high_prio_count')
+
+    board = models.OneToOneField(Board, on_delete=models.CASCADE, related_name='stats', primary_key=True)
+    member_count = models.PositiveIntegerField(default=0)
+    ticket_count = models.PositiveIntegerField(default=0)
+    tasks_to_do_count = models.PositiveIntegerField(default=0)
+    tasks_high_prio_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'board stats'
+
+    def __str__(self):
+        return f'Stats for board {self.board_id}'
+
+    @classmethod
+    def rebuild(cls, board_ids=None, dry_run=False, batch_size=1000):
+        """
+        Recomputes the counters of all (or the given) boards in bulk and
+        repairs rows that drifted or are missing. Returns the ids of the
+        boards whose stored counters were wrong. With dry_run, nothing is written.
+        """
+        boards = Board.objects.all()
+        if board_ids is not None:
+            boards = boards.filter(pk__in=board_ids)
+        boards = boards.with_live_counts().order_by('pk').values('pk', *cls.COUNTER_FIELDS)
+
+        drifted = []
+        last_pk = 0
+        while True:
+            live_rows = list(boards.filter(pk__gt=last_pk)[:batch_size])
+            if not live_rows:
+                break
+            last_pk = live_rows[-1]['pk']
+            stored = cls.objects.in_bulk([row['pk'] for row in live_rows])
+            to_create, to_update = [], []
+            for row in live_rows:
+                live = {name: row[name] for name in cls.COUNTER_FIELDS}
+                stats = stored.get(row['pk'])
+                if stats is None:
+                    to_create.append(cls(board_id=row['pk'], **live))
+                elif any(getattr(stats, name) != value for name, value in live.items()):
+                    for name, value in live.items():
+                        setattr(stats, name, value)
+                    to_update.append(stats)
+                else:
+                    continue
+                drifted.append(row['pk'])
+            if not dry_run:
+                with transaction.atomic():
+                    cls.objects.bulk_create(to_create)
+                    cls.objects.bulk_update(to_update, cls.COUNTER_FIELDS)
+        return drifted
+
+
 class Comment(models.Model):
     """
     Represents a comment made on a specific task.
@@ -104,6 +336,177 @@ class Comment(models.Model):
     )
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Comment threads are listed per task in time order.
+            models.Index(fields=['task', 'created_at', 'id'], name='comment_task_created_idx'),
+            # Delta sync reads the comments changed since a point in time.
+            models.Index(fields=['updated_at'], name='comment_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f'Comment by {self.author.username} on {self.task.title}'
+
+
+class Tombstone(models.Model):
+    """
+    Records a deletion for the delta sync endpoint, which cannot see rows that
+    no longer exist. Written by the signal handlers in kanmind_app.signals.
+
+    Deleted tasks and comments are recorded for their board. Boards are
+    recorded per user, both when they are deleted and when the user loses
+    access to them; the tasks and comments of such a board are not recorded
+    individually. Old tombstones are removed with the 'prune_tombstones'
+    management command.
+    """
+    class Kind(models.TextChoices):
+        BOARD = 'board', 'Board'
+        TASK = 'task', 'Task'
+        COMMENT = 'comment', 'Comment'
+
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    # Plain ids, the board may be gone already. Big like the primary keys they hold.
+    object_id = models.PositiveBigIntegerField()
+    board_id = models.PositiveBigIntegerField()
+    # Set for boards only: the user who can no longer see the board.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['board_id', 'deleted_at'], name='tombstone_board_deleted_idx'),
+            models.Index(
+                fields=['user', 'deleted_at'],
+                name='tombstone_user_deleted_idx',
+                condition=Q(user__isnull=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f'Deleted {self.kind} {self.object_id}'
+
+
+class ActivityEvent(models.Model):
+    """
+    One entry of the activity log of a board: who changed which task,
+    comment or membership and when. The log is append-only; events are
+    written in batches by kanmind_app.activity and only removed by the
+    'compact_activity' management command, which rolls old events up into
+    one summary per board and day.
+    """
+    class Verb(models.TextChoices):
+        TASK_CREATED = 'task.created', 'Task created'
+        TASK_UPDATED = 'task.updated', 'Task updated'
+        TASK_DELETED = 'task.deleted', 'Task deleted'
+        COMMENT_CREATED = 'comment.created', 'Comment created'
+        COMMENT_UPDATED = 'comment.updated', 'Comment updated'
+        COMMENT_DELETED = 'comment.deleted', 'Comment deleted'
+        MEMBERS_ADDED = 'members.added', 'Members added'
+        MEMBERS_REMOVED = 'members.removed', 'Members removed'
+        SUMMARY = 'summary', 'Summary'
+
+    # Plain ids, the history outlives the task. Big like the primary keys they hold.
+    board_id = models.PositiveBigIntegerField()
+    task_id = models.PositiveBigIntegerField(null=True, blank=True)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    verb = models.CharField(max_length=20, choices=Verb.choices)
+    # Task changes as {field: [old, new]}, the ids of comments and members,
+    # or the counts of a summary.
+    data = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    # When the change happened, which is before the event is written.
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # The activity endpoint pages through a board newest first.
+            models.Index(fields=['board_id', 'created_at', 'id'], name='activity_board_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.verb} on board {self.board_id}'
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by the 'run_jobs' worker command.
+    See kanmind_app.jobs.
+    """
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    # Name of a function registered with kanmind_app.jobs.register.
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # Queued jobs are not run before this time; retries are scheduled with it.
+    run_after = models.DateTimeField(default=timezone.now)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers pick the due jobs in order.
+            models.Index(fields=['run_after', 'id'], name='job_queued_idx', condition=Q(status='queued')),
+            # Jobs of crashed workers are found by their start time.
+            models.Index(fields=['started_at'], name='job_running_idx', condition=Q(status='running')),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
+
+
+class DueDigest(models.Model):
+    """
+    The daily digest of a user: their overdue tasks and the tasks due in the
+    next days. Built for all users in batches by the 'build_due_digests'
+    management command; users without such tasks get no digest.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    day = models.DateField()
+    overdue_count = models.PositiveIntegerField(default=0)
+    due_soon_count = models.PositiveIntegerField(default=0)
+    # {'overdue': [...], 'due_soon': [...]}, each a list of task summaries,
+    # cut to the first tasks by due date.
+    data = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='duedigest_user_day_unique'),
+        ]
 
     def __str__(self):
-        return f'Comment by {self.author.username} on {self.task.title}'
\ No newline at end of file
+        return f'Digest of user {self.user_id} for {self.day}'
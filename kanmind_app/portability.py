@@ -0,0 +1,274 @@
+"""
+Export and import of whole boards as NDJSON, one JSON object per line.
+
+An export starts with the board, followed by the users it refers to, the
+tasks and then their comments, each line tagged with its 'type':
+
+    {"type": "board", "version": 1, "id": 3, "title": "Launch", "owner": 7, "created_at": "..."}
+    {"type": "user", "id": 7, "email": "ann@example.com", "first_name": "Ann", "last_name": "", "member": true}
+    {"type": "task", "id": 12, "title": "...", "status": "to-do", ..., "assignee": 7, "reviewer": null}
+    {"type": "comment", "id": 40, "task": 12, "author": 7, "content": "...", ...}
+
+Rows are read with .iterator(chunk_size) and imported with bulk_create in
+batches, so the memory needed does not depend on the size of the board;
+only the map from exported to new task ids grows with it.
+
+Users are exported without credentials and matched by email on import:
+members without an account are left out, assignees, reviewers and creators
+without one are cleared, and comments of authors without one are attributed
+to the owner of the new board. Imported tasks and comments keep their
+creation time; their update time is the time of the import, so delta sync
+clients receive them as changes.
+"""
+import json
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import search
+from .models import Board, BoardStats, Comment, Task
+
+FORMAT_VERSION = 1
+
+TASK_FIELDS = (
+    'id', 'title', 'description', 'status', 'priority', 'due_date',
+    'created_by_id', 'assignee_id', 'reviewer_id', 'created_at', 'updated_at',
+)
+COMMENT_FIELDS = ('id', 'task_id', 'author_id', 'content', 'created_at', 'updated_at')
+STATUSES, PRIORITIES = frozenset(Task.Status.values), frozenset(Task.Priority.values)
+
+
+class InvalidExport(ValueError):
+    pass
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    """Keeps the microseconds of datetimes, which DjangoJSONEncoder cuts to milliseconds."""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def export_board(board, chunk_size=2000):
+    """
+    Yields the lines of the export of a board, each ending with a newline.
+    Run it in a transaction for a consistent snapshot of a board that is
+    being changed; the importer skips comments whose task is missing.
+    """
+    encoder = ExportEncoder()
+    tasks = Task.objects.filter(board=board)
+    comments = Comment.objects.filter(task__board=board)
+
+    yield _line(encoder, 'board', {
+        'version': FORMAT_VERSION, 'id': board.pk, 'title': board.title,
+        'owner': board.owner_id, 'created_at': board.created_at,
+    })
+
+    member_ids = set(Board.members.through.objects.filter(board=board).values_list('user_id', flat=True))
+    users = get_user_model().objects.filter(
+        Q(pk=board.owner_id)
+        | Q(pk__in=member_ids)
+        | Q(pk__in=tasks.values('created_by_id'))
+        | Q(pk__in=tasks.values('assignee_id'))
+        | Q(pk__in=tasks.values('reviewer_id'))
+        | Q(pk__in=comments.values('author_id'))
+    )
+    for pk, email, first_name, last_name in (
+        users.order_by('pk').values_list('pk', 'email', 'first_name', 'last_name').iterator(chunk_size=chunk_size)
+    ):
+        yield _line(encoder, 'user', {
+            'id': pk, 'email': email, 'first_name': first_name, 'last_name': last_name, 'member': pk in member_ids,
+        })
+
+    for kind, queryset, fields, ordering in (
+        ('task', tasks, TASK_FIELDS, ('id',)),
+        ('comment', comments, COMMENT_FIELDS, ('task_id', 'created_at', 'id')),
+    ):
+        keys = [name.removesuffix('_id') for name in fields]
+        for values in queryset.order_by(*ordering).values_list(*fields).iterator(chunk_size=chunk_size):
+            yield _line(encoder, kind, dict(zip(keys, values)))
+
+
+def _line(encoder, kind, data):
+    return encoder.encode({'type': kind, **data}) + '\n'
+
+
+def import_board(lines, owner, title=None, batch_size=1000):
+    """
+    Creates a new board owned by 'owner' from the lines of an export, which
+    are read one by one. Returns the board and the number of imported rows
+    per type. Runs in one transaction, so an invalid export (InvalidExport)
+    leaves nothing behind.
+
+    bulk_create skips the signal handlers, so the board counters and the
+    search index are updated here.
+    """
+    rows = _parse(lines)
+    header = next(rows, None)
+    if header is None or header.get('type') != 'board':
+        raise InvalidExport('An export starts with the board.')
+    if header.get('version') != FORMAT_VERSION:
+        raise InvalidExport(f"Unsupported export version {header.get('version')!r}.")
+
+    importer = _Importer(owner, batch_size)
+    with transaction.atomic():
+        importer.board = Board.objects.create(title=title or header.get('title') or 'Imported board', owner=owner)
+        for row in rows:
+            importer.add(row)
+        importer.flush()
+        BoardStats.rebuild(board_ids=[importer.board.pk])
+    return importer.board, importer.counts
+
+
+def _parse(lines):
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise InvalidExport(f'Line {number} is not valid JSON.')
+        if not isinstance(row, dict):
+            raise InvalidExport(f'Line {number} is not a JSON object.')
+        row['_line'] = number
+        yield row
+
+
+class _Importer:
+    """Collects the rows of an export in order and writes them in batches."""
+    # Sections in the order they appear in an export.
+    ORDER = ('user', 'task', 'comment')
+
+    def __init__(self, owner, batch_size):
+        self.owner = owner
+        self.batch_size = batch_size
+        self.board = None
+        self.section = 0
+        self.users = {}
+        self.user_rows = []
+        self.members = []
+        self.task_ids = {}
+        self.pending = []
+        self.counts = {'members': 0, 'tasks': 0, 'comments': 0, 'unknown_users': 0, 'skipped_comments': 0}
+        self.search = search.get_backend()
+
+    def add(self, row):
+        kind = row.get('type')
+        if kind not in self.ORDER:
+            raise InvalidExport(f"Line {row['_line']} has the unknown type {kind!r}.")
+        section = self.ORDER.index(kind)
+        if section < self.section:
+            raise InvalidExport(f"Line {row['_line']}: a {kind} row must come before the {self.ORDER[self.section]} rows.")
+        if section > self.section:
+            self.flush()
+            self.section = section
+        try:
+            getattr(self, f'add_{kind}')(row)
+        except (KeyError, TypeError, ValueError) as error:
+            raise InvalidExport(f"Line {row['_line']} is not a valid {kind}: {error!r}.")
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.section == 0:
+            self.resolve_users()
+        elif self.pending:
+            getattr(self, f'write_{self.ORDER[self.section]}s')(self.pending)
+        self.pending = []
+
+    def add_user(self, row):
+        self.user_rows.append((int(row['id']), str(row['email']), bool(row.get('member'))))
+
+    def resolve_users(self):
+        """Maps the exported users to accounts with the same email and adds the members."""
+        rows, self.user_rows = self.user_rows, []
+        User = get_user_model()
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            accounts = dict(
+                User.objects.filter(email__in=[email for _, email, _ in batch])
+                .order_by('-pk')
+                .values_list('email', 'pk')
+            )
+            for exported_id, email, member in batch:
+                self.users[exported_id] = accounts.get(email)
+                if accounts.get(email) is None:
+                    self.counts['unknown_users'] += 1
+                elif member:
+                    self.members.append(accounts[email])
+        if self.members:
+            self.board.members.add(*self.members)
+            self.counts['members'] = len(self.members)
+
+    def user(self, exported_id):
+        return None if exported_id is None else self.users.get(exported_id)
+
+    def add_task(self, row):
+        status, priority = row.get('status', Task.Status.TODO), row.get('priority', Task.Priority.MEDIUM)
+        if status not in STATUSES or priority not in PRIORITIES:
+            raise ValueError('unknown status or priority')
+        due_date = row.get('due_date')
+        task = Task(
+            board=self.board,
+            title=str(row['title'])[:Task._meta.get_field('title').max_length],
+            description=row.get('description') or '',
+            status=status,
+            priority=priority,
+            due_date=parse_date(due_date) if due_date else None,
+            created_by_id=self.user(row.get('created_by')),
+            assignee_id=self.user(row.get('assignee')),
+            reviewer_id=self.user(row.get('reviewer')),
+        )
+        self.pending.append((int(row['id']), task, _parse_datetime(row.get('created_at'))))
+
+    def write_tasks(self, rows):
+        tasks = Task.objects.bulk_create([task for _, task, _ in rows])
+        for exported_id, task, _ in rows:
+            self.task_ids[exported_id] = task.pk
+        self.restore_created_at(Task, rows)
+        self.search.index_tasks(tasks)
+        self.counts['tasks'] += len(tasks)
+
+    def add_comment(self, row):
+        task_id = self.task_ids.get(row['task'])
+        if task_id is None:
+            self.counts['skipped_comments'] += 1
+            return
+        comment = Comment(
+            task_id=task_id,
+            author_id=self.user(row.get('author')) or self.owner.pk,
+            content=str(row['content']),
+        )
+        self.pending.append((int(row['id']), comment, _parse_datetime(row.get('created_at'))))
+
+    def write_comments(self, rows):
+        comments = Comment.objects.bulk_create([comment for _, comment, _ in rows])
+        self.restore_created_at(Comment, rows)
+        self.search.index_comments(comments, self.board.pk)
+        self.counts['comments'] += len(comments)
+
+    def restore_created_at(self, model, rows):
+        """
+        bulk_create sets created_at to now (auto_now_add), so the exported
+        times are written afterwards, with one prepared UPDATE by primary key.
+        """
+        adapt = connection.ops.adapt_datetimefield_value
+        params = [(adapt(created_at), instance.pk) for _, instance, created_at in rows if created_at is not None]
+        with connection.cursor() as cursor:
+            cursor.executemany(f'UPDATE {model._meta.db_table} SET created_at = %s WHERE id = %s', params)
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(f'invalid date and time {value!r}')
+    return moment
+
@@ -0,0 +1,114 @@
+"""
+Read replica routing.
+
+Views that only read and tolerate slightly stale data declare it with a
+'read_replica' attribute (or the reads_from_replica decorator for function
+views). For their GET and HEAD requests ReadReplicaMiddleware turns on replica
+reads, and ReadReplicaRouter then sends the queries on kanmind_app models to
+the database alias in the KANMIND_READ_REPLICA setting. Everything else reads
+from the primary:
+
+- requests to other views, and all other methods,
+- the tables of other apps, so tokens and users are always current,
+- reads inside a transaction, or after the request wrote anything,
+- code wrapped in primary_reads(), e.g. data that is cached across requests.
+
+Without KANMIND_READ_REPLICA the middleware removes itself at startup and
+the router leaves every query on the default database.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_replica_reads = ContextVar('kanmind_replica_reads', default=False)
+
+
+def replica_alias():
+    return getattr(settings, 'KANMIND_READ_REPLICA', None)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Turns replica reads on (or off) for the enclosed code."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def primary_reads():
+    return replica_reads(False)
+
+
+def reads_from_replica(view):
+    """Marks a function view as safe to serve from the replica."""
+    view.read_replica = True
+    return view
+
+
+class ReadReplicaRouter:
+    app_labels = {'kanmind_app'}
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if (
+            alias
+            and _replica_reads.get()
+            and model._meta.app_label in self.app_labels
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Later reads of the request must see the write.
+        _replica_reads.set(False)
+        return None
+
+
+class ReadReplicaMiddleware:
+    """Works in both the sync and the async handler, see ActivityMiddleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_alias():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # A sync process_view would be run in a thread by the async handler.
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _replica_reads.set(False)
+        try:
+            return self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+
+    async def __acall__(self, request):
+        token = _replica_reads.set(False)
+        try:
+            return await self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _enable_for_view(request, view_func)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        _enable_for_view(request, view_func)
+
+
+def _enable_for_view(request, view_func):
+    view = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None) or view_func
+    if request.method in ('GET', 'HEAD') and getattr(view, 'read_replica', False):
+        _replica_reads.set(True)
@@ -0,0 +1,200 @@
+"""
+Versioned cache for rendered board responses.
+
+Entries are keyed by board id, board version and serializer variant. The
+version of a board is bumped by the signal handlers in kanmind_app.signals on
+every write to the board, its tasks, its members or its comments, and again
+once the write has committed, so stale entries are never read again and
+simply age out of the backend. Entries and versions expire after the
+backend's timeout.
+
+Versions are kept in the default cache, so a write in one process only
+reaches the others if that cache is shared by all of them. The response
+cache is therefore disabled unless it is, see kanmind_app.access.shared_cache()
+and the KANMIND_SHARED_CACHE setting; set that to True for a deployment
+with a single process.
+
+The backend is configured with the KANMIND_RESPONSE_CACHE setting:
+
+    KANMIND_RESPONSE_CACHE = {
+        'BACKEND': 'kanmind_app.response_cache.LRUMemoryBackend',
+        'OPTIONS': {'max_bytes': 32 * 1024 * 1024, 'timeout': 300},
+    }
+
+Set it to None to disable the cache. DjangoCacheBackend stores the entries in
+one of Django's cache aliases instead, e.g. a shared Redis cache.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .access import shared_cache
+
+
+class LRUMemoryBackend:
+    """
+    In-process cache of byte strings with least-recently-used eviction, a
+    cap on the total size of the stored values and a timeout in seconds.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, timeout=300):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self.entries[key]
+                self.size -= len(entry[1])
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'bytes': self.size,
+        }
+
+
+class DjangoCacheBackend:
+    """Stores the entries in a Django cache alias. Hit and miss counters are per process."""
+
+    def __init__(self, alias='default', timeout=300):
+        self.cache = caches[alias]
+        self.timeout = timeout
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        value = self.cache.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def get_backend():
+    """
+    Returns the configured backend, or None if the response cache is
+    disabled or the board versions would not be shared by all processes.
+    """
+    if not shared_cache():
+        return None
+    return _load_backend()
+
+
+@lru_cache(maxsize=None)
+def _load_backend():
+    config = getattr(settings, 'KANMIND_RESPONSE_CACHE', None)
+    if not config:
+        return None
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    if setting == 'KANMIND_RESPONSE_CACHE':
+        _load_backend.cache_clear()
+
+
+def _board_version_key(board_id):
+    return f'board-version:{board_id}'
+
+
+def board_version(board_id):
+    """Returns the current version of a board, starting a new one if none is known."""
+    key = _board_version_key(board_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.set(key, version, get_backend().timeout)
+    return version
+
+
+def bump_board_versions(board_ids):
+    """
+    Marks the cached responses of the given boards as stale, now and once
+    the current transaction has committed: a response rendered in between
+    still shows the data from before the commit.
+    """
+    keys = [_board_version_key(board_id) for board_id in set(board_ids) if board_id is not None]
+    backend = get_backend()
+    if not keys or backend is None:
+        return
+
+    def bump():
+        version = time.time_ns()
+        cache.set_many({key: version for key in keys}, backend.timeout)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def get_board_response(board_id, variant):
+    """Returns the cached response body of a board, or None."""
+    backend = get_backend()
+    if backend is None:
+        return None
+    return backend.get(f'board:{board_id}:{board_version(board_id)}:{variant}')
+
+
+def set_board_response(board_id, variant, content, version):
+    """Stores a response body rendered at the given board version."""
+    backend = get_backend()
+    if backend is not None:
+        backend.set(f'board:{board_id}:{version}:{variant}', content)
+
+
+def stats():
+    """Returns the hit/miss counters of the backend, or None if it is disabled."""
+    backend = get_backend()
+    return backend.stats() if backend is not None else None
@@ -0,0 +1,217 @@
+"""
+Full-text search over task titles, task descriptions and comments.
+
+The backend is configured with the KANMIND_SEARCH_BACKEND setting (an import
+path). SQLiteFTSBackend keeps an FTS5 table (created by migration 0008) in
+sync with the signal handlers in kanmind_app.signals and ranks matches with
+bm25. DatabaseBackend needs no index and works on any database, but scans
+the task and comment tables and orders by recency only; deployments on
+other databases can plug in a backend for their own full-text engine that
+implements the same methods.
+
+The index can be rebuilt with the 'rebuild_search_index' management command.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import checks
+from django.core.signals import setting_changed
+from django.db import connection, connections, router, transaction
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import Comment, Task
+
+TASK, COMMENT = 'task', 'comment'
+
+
+def _terms(query):
+    return re.findall(r'\w+', query)
+
+
+class SQLiteFTSBackend:
+    """
+    Index in an FTS5 virtual table with one row per task and comment.
+
+    The rowid encodes the kind and primary key, so rows are updated and
+    removed by rowid instead of scanning the unindexed columns.
+    """
+    table = 'kanmind_search'
+
+    @staticmethod
+    def rowid(kind, pk):
+        return pk * 2 + (kind == COMMENT)
+
+    def index_tasks(self, tasks):
+        self._replace(
+            (self.rowid(TASK, task.pk), TASK, task.pk, task.pk, task.board_id, task.title, task.description)
+            for task in tasks
+        )
+
+    def index_comment(self, comment, board_id):
+        self.index_comments([comment], board_id)
+
+    def index_comments(self, comments, board_id):
+        """Indexes comments on tasks of the same board."""
+        self._replace(
+            (self.rowid(COMMENT, comment.pk), COMMENT, comment.pk, comment.task_id, board_id, '', comment.content)
+            for comment in comments
+        )
+
+    def move_comments(self, task_id, board_id):
+        """Moves the comments of a task that changed its board."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {self.table} SET board_id = %s '
+                f'WHERE rowid IN (SELECT id * 2 + 1 FROM {Comment._meta.db_table} WHERE task_id = %s)',
+                [board_id, task_id],
+            )
+
+    def remove(self, kind, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [self.rowid(kind, pk)])
+
+    def search(self, query, board_ids, limit, offset=0):
+        """
+        Returns up to 'limit' matches on the given boards, best first, as dicts
+        with kind, id, task, board, snippet and score (lower is better).
+        All terms must match; the last one also matches as a prefix.
+        """
+        terms = _terms(query)
+        if not terms or not board_ids:
+            return []
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        placeholders = ', '.join(['%s'] * len(board_ids))
+        # Routed like the task table, so views reading from the replica search it too.
+        with connections[router.db_for_read(Task)].cursor() as cursor:
+            cursor.execute(
+                f"SELECT kind, object_id, task_id, board_id, "
+                f"snippet({self.table}, -1, '[', ']', '...', 12), "
+                f"bm25({self.table}, 0, 0, 0, 0, 10.0, 1.0) AS score "
+                f"FROM {self.table} WHERE {self.table} MATCH %s AND board_id IN ({placeholders}) "
+                f"ORDER BY score LIMIT %s OFFSET %s",
+                [match, *board_ids, limit, offset],
+            )
+            columns = ('kind', 'id', 'task', 'board', 'snippet', 'score')
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def rebuild(self, batch_size=1000):
+        """
+        Re-indexes all tasks and comments in one transaction, so searches keep
+        using the old index until it completes. Returns the number of indexed rows.
+        """
+        tasks = Task.objects.only('board_id', 'title', 'description')
+        comments = Comment.objects.values_list('pk', 'task_id', 'task__board_id', 'content')
+        total = 0
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {self.table}')
+            for batch in _batches(tasks, batch_size):
+                self.index_tasks(batch)
+                total += len(batch)
+            for batch in _batches(comments, batch_size):
+                self._replace(
+                    (self.rowid(COMMENT, pk), COMMENT, pk, task_id, board_id, '', content)
+                    for pk, task_id, board_id, content in batch
+                )
+                total += len(batch)
+        return total
+
+    def _replace(self, rows):
+        rows = list(rows)
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, kind, object_id, task_id, board_id, title, body) '
+                f'VALUES (%s, %s, %s, %s, %s, %s, %s)',
+                rows,
+            )
+
+
+class DatabaseBackend:
+    """Searches the task and comment tables directly, newest first. Keeps no index."""
+
+    def index_tasks(self, tasks):
+        pass
+
+    def index_comment(self, comment, board_id):
+        pass
+
+    def index_comments(self, comments, board_id):
+        pass
+
+    def move_comments(self, task_id, board_id):
+        pass
+
+    def remove(self, kind, pk):
+        pass
+
+    def search(self, query, board_ids, limit, offset=0):
+        terms = _terms(query)
+        if not terms or not board_ids:
+            return []
+        task_filter, comment_filter = Q(), Q()
+        for term in terms:
+            task_filter &= Q(title__icontains=term) | Q(description__icontains=term)
+            comment_filter &= Q(content__icontains=term)
+
+        end = offset + limit
+        tasks = (
+            Task.objects.filter(task_filter, board_id__in=board_ids)
+            .order_by('-updated_at')
+            .values_list('updated_at', 'pk', 'board_id', 'title')[:end]
+        )
+        comments = (
+            Comment.objects.filter(comment_filter, task__board_id__in=board_ids)
+            .order_by('-updated_at')
+            .values_list('updated_at', 'pk', 'task_id', 'task__board_id', 'content')[:end]
+        )
+        hits = [(updated_at, TASK, pk, pk, board_id, title) for updated_at, pk, board_id, title in tasks]
+        hits += [(updated_at, COMMENT, pk, task_id, board_id, content) for updated_at, pk, task_id, board_id, content in comments]
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [
+            {'kind': kind, 'id': pk, 'task': task_id, 'board': board_id, 'snippet': text[:200], 'score': None}
+            for _, kind, pk, task_id, board_id, text in hits[offset:end]
+        ]
+
+    def rebuild(self, batch_size=1000):
+        return 0
+
+
+def _batches(queryset, batch_size):
+    """Yields lists of rows in primary key order, paging with the last seen key."""
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+        last_pk = last[0] if isinstance(last, tuple) else last.pk
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(getattr(settings, 'KANMIND_SEARCH_BACKEND', 'kanmind_app.search.SQLiteFTSBackend'))()
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    if setting == 'KANMIND_SEARCH_BACKEND':
+        get_backend.cache_clear()
+
+
+@checks.register()
+def check_backend(app_configs, **kwargs):
+    """The FTS5 table of SQLiteFTSBackend only exists on SQLite (see migration 0008)."""
+    backend = getattr(settings, 'KANMIND_SEARCH_BACKEND', 'kanmind_app.search.SQLiteFTSBackend')
+    engine = settings.DATABASES['default']['ENGINE']
+    if backend.endswith('.SQLiteFTSBackend') and engine != 'django.db.backends.sqlite3':
+        return [checks.Error(
+            f'SQLiteFTSBackend needs SQLite, but the database engine is {engine}.',
+            hint="Set KANMIND_SEARCH_BACKEND to 'kanmind_app.search.DatabaseBackend'.",
+            id='kanmind_app.E001',
+        )]
+    return []
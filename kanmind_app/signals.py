@@ -0,0 +1,284 @@
+from collections import defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import activity, search
+from .access import invalidate_accessible_boards, invalidate_board_access
+from .feed import comment_data, publish_on_commit, task_data
+from .models import ActivityEvent, Board, BoardStats, Comment, Task, Tombstone
+from .response_cache import bump_board_versions
+
+
+def _task_counters(values):
+    """Returns the (board_id, counter deltas) a task with the given values contributes."""
+    board_id, status, priority = values
+    return board_id, {
+        'ticket_count': 1,
+        'tasks_to_do_count': int(status == Task.Status.TODO),
+        'tasks_high_prio_count': int(priority == Task.Priority.HIGH),
+    }
+
+
+def _apply_deltas(deltas):
+    """Applies counter deltas per board with one UPDATE per affected board."""
+    for board_id, counters in deltas.items():
+        changes = {name: F(name) + value for name, value in counters.items() if value}
+        if changes:
+            BoardStats.objects.filter(board_id=board_id).update(**changes)
+
+
+def _deleted_with(origin, *models):
+    """True if a delete started at an instance or queryset of one of the models."""
+    return isinstance(origin, models) or getattr(origin, 'model', None) in models
+
+
+def _add(deltas, values, sign):
+    board_id, counters = _task_counters(values)
+    for name, value in counters.items():
+        deltas[board_id][name] += sign * value
+
+
+@receiver(post_save, sender=Board)
+def create_board_stats(sender, instance, created, raw=False, **kwargs):
+    """Every new board gets an empty counters row."""
+    if created and not raw:
+        BoardStats.objects.get_or_create(board=instance)
+
+
+@receiver(pre_save, sender=Task)
+def remember_previous_values(sender, instance, raw=False, **kwargs):
+    """
+    Reads the previous board, status and priority of an updated task, for
+    the counter deltas, together with the tracked fields that were not
+    loaded, for the activity log. The row is read and locked inside the
+    transaction of the save (see Task.save()): values remembered when the
+    task was loaded may have been changed by another request since, and
+    moving the task out of them would make the counters drift.
+    """
+    if raw or instance._state.adding:
+        return
+    snapshot = getattr(instance, '_tracked_snapshot', None) or {}
+    missing = [name for name in Task.TRACKED_FIELDS if name not in snapshot]
+    previous = (
+        Task.objects.select_for_update()
+        .filter(pk=instance.pk)
+        .values('board_id', 'status', 'priority', *missing)
+        .first()
+    )
+    if previous is None:
+        instance._previous_counters = None
+        return
+    instance._previous_counters = (previous['board_id'], previous['status'], previous['priority'])
+    instance._tracked_snapshot = {**snapshot, **{name: previous[name] for name in missing}}
+
+
+@receiver(post_save, sender=Task)
+def update_board_on_task_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Adds the task to its board counters, moving it out of the old values on
+    updates, marks the cached responses of the old and new board stale,
+    publishes the change to the board's change feed and records it in the
+    activity log.
+    """
+    if raw:
+        return
+    current = (instance.board_id, instance.status, instance.priority)
+    previous = None if created else getattr(instance, '_previous_counters', None)
+    previous_board_id = previous[0] if previous else None
+    bump_board_versions([instance.board_id, previous_board_id])
+
+    publish_on_commit(instance.board_id, 'task.created' if created else 'task.updated', lambda: task_data(instance))
+    if created:
+        activity.record(instance.board_id, ActivityEvent.Verb.TASK_CREATED, instance.pk, {'title': instance.title})
+    else:
+        activity.record_task_changes(instance, previous_board_id)
+    instance._tracked_snapshot = instance.tracked_values()
+    search_backend = search.get_backend()
+    search_backend.index_tasks([instance])
+    if previous_board_id not in (None, instance.board_id):
+        publish_on_commit(previous_board_id, 'task.deleted', lambda: {'id': instance.pk})
+        Tombstone.objects.create(kind=Tombstone.Kind.TASK, object_id=instance.pk, board_id=previous_board_id)
+        search_backend.move_comments(instance.pk, instance.board_id)
+        # Delta sync sends the comments to the members of the new board.
+        Comment.objects.filter(task_id=instance.pk).update(updated_at=timezone.now())
+
+    if previous != current:
+        deltas = defaultdict(lambda: defaultdict(int))
+        if previous is not None:
+            _add(deltas, previous, -1)
+        _add(deltas, current, 1)
+        _apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=Task)
+def update_board_on_task_delete(sender, instance, origin=None, **kwargs):
+    """
+    Removes a deleted task from its board counters, cached responses and feed.
+    Only tasks deleted on their own get a tombstone, see Tombstone.
+    """
+    bump_board_versions([instance.board_id])
+    publish_on_commit(instance.board_id, 'task.deleted', lambda: {'id': instance.pk})
+    search.get_backend().remove(search.TASK, instance.pk)
+    if _deleted_with(origin, Task):
+        Tombstone.objects.create(kind=Tombstone.Kind.TASK, object_id=instance.pk, board_id=instance.board_id)
+        activity.record(instance.board_id, ActivityEvent.Verb.TASK_DELETED, instance.pk, {'title': instance.title})
+    deltas = defaultdict(lambda: defaultdict(int))
+    _add(deltas, (instance.board_id, instance.status, instance.priority), -1)
+    _apply_deltas(deltas)
+
+
+def _touch_task(task_id):
+    """The comment count is part of a task, so comment changes are recorded on the task."""
+    Task.objects.filter(pk=task_id).update(updated_at=timezone.now())
+
+
+def _comment_board_id(comment):
+    if Comment.task.is_cached(comment):
+        return comment.task.board_id
+    return Task.objects.filter(pk=comment.task_id).values_list('board_id', flat=True).first()
+
+
+@receiver(post_save, sender=Comment)
+def update_board_on_comment_save(sender, instance, created, raw=False, **kwargs):
+    """Marks the cached responses of the comment's board stale and publishes the comment."""
+    if raw:
+        return
+    board_id = _comment_board_id(instance)
+    bump_board_versions([board_id])
+    publish_on_commit(board_id, 'comment.created' if created else 'comment.updated', lambda: comment_data(instance))
+    if created:
+        _touch_task(instance.task_id)
+    if board_id is not None:
+        search.get_backend().index_comment(instance, board_id)
+        verb = ActivityEvent.Verb.COMMENT_CREATED if created else ActivityEvent.Verb.COMMENT_UPDATED
+        activity.record(board_id, verb, instance.task_id, {'comment': instance.pk})
+
+
+@receiver(post_delete, sender=Comment)
+def update_board_on_comment_delete(sender, instance, origin=None, **kwargs):
+    """
+    Marks the cached responses of the comment's board stale. Comments deleted
+    along with their task or board are covered by the handlers of those,
+    except for the search index, which has a row per comment.
+    """
+    search.get_backend().remove(search.COMMENT, instance.pk)
+    if not _deleted_with(origin, Task, Board):
+        board_id = _comment_board_id(instance)
+        bump_board_versions([board_id])
+        publish_on_commit(board_id, 'comment.deleted', lambda: {'id': instance.pk, 'task': instance.task_id})
+        if board_id is not None:
+            _touch_task(instance.task_id)
+            Tombstone.objects.create(kind=Tombstone.Kind.COMMENT, object_id=instance.pk, board_id=board_id)
+            activity.record(board_id, ActivityEvent.Verb.COMMENT_DELETED, instance.task_id, {'comment': instance.pk})
+
+
+@receiver(pre_save, sender=Board)
+def remember_board_owner(sender, instance, raw=False, **kwargs):
+    """Remembers the previous owner, whose accessible boards change with a new owner."""
+    if raw or instance._state.adding:
+        return
+    instance._previous_owner_id = (
+        Board.objects.filter(pk=instance.pk).values_list('owner_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Board)
+def invalidate_access_on_board_save(sender, instance, created, raw=False, **kwargs):
+    """The owner may have changed, so the cached access data of the board and both owners is dropped."""
+    if raw:
+        return
+    previous_owner_id = getattr(instance, '_previous_owner_id', None)
+    owner_ids = {instance.owner_id, previous_owner_id} - {None}
+    invalidate_accessible_boards(owner_ids)
+    if previous_owner_id not in (None, instance.owner_id):
+        _board_removed_for(instance.pk, [previous_owner_id])
+    if not created:
+        invalidate_board_access([instance.pk])
+        bump_board_versions([instance.pk])
+        publish_on_commit(instance.pk, 'board.updated', lambda: {
+            'id': instance.pk, 'title': instance.title, 'owner_id': instance.owner_id,
+        })
+
+
+@receiver(pre_delete, sender=Board)
+def remember_board_users(sender, instance, **kwargs):
+    """The member rows are deleted without m2m signals, so the users are collected beforehand."""
+    instance._user_ids = set(
+        Board.members.through.objects.filter(board=instance).values_list('user_id', flat=True)
+    )
+    instance._user_ids.add(instance.owner_id)
+
+
+def _board_removed_for(board_id, user_ids):
+    """Writes board tombstones for the users who can no longer access the board."""
+    owner_id = Board.objects.filter(pk=board_id).values_list('owner_id', flat=True).first()
+    members = set(Board.members.through.objects.filter(board_id=board_id).values_list('user_id', flat=True))
+    Tombstone.objects.bulk_create([
+        Tombstone(kind=Tombstone.Kind.BOARD, object_id=board_id, board_id=board_id, user_id=user_id)
+        for user_id in user_ids
+        if user_id != owner_id and user_id not in members
+    ])
+
+
+@receiver(post_delete, sender=Board)
+def invalidate_access_on_board_delete(sender, instance, **kwargs):
+    user_ids = getattr(instance, '_user_ids', [instance.owner_id])
+    invalidate_accessible_boards(user_ids)
+    _board_removed_for(instance.pk, user_ids)
+    invalidate_board_access([instance.pk])
+    bump_board_versions([instance.pk])
+    publish_on_commit(instance.pk, 'board.deleted', lambda: {'id': instance.pk})
+
+
+@receiver(m2m_changed, sender=Board.members.through)
+def update_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Recounts the members of every affected board after the membership changed,
+    drops the cached access data of the affected boards and users and records
+    the change in the activity log of the boards.
+    Handles both board.members and user.member_of_boards.
+    """
+    if action == 'pre_clear':
+        # The affected rows are not passed to post_clear, so they are collected here.
+        if reverse:
+            instance._cleared_ids = list(sender.objects.filter(user=instance).values_list('board_id', flat=True))
+        else:
+            instance._cleared_ids = list(sender.objects.filter(board=instance).values_list('user_id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    changed_ids = getattr(instance, '_cleared_ids', []) if action == 'post_clear' else list(pk_set or [])
+    if reverse:
+        board_ids, user_ids = changed_ids, [instance.pk]
+    else:
+        board_ids, user_ids = [instance.pk], changed_ids
+
+    member_count = (
+        sender.objects.filter(board_id=OuterRef('board_id'))
+        .order_by()
+        .values('board_id')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    BoardStats.objects.filter(board_id__in=board_ids).update(
+        member_count=Coalesce(Subquery(member_count), 0)
+    )
+    # Members have no timestamp of their own, so the change is recorded on the board.
+    Board.objects.filter(pk__in=board_ids).update(updated_at=timezone.now())
+    invalidate_board_access(board_ids)
+    invalidate_accessible_boards(user_ids)
+    bump_board_versions(board_ids)
+    if action != 'post_add':
+        for board_id in board_ids:
+            _board_removed_for(board_id, user_ids)
+
+    event_type = 'members.added' if action == 'post_add' else 'members.removed'
+    for board_id in board_ids:
+        publish_on_commit(board_id, event_type, lambda: {'user_ids': sorted(user_ids)})
+        if user_ids:
+            activity.record(board_id, event_type, data={'users': sorted(user_ids)})
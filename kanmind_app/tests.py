@@ -1,3 +1,1880 @@
-from django.test import TestCase
+import json
+import re
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from urllib.parse import urlsplit
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import activity, jobs, response_cache, search
+from .access import accessible_board_ids, can_access_board
+from .feed import get_hub
+from .instrumentation import QueryBudgetExceeded, reset_route_stats, route_stats
+from .api.pagination import KeysetCursorPagination
+from .api.streaming import stream_board_changes
+from .api.views import BoardDetailView, BoardExportView, TaskBulkView
+from .models import ActivityEvent, Board, BoardStats, Comment, DueDigest, Job, Task
+from .portability import InvalidExport, import_board
+from .replicas import ReadReplicaRouter, replica_reads
+from .sync import encode_token
+
+
+@override_settings(KANMIND_INSTRUMENTATION={'ENABLED': True, 'LOG': False, 'RAISE_ON_BUDGET': True})
+class KanmindTestCase(TestCase):
+    """
+    Base test case with a logged-in owner and helpers to build boards.
+    Every API request of the tests is checked against the query budget of its view.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='owner@example.com', email='owner@example.com', password='secret'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_board(self, title='Board', members=(), tasks=0, **task_kwargs):
+        board = Board.objects.create(title=title, owner=self.user)
+        board.members.add(self.user, *members)
+        for i in range(tasks):
+            Task.objects.create(board=board, title=f'Task {i}', created_by=self.user, **task_kwargs)
+        return board
+
+
+class BoardListTests(KanmindTestCase):
+
+    def test_board_list_counters(self):
+        other = User.objects.create_user(username='member@example.com', password='secret')
+        board = self.create_board(members=[other])
+        Task.objects.create(board=board, title='a', status=Task.Status.TODO, priority=Task.Priority.HIGH)
+        Task.objects.create(board=board, title='b', status=Task.Status.DONE, priority=Task.Priority.HIGH)
+        Task.objects.create(board=board, title='c', status=Task.Status.TODO, priority=Task.Priority.LOW)
+
+        response = self.client.get(reverse('board-list-create'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{
+            'id': board.id,
+            'title': 'Board',
+            'member_count': 2,
+            'ticket_count': 3,
+            'tasks_to_do_count': 2,
+            'tasks_high_prio_count': 2,
+            'owner_id': self.user.id,
+        }])
+
+    def test_board_list_query_count_is_constant(self):
+        self.create_board(tasks=2)
+        # The accessible board ids, two ETag aggregates and the boards.
+        with self.assertNumQueries(4):
+            self.client.get(reverse('board-list-create'))
+
+        for i in range(10):
+            self.create_board(title=f'Board {i}', tasks=3)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('board-list-create'))
+        self.assertEqual(len(response.json()), 11)
+        # A shared cache keeps the ids across requests.
+        with self.settings(KANMIND_SHARED_CACHE=True):
+            self.client.get(reverse('board-list-create'))
+            with self.assertNumQueries(3):
+                self.client.get(reverse('board-list-create'))
+
+    def test_board_list_includes_member_boards_once(self):
+        owner = User.objects.create_user(username='other@example.com', password='secret')
+        board = Board.objects.create(title='Shared', owner=owner)
+        board.members.add(owner, self.user)
+
+        response = self.client.get(reverse('board-list-create'))
+
+        self.assertEqual([b['id'] for b in response.json()], [board.id])
+
+
+class BoardStatsTests(KanmindTestCase):
+
+    def assertStats(self, board, **expected):
+        stats = BoardStats.objects.get(board=board)
+        self.assertEqual({name: getattr(stats, name) for name in expected}, expected)
+
+    def test_counters_follow_task_changes(self):
+        board = self.create_board()
+        task = Task.objects.create(board=board, title='a', priority=Task.Priority.HIGH)
+        self.assertStats(board, ticket_count=1, tasks_to_do_count=1, tasks_high_prio_count=1)
+
+        task = Task.objects.get(pk=task.pk)
+        task.status = Task.Status.DONE
+        task.priority = Task.Priority.LOW
+        task.save()
+        self.assertStats(board, ticket_count=1, tasks_to_do_count=0, tasks_high_prio_count=0)
+
+        task.delete()
+        self.assertStats(board, ticket_count=0, tasks_to_do_count=0, tasks_high_prio_count=0)
+
+    def test_counters_follow_task_moved_between_boards(self):
+        source, target = self.create_board(), self.create_board()
+        task = Task.objects.create(board=source, title='a')
+        task.board = target
+        task.save()
+        self.assertStats(source, ticket_count=0, tasks_to_do_count=0)
+        self.assertStats(target, ticket_count=1, tasks_to_do_count=1)
+
+    def test_overlapping_edits_of_stale_copies_keep_the_counters(self):
+        source, target = self.create_board(), self.create_board()
+        task = Task.objects.create(board=source, title='a', priority=Task.Priority.HIGH)
+        first, second = Task.objects.get(pk=task.pk), Task.objects.get(pk=task.pk)
+        first.status = Task.Status.DONE
+        first.save()
+        second.board = target
+        second.save()
+        self.assertStats(source, ticket_count=0, tasks_to_do_count=0, tasks_high_prio_count=0)
+        self.assertStats(target, ticket_count=1, tasks_to_do_count=1, tasks_high_prio_count=1)
+
+        task.refresh_from_db()
+        task.delete()
+        self.assertStats(target, ticket_count=0, tasks_to_do_count=0, tasks_high_prio_count=0)
+
+    def test_counters_follow_membership_changes(self):
+        other = User.objects.create_user(username='member@example.com', password='secret')
+        board = self.create_board(members=[other])
+        self.assertStats(board, member_count=2)
+
+        other.member_of_boards.clear()
+        self.assertStats(board, member_count=1)
+
+        board.members.set([other])
+        self.assertStats(board, member_count=1)
+
+    def test_rebuild_command_verifies_and_repairs_drift(self):
+        board = self.create_board(tasks=3)
+        BoardStats.objects.filter(board=board).update(ticket_count=0)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_board_stats', '--verify', stdout=StringIO())
+
+        call_command('rebuild_board_stats', stdout=StringIO())
+        self.assertStats(board, ticket_count=3, tasks_to_do_count=3, member_count=1)
+        call_command('rebuild_board_stats', '--verify', stdout=StringIO())
+
+
+class CursorPaginationTests(KanmindTestCase):
+
+    def test_pages_through_tasks_in_creation_order(self):
+        board = self.create_board(tasks=5)
+        expected = list(board.tasks.order_by('created_at', 'id').values_list('id', flat=True))
+
+        seen = []
+        url = reverse('task-list-create') + '?page_size=2'
+        while url:
+            data = self.client.get(url).json()
+            self.assertLessEqual(len(data['results']), 2)
+            seen += [task['id'] for task in data['results']]
+            url = data['next']
+
+        self.assertEqual(seen, expected)
+
+    def test_page_size_is_capped(self):
+        self.create_board(tasks=3)
+        with mock.patch.object(KeysetCursorPagination, 'max_page_size', 2):
+            data = self.client.get(reverse('task-list-create') + '?page_size=500').json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNotNone(data['next'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('task-list-create') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_lists_are_unpaginated_without_parameters(self):
+        self.create_board(tasks=3)
+        response = self.client.get(reverse('task-list-create'))
+        self.assertEqual(len(response.json()), 3)
+
+
+class BoardDetailTests(KanmindTestCase):
+
+    def get_detail(self, board, query=''):
+        return self.client.get(reverse('board-detail', args=[board.pk]) + query)
+
+    def test_tasks_parameter_limits_embedded_tasks(self):
+        board = self.create_board(tasks=5)
+        task_ids = list(board.tasks.order_by('id').values_list('id', flat=True))
+
+        self.assertEqual(len(self.get_detail(board).json()['tasks']), 5)
+        self.assertEqual(self.get_detail(board, '?tasks=none').json()['tasks'], [])
+        limited = self.get_detail(board, '?tasks=first:2').json()['tasks']
+        self.assertEqual([task['id'] for task in limited], task_ids[:2])
+        self.assertEqual(self.get_detail(board, '?tasks=some').status_code, 400)
+
+    def test_streamed_detail_matches_regular_response(self):
+        board = self.create_board(tasks=7)
+        expected = self.get_detail(board).json()
+
+        with mock.patch.object(BoardDetailView, 'stream_chunk_size', 3):
+            response = self.get_detail(board, '?stream=true')
+
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content)
+        self.assertEqual(json.loads(body), expected)
+
+    def test_streamed_detail_respects_task_limit(self):
+        board = self.create_board(tasks=4)
+        response = self.get_detail(board, '?stream=true&tasks=first:1')
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(data['tasks']), 1)
+        self.assertEqual(data['members'][0]['id'], self.user.id)
+
+
+class TaskQueryCountTests(KanmindTestCase):
+
+    def create_tasks(self, board, count):
+        users = User.objects.bulk_create(
+            User(username=f'user{board.pk}-{i}@example.com') for i in range(count)
+        )
+        Task.objects.bulk_create(
+            Task(board=board, title=f'Task {i}', assignee=users[i], reviewer=users[-1 - i])
+            for i in range(count)
+        )
+        # bulk_create skips the signal handlers that keep the counters.
+        BoardStats.rebuild(board_ids=[board.pk])
+
+    def test_task_lists_use_constant_queries(self):
+        urls = [
+            reverse('task-list-create'),
+            reverse('tasks-assigned-to-me'),
+            reverse('tasks-reviewing'),
+        ]
+        for count in (1, 100, 1000):
+            with self.subTest(count=count):
+                Board.objects.all().delete()
+                board = self.create_board()
+                self.create_tasks(board, count)
+                Task.objects.filter(pk=Task.objects.first().pk).update(assignee=self.user, reviewer=self.user)
+
+                # The accessible board ids, two ETag aggregates and the tasks.
+                with self.assertNumQueries(4):
+                    response = self.client.get(urls[0])
+                self.assertEqual(len(response.json()), count)
+                for url in urls[1:]:
+                    with self.assertNumQueries(3):
+                        self.client.get(url)
+
+    def test_board_detail_uses_constant_queries(self):
+        small, large = self.create_board(), self.create_board()
+        self.create_tasks(small, 1)
+        self.create_tasks(large, 100)
+
+        # Access check, three ETag aggregates, board, members and tasks.
+        with self.assertNumQueries(7):
+            self.client.get(reverse('board-detail', args=[small.pk]))
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse('board-detail', args=[large.pk]))
+        self.assertEqual(len(response.json()['tasks']), 100)
+
+
+class BoardAccessTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.member = User.objects.create_user(username='member@example.com', password='secret')
+        self.board = self.create_board(members=[self.member])
+
+    def make_request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return request
+
+    def test_access_is_checked_with_one_query_and_memoized(self):
+        request = self.make_request(self.member)
+        with self.assertNumQueries(1):
+            self.assertTrue(can_access_board(request, self.board.pk))
+            self.assertTrue(can_access_board(request, self.board))
+
+        stranger = User.objects.create_user(username='stranger@example.com', password='secret')
+        with self.assertNumQueries(1):
+            self.assertFalse(can_access_board(self.make_request(stranger), self.board.pk))
+
+    def test_owner_needs_no_query(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(can_access_board(self.make_request(self.user), self.board))
+
+    @override_settings(KANMIND_BOARD_ACCESS_CACHE_TIMEOUT=60, KANMIND_SHARED_CACHE=True)
+    def test_cached_access_is_invalidated_on_membership_change(self):
+        cache.clear()
+        self.assertTrue(can_access_board(self.make_request(self.member), self.board.pk))
+        with self.assertNumQueries(0):
+            self.assertTrue(can_access_board(self.make_request(self.member), self.board.pk))
+
+        self.board.members.remove(self.member)
+        self.assertFalse(can_access_board(self.make_request(self.member), self.board.pk))
+
+        self.board.owner = self.member
+        self.board.save()
+        self.assertTrue(can_access_board(self.make_request(self.member), self.board.pk))
+
+    def test_task_creation_checks_board_access(self):
+        stranger = User.objects.create_user(username='stranger@example.com', password='secret')
+        self.client.force_authenticate(user=stranger)
+        response = self.client.post(reverse('task-list-create'), {'board': self.board.pk, 'title': 'x'})
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(user=self.member)
+        response = self.client.post(reverse('task-list-create'), {'board': self.board.pk, 'title': 'x'})
+        self.assertEqual(response.status_code, 201)
+
+
+class AccessibleBoardsTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(username='other@example.com', password='secret')
+        self.board = self.create_board()
+
+    @override_settings(KANMIND_SHARED_CACHE=True)
+    def test_ids_are_cached_in_a_shared_cache(self):
+        self.assertEqual(accessible_board_ids(self.other), set())
+        with self.assertNumQueries(0):
+            accessible_board_ids(self.other)
+
+    def test_lists_do_not_use_ids_cached_in_the_process(self):
+        self.board.members.add(self.other)
+        Task.objects.create(board=self.board, title='Secret task')
+        self.client.force_authenticate(self.other)
+        self.assertEqual(len(self.client.get(reverse('task-list-create')).json()), 1)
+        self.assertEqual(accessible_board_ids(self.other), {self.board.pk})
+
+        # Another process removes the member; this process's cache is not invalidated.
+        Board.members.through.objects.filter(user=self.other).delete()
+        self.assertEqual(self.client.get(reverse('task-list-create')).json(), [])
+        self.assertEqual(self.client.get(reverse('board-list-create')).json(), [])
+        self.assertEqual(self.client.get(reverse('search'), {'q': 'secret'}).json()['results'], [])
+
+    @override_settings(KANMIND_SHARED_CACHE=True)
+    def test_membership_changes_invalidate_ids(self):
+        accessible_board_ids(self.other)
+        self.board.members.add(self.other)
+        self.assertEqual(accessible_board_ids(self.other), {self.board.pk})
+
+        self.other.member_of_boards.remove(self.board)
+        self.assertEqual(accessible_board_ids(self.other), set())
+
+        self.board.members.add(self.other)
+        accessible_board_ids(self.other)
+        self.board.members.clear()
+        self.assertEqual(accessible_board_ids(self.other), set())
+
+    @override_settings(KANMIND_SHARED_CACHE=True)
+    def test_owner_change_and_delete_invalidate_ids(self):
+        self.assertEqual(accessible_board_ids(self.user), {self.board.pk})
+        accessible_board_ids(self.other)
+
+        self.board.owner = self.other
+        self.board.save()
+        self.assertEqual(accessible_board_ids(self.other), {self.board.pk})
+        # Still a member after handing over the board.
+        self.assertEqual(accessible_board_ids(self.user), {self.board.pk})
+
+        self.board.delete()
+        self.assertEqual(accessible_board_ids(self.user), set())
+        self.assertEqual(accessible_board_ids(self.other), set())
+
+    @override_settings(KANMIND_SHARED_CACHE=True)
+    def test_check_uses_cached_ids_of_a_shared_cache(self):
+        accessible_board_ids(self.other)
+        request = RequestFactory().get('/')
+        request.user = self.other
+        with self.assertNumQueries(0):
+            self.assertFalse(can_access_board(request, self.board.pk))
+
+    def test_check_ignores_ids_cached_in_the_process(self):
+        self.board.members.add(self.other)
+        accessible_board_ids(self.other)
+        # Another process removed the member; this process's cache still has the board.
+        Board.members.through.objects.filter(user=self.other).delete()
+        request = RequestFactory().get('/')
+        request.user = self.other
+        with self.assertNumQueries(1):
+            self.assertFalse(can_access_board(request, self.board.pk))
+
+    def test_ids_are_invalidated_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.board.members.add(self.other)
+                # A read before the commit fills the cache with the old state.
+                cache.set(f'accessible-boards:{self.other.pk}', set())
+        self.assertEqual(accessible_board_ids(self.other), {self.board.pk})
+
+
+class QueryPlanTests(KanmindTestCase):
+    """
+    Runs EXPLAIN QUERY PLAN on every query of the API endpoints and fails
+    if SQLite has to scan a whole kanmind table, or a whole index of one,
+    instead of searching it. Tables are also recognized by their aliases.
+    """
+    # {(url name, table): reason} for scans that are expected.
+    ALLOWED_SCANS = {}
+
+    def setUp(self):
+        super().setUp()
+        board = self.create_board(tasks=3)
+        self.task = board.tasks.first()
+        self.task.assignee = self.task.reviewer = self.user
+        self.task.save()
+        Comment.objects.create(task=self.task, author=self.user, content='Hello')
+
+    def full_scans(self, sql):
+        """Returns the kanmind tables the query plan of 'sql' scans, resolving aliases."""
+        tables = {}
+        for table, alias in re.findall(r'"(kanmind_app_\w+)"(?: (?:AS )?(\w+))?', sql):
+            tables[table] = tables[alias or table] = table
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            details = [row[-1] for row in cursor.fetchall()]
+        scanned = (re.match(r'SCAN (\w+)\b(?! VIRTUAL TABLE)', detail) for detail in details)
+        return [tables[match.group(1)] for match in scanned if match and match.group(1) in tables]
+
+    def assertNoFullScans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+
+        url_name = resolve(urlsplit(url).path).url_name
+        for query in queries:
+            if query['sql'].startswith('SELECT'):
+                for table in self.full_scans(query['sql']):
+                    if (url_name, table) not in self.ALLOWED_SCANS:
+                        self.fail(f'{url} scans {table}: {query["sql"]}')
+
+    def test_detects_scans_of_aliases_and_covering_indexes(self):
+        self.assertEqual(self.full_scans('SELECT COUNT(*) FROM "kanmind_app_task" U0'), ['kanmind_app_task'])
+        self.assertEqual(
+            self.full_scans('SELECT U0."board_id" FROM "kanmind_app_task" U0 WHERE U0."title" = \'x\''),
+            ['kanmind_app_task'],
+        )
+        self.assertEqual(self.full_scans('SELECT "id" FROM "kanmind_app_task" WHERE "id" = 1'), [])
+
+    def test_endpoints_use_indexes(self):
+        urls = [
+            reverse('board-list-create'),
+            reverse('board-detail', args=[self.task.board_id]),
+            reverse('task-list-create'),
+            reverse('task-list-create') + '?page_size=2',
+            reverse('task-detail', args=[self.task.pk]),
+            reverse('tasks-assigned-to-me'),
+            reverse('tasks-assigned-to-me') + '?page_size=2',
+            reverse('tasks-reviewing'),
+            reverse('task-comments-list', args=[self.task.pk]),
+            reverse('task-comments-list', args=[self.task.pk]) + '?page_size=2',
+            reverse('sync') + '?since=' + encode_token(timezone.now(), [self.task.board_id]),
+            reverse('search') + '?q=task',
+            reverse('board-activity', args=[self.task.board_id]) + f'?task={self.task.pk}',
+            reverse('tasks-due') + '?within=30d',
+            reverse('tasks-overdue') + '?page_size=2',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                self.assertNoFullScans(url)
+
+
+class TaskBulkTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.board = self.create_board(tasks=3)
+        self.tasks = list(self.board.tasks.order_by('id'))
+
+    def post(self, operations):
+        return self.client.post(reverse('task-bulk'), operations, format='json')
+
+    def test_applies_mixed_operations(self):
+        response = self.post([
+            {'action': 'create', 'data': {'board': self.board.pk, 'title': 'New', 'priority': 'high'}},
+            {'action': 'update', 'id': self.tasks[0].pk, 'data': {'status': 'done'}},
+            {'action': 'delete', 'id': self.tasks[1].pk},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([r['status'] for r in results], [201, 200, 204])
+        self.assertEqual(results[0]['data']['title'], 'New')
+        self.assertEqual(results[1]['data']['status'], 'done')
+        self.assertFalse(Task.objects.filter(pk=self.tasks[1].pk).exists())
+        stats = BoardStats.objects.get(board=self.board)
+        self.assertEqual((stats.ticket_count, stats.tasks_to_do_count, stats.tasks_high_prio_count), (3, 2, 1))
+        # The search index is updated by a background job.
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(search.get_backend().search('New', [self.board.pk], 10)[0]['id'], results[0]['id'])
+
+    def test_board_list_shows_new_counters_at_once(self):
+        etag = self.client.get(reverse('board-list-create'))['ETag']
+        self.post([{'action': 'create', 'data': {'board': self.board.pk, 'title': 'New'}}])
+
+        response = self.client.get(reverse('board-list-create'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['ticket_count'], 4)
+
+    def test_invalid_operation_rolls_back_everything(self):
+        response = self.post([
+            {'action': 'create', 'data': {'board': self.board.pk, 'title': 'New'}},
+            {'action': 'update', 'id': self.tasks[0].pk, 'data': {'status': 'unknown'}},
+            {'action': 'delete', 'id': 0},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(errors[0], {})
+        self.assertIn('status', errors[1])
+        self.assertIn('id', errors[2])
+        self.assertEqual(self.board.tasks.count(), 3)
+
+    def test_board_access_is_checked(self):
+        stranger = User.objects.create_user(username='stranger@example.com', password='secret')
+        foreign_board = Board.objects.create(title='Foreign', owner=stranger)
+
+        response = self.post([
+            {'action': 'update', 'id': self.tasks[0].pk, 'data': {'board': foreign_board.pk}},
+        ])
+
+        self.assertEqual(response.status_code, 403)
+        self.tasks[0].refresh_from_db()
+        self.assertEqual(self.tasks[0].board_id, self.board.pk)
+
+    def test_rejects_duplicate_targets(self):
+        response = self.post([
+            {'action': 'update', 'id': self.tasks[0].pk, 'data': {'status': 'done'}},
+            {'action': 'delete', 'id': self.tasks[0].pk},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(errors[0], {})
+        self.assertIn('id', errors[1])
+        self.assertTrue(Task.objects.filter(pk=self.tasks[0].pk).exists())
+
+    def test_rejects_too_many_operations_before_validating(self):
+        with mock.patch.object(TaskBulkView, 'max_operations', 2), self.assertNumQueries(0):
+            response = self.post([{'action': 'delete', 'id': task.pk} for task in self.tasks])
+        self.assertEqual(response.status_code, 400)
+
+    def test_query_count_does_not_grow_per_operation(self):
+        member = User.objects.create_user(username='member@example.com', password='secret')
+
+        def operations(count):
+            return [
+                {'action': 'update', 'id': task.pk, 'data': {'priority': 'low', 'assignee_id': member.pk}}
+                for task in self.tasks[:count]
+            ] + [
+                {'action': 'create', 'data': {'board': self.board.pk, 'title': 'New', 'reviewer_id': member.pk}}
+                for _ in range(count)
+            ]
+
+        with CaptureQueriesContext(connection) as one:
+            self.post(operations(1))
+        with CaptureQueriesContext(connection) as three:
+            self.post(operations(3))
+        self.assertEqual(len(one), len(three))
+
+
+class ConditionalGetTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.board = self.create_board(tasks=2)
+        self.task = self.board.tasks.first()
+
+    def assertRevalidates(self, url, change):
+        response = self.client.get(url)
+        etag = response.headers['ETag']
+        self.assertNotIn('Last-Modified', response.headers)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any('"kanmind_app_task"."title"' in q['sql'] for q in queries))
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_board_detail_changes_with_tasks_comments_and_members(self):
+        url = reverse('board-detail', args=[self.board.pk])
+        other = User.objects.create_user(username='member@example.com', password='secret')
+        self.assertRevalidates(url, lambda: Comment.objects.create(task=self.task, author=self.user, content='x'))
+        self.assertRevalidates(url, lambda: self.board.members.add(other))
+        self.assertRevalidates(url, lambda: self.task.delete())
+
+    def test_ignores_if_modified_since(self):
+        url = reverse('board-detail', args=[self.board.pk])
+        self.task.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_list_and_detail_change_with_task_updates(self):
+        def update_task():
+            self.task.title = 'Changed'
+            self.task.save()
+
+        self.assertRevalidates(reverse('task-list-create'), update_task)
+        self.assertRevalidates(reverse('task-detail', args=[self.task.pk]), update_task)
+
+    def test_board_list_changes_with_new_board(self):
+        self.assertRevalidates(reverse('board-list-create'), lambda: self.create_board())
+
+    def test_filtered_task_list_is_validated_over_the_filtered_tasks(self):
+        url = reverse('task-list-create') + '?status=done&ordering=priority'
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(task=self.task, author=self.user, content='x')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        def finish_task():
+            self.task.status = Task.Status.DONE
+            self.task.save()
+
+        self.assertRevalidates(url, finish_task)
+
+    def test_pages_have_no_etag(self):
+        response = self.client.get(reverse('task-list-create'), {'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(KANMIND_SHARED_CACHE=True, KANMIND_RESPONSE_CACHE={
+    'BACKEND': 'kanmind_app.response_cache.LRUMemoryBackend',
+    'OPTIONS': {'max_bytes': 1024 * 1024},
+})
+class ResponseCacheTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        response_cache.get_backend().clear()
+        self.board = self.create_board(tasks=2)
+        self.task = self.board.tasks.first()
+        self.url = reverse('board-detail', args=[self.board.pk])
+
+    def assertCache(self, expected, query=''):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.headers['X-Cache'], expected)
+        return json.loads(response.content)
+
+    def test_hits_until_board_content_changes(self):
+        other = User.objects.create_user(username='member@example.com', password='secret')
+        changes = [
+            lambda: Task.objects.create(board=self.board, title='New'),
+            lambda: Comment.objects.create(task=self.task, author=self.user, content='x'),
+            lambda: self.task.comments.all().delete(),
+            lambda: self.board.members.add(other),
+            lambda: self.task.delete(),
+        ]
+        self.assertCache('MISS')
+        for change in changes:
+            cached = self.assertCache('HIT')
+            change()
+            fresh = self.assertCache('MISS')
+            self.assertNotEqual(cached, fresh)
+
+    def test_variants_are_cached_separately(self):
+        self.assertCache('MISS')
+        self.assertEqual(self.assertCache('MISS', '?tasks=none')['tasks'], [])
+        self.assertEqual(len(self.assertCache('HIT')['tasks']), 2)
+
+    def test_counts_hits_and_misses(self):
+        self.assertCache('MISS')
+        self.assertCache('HIT')
+        stats = response_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    def test_inaccessible_board_is_not_served_from_cache(self):
+        self.assertCache('MISS')
+        stranger = User.objects.create_user(username='stranger@example.com', password='secret')
+        self.client.force_authenticate(user=stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_response_rendered_before_the_commit_is_not_served_after_it(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Task.objects.create(board=self.board, title='New')
+                # Another request renders the board before the commit.
+                response_cache.set_board_response(
+                    self.board.pk, 'tasks=None', b'{}', response_cache.board_version(self.board.pk)
+                )
+        self.assertEqual(len(self.assertCache('MISS')['tasks']), 3)
+
+    @override_settings(KANMIND_SHARED_CACHE=None)
+    def test_disabled_without_a_shared_cache(self):
+        self.assertIsNone(response_cache.get_backend())
+        self.assertNotIn('X-Cache', self.client.get(self.url).headers)
+
+
+class SearchBackendCheckTests(TestCase):
+
+    def test_fts_backend_needs_sqlite(self):
+        self.assertEqual(search.check_backend(None), [])
+        with mock.patch.dict(settings.DATABASES['default'], ENGINE='django.db.backends.postgresql'):
+            self.assertEqual([error.id for error in search.check_backend(None)], ['kanmind_app.E001'])
+            with self.settings(KANMIND_SEARCH_BACKEND='kanmind_app.search.DatabaseBackend'):
+                self.assertEqual(search.check_backend(None), [])
+
+
+class LRUMemoryBackendTests(TestCase):
+
+    def test_evicts_least_recently_used_entries_above_the_cap(self):
+        backend = response_cache.LRUMemoryBackend(max_bytes=10)
+        backend.set('a', b'1234')
+        backend.set('b', b'1234')
+        backend.get('a')
+        backend.set('c', b'1234')
+
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('a'), b'1234')
+        self.assertEqual(backend.stats()['bytes'], 8)
+        self.assertEqual(backend.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        backend = response_cache.LRUMemoryBackend(timeout=60)
+        with mock.patch('time.monotonic', return_value=1000):
+            backend.set('a', b'1234')
+        with mock.patch('time.monotonic', return_value=1059):
+            self.assertEqual(backend.get('a'), b'1234')
+        with mock.patch('time.monotonic', return_value=1060):
+            self.assertIsNone(backend.get('a'))
+        self.assertEqual(backend.stats()['bytes'], 0)
+
+
+class RecordingHub:
+    """Change feed hub that records the published events."""
+    events = []
+
+    def has_subscribers(self, board_id):
+        return True
+
+    def publish(self, board_id, event):
+        self.events.append(event)
+
+
+class ChangeFeedTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        get_hub.cache_clear()
+        self.board = self.create_board()
+        self.token = Token.objects.create(user=self.user)
+        self.url = reverse('board-change-feed', args=[self.board.pk])
+
+    @override_settings(KANMIND_CHANGE_FEED_HUB='kanmind_app.tests.RecordingHub')
+    def test_signals_publish_deltas_after_commit(self):
+        RecordingHub.events = []
+        other = User.objects.create_user(username='member@example.com', password='secret')
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(board=self.board, title='New')
+            Comment.objects.create(task=task, author=self.user, content='Hi')
+            self.board.members.add(other)
+            task.delete()
+
+        self.assertEqual(
+            [event['type'] for event in RecordingHub.events],
+            ['task.created', 'comment.created', 'members.added', 'task.deleted'],
+        )
+        self.assertEqual(RecordingHub.events[0]['data']['title'], 'New')
+        self.assertEqual(RecordingHub.events[2]['data'], {'user_ids': [other.pk]})
+
+    async def test_streams_published_events(self):
+        response = await self.async_client.get(self.url, headers={'Authorization': f'Token {self.token.key}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        get_hub().publish(self.board.pk, {'type': 'task.updated', 'board': self.board.pk, 'data': {'id': 1}})
+        chunk = await anext(stream)
+
+        self.assertTrue(chunk.startswith(b'event: task.updated\ndata: '))
+        self.assertEqual(json.loads(chunk.split(b'data: ', 1)[1])['data'], {'id': 1})
+
+    async def test_stream_sends_heartbeats_and_unsubscribes(self):
+        stream = stream_board_changes(self.board.pk, heartbeat=0.01)
+        await anext(stream)
+        self.assertTrue(get_hub().has_subscribers(self.board.pk))
+        self.assertEqual(await anext(stream), ': keep-alive\n\n')
+        await stream.aclose()
+        self.assertFalse(get_hub().has_subscribers(self.board.pk))
+
+    async def test_stream_ends_when_access_is_lost(self):
+        member = await User.objects.acreate(username='member@example.com')
+        await self.board.members.aadd(member)
+        allowed = True
+
+        async def has_access():
+            return allowed
+
+        stream = stream_board_changes(self.board.pk, heartbeat=0.01, has_access=has_access)
+        await anext(stream)
+        get_hub().publish(self.board.pk, {'type': 'members.removed', 'board': self.board.pk, 'data': {}})
+        self.assertTrue((await anext(stream)).startswith('event: members.removed'))
+        self.assertEqual(await anext(stream), ': keep-alive\n\n')
+
+        allowed = False
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+        self.assertFalse(get_hub().has_subscribers(self.board.pk))
+
+    async def test_removed_member_is_disconnected(self):
+        member = await User.objects.acreate(username='member@example.com')
+        await self.board.members.aadd(member)
+        token = await Token.objects.acreate(user=member)
+        response = await self.async_client.get(self.url + f'?token={token.key}')
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+
+        await self.board.members.aremove(member)
+        get_hub().publish(self.board.pk, {'type': 'members.removed', 'board': self.board.pk, 'data': {}})
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+
+    def test_needs_asgi(self):
+        response = self.client_class().get(self.url, headers={'Authorization': f'Token {self.token.key}'})
+        self.assertEqual(response.status_code, 501)
+
+    async def test_rejects_users_without_access(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+        stranger = await User.objects.acreate(username='stranger@example.com')
+        token = await Token.objects.acreate(user=stranger)
+        response = await self.async_client.get(self.url + f'?token={token.key}')
+        self.assertEqual(response.status_code, 403)
+
+
+class AsyncViewTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.member = User.objects.create_user(username='member@example.com', password='secret')
+        self.board = self.create_board(members=[self.member], tasks=3, assignee=self.user, reviewer=self.member)
+        task = self.board.tasks.first()
+        Comment.objects.create(task=task, author=self.member, content='First')
+        Comment.objects.create(task=task, author=self.user, content='Second')
+        self.task = task
+        self.headers = {'Authorization': f'Token {Token.objects.create(user=self.user).key}'}
+
+    def assertSamePayload(self, sync_name, async_name, args=()):
+        expected = self.client.get(reverse(sync_name, args=args)).json()
+        response = self.client_class().get(reverse(async_name, args=args), headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        actual = response.json()
+        if isinstance(expected, list):
+            expected, actual = sorted(expected, key=lambda item: item['id']), sorted(actual, key=lambda item: item['id'])
+        self.assertEqual(actual, expected)
+
+    def test_payloads_match_sync_views(self):
+        self.assertSamePayload('board-list-create', 'async-board-list')
+        self.assertSamePayload('board-detail', 'async-board-detail', [self.board.pk])
+        self.assertSamePayload('task-list-create', 'async-task-list')
+        self.assertSamePayload('tasks-assigned-to-me', 'async-tasks-assigned-to-me')
+        self.assertSamePayload('tasks-reviewing', 'async-tasks-reviewing')
+        self.assertSamePayload('task-comments-list', 'async-task-comments-list', [self.task.pk])
+
+    async def test_requires_token(self):
+        response = await self.async_client.get(reverse('async-board-list'))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_rejects_token_in_query_string(self):
+        token = self.headers['Authorization'].split()[1]
+        response = await self.async_client.get(reverse('async-board-list') + f'?token={token}')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_board_and_comment_access(self):
+        stranger = await User.objects.acreate(username='stranger@example.com')
+        token = await Token.objects.acreate(user=stranger)
+        headers = {'Authorization': f'Token {token.key}'}
+        response = await self.async_client.get(reverse('async-board-detail', args=[self.board.pk]), headers=headers)
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get(reverse('async-task-comments-list', args=[self.task.pk]), headers=headers)
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get(reverse('async-board-detail', args=[0]), headers=headers)
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(KANMIND_SYNC_OVERLAP=0)
+class SyncTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.member = User.objects.create_user(username='member@example.com', password='secret')
+        self.board = self.create_board(members=[self.member], tasks=3)
+        self.tasks = list(self.board.tasks.order_by('id'))
+        self.comment = Comment.objects.create(task=self.tasks[0], author=self.user, content='Hi')
+
+    def sync(self, token=None, client=None):
+        response = (client or self.client).get(reverse('sync'), {'since': token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_initial_sync_returns_everything(self):
+        data = self.sync()
+        self.assertTrue(data['full'])
+        self.assertEqual([board['id'] for board in data['boards']], [self.board.pk])
+        self.assertEqual(sorted(task['id'] for task in data['tasks']), [task.pk for task in self.tasks])
+        self.assertEqual(data['comments'][0]['task'], self.tasks[0].pk)
+        self.assertEqual(data['deleted'], {'boards': [], 'tasks': [], 'comments': []})
+
+    def test_returns_only_changes_and_deletions(self):
+        token = self.sync()['sync_token']
+        other_board = self.create_board(title='Other')
+        new_task = Task.objects.create(board=self.board, title='New')
+        deleted_task_id, deleted_comment_id = self.tasks[1].pk, self.comment.pk
+        self.tasks[1].delete()
+        self.comment.delete()
+
+        data = self.sync(token)
+
+        self.assertFalse(data['full'])
+        self.assertEqual(sorted(task['id'] for task in data['tasks']), [self.tasks[0].pk, new_task.pk])
+        self.assertEqual({board['id'] for board in data['boards']}, {self.board.pk, other_board.pk})
+        self.assertEqual(data['comments'], [])
+        self.assertEqual(data['deleted'], {'boards': [], 'tasks': [deleted_task_id], 'comments': [deleted_comment_id]})
+
+        data = self.sync(data['sync_token'])
+        self.assertEqual((data['boards'], data['tasks'], data['deleted']['tasks']), ([], [], []))
+
+    def test_lost_access_is_a_board_deletion(self):
+        client = APIClient()
+        client.force_authenticate(user=self.member)
+        token = self.sync(client=client)['sync_token']
+        other_board = self.create_board(title='Other', members=[self.member])
+        self.board.members.remove(self.member)
+        other_board_id = other_board.pk
+        other_board.delete()
+
+        data = self.sync(token, client)
+
+        self.assertEqual(data['boards'], [])
+        self.assertEqual(data['deleted']['boards'], [self.board.pk, other_board_id])
+        # The owner still sees the board and is not sent a tombstone for it.
+        self.assertEqual(self.sync(token)['deleted']['boards'], [other_board_id])
+
+    def test_new_board_is_sent_with_all_its_tasks_and_comments(self):
+        newcomer = User.objects.create_user(username='newcomer@example.com', password='secret')
+        client = APIClient()
+        client.force_authenticate(user=newcomer)
+        # The next syncs run well after the tasks and comments were written.
+        later = timezone.now() + timedelta(hours=1)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            token = self.sync(client=client)['sync_token']
+        self.board.members.add(newcomer)
+
+        with mock.patch('django.utils.timezone.now', return_value=later + timedelta(minutes=1)):
+            data = self.sync(token, client)
+
+        self.assertFalse(data['full'])
+        self.assertEqual([board['id'] for board in data['boards']], [self.board.pk])
+        self.assertEqual(sorted(task['id'] for task in data['tasks']), [task.pk for task in self.tasks])
+        self.assertEqual([comment['id'] for comment in data['comments']], [self.comment.pk])
+
+        with mock.patch('django.utils.timezone.now', return_value=later + timedelta(minutes=2)):
+            data = self.sync(data['sync_token'], client)
+        self.assertEqual((data['boards'], data['tasks'], data['comments']), ([], [], []))
+
+    def test_moved_task_is_deleted_from_the_old_board(self):
+        token = self.sync()['sync_token']
+        other_board = self.create_board(title='Other')
+        self.tasks[2].board = other_board
+        self.tasks[2].save()
+
+        data = self.sync(token)
+
+        self.assertEqual([task['board'] for task in data['tasks']], [other_board.pk])
+        self.assertEqual(data['deleted']['tasks'], [self.tasks[2].pk])
+
+    def test_bulk_moved_task_is_deleted_from_the_old_board(self):
+        token = self.sync()['sync_token']
+        other_board = self.create_board(title='Other')
+        response = self.client.post(reverse('task-bulk'), [
+            {'action': 'update', 'id': self.tasks[2].pk, 'data': {'board': other_board.pk}},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.sync(token)['deleted']['tasks'], [self.tasks[2].pk])
+
+    def test_moved_tasks_bring_their_comments_to_the_new_board(self):
+        newcomer = User.objects.create_user(username='newcomer@example.com', password='secret')
+        client = APIClient()
+        client.force_authenticate(user=newcomer)
+        other_board = self.create_board(title='Other', members=[newcomer])
+        bulk_comment = Comment.objects.create(task=self.tasks[1], author=self.user, content='Bulk')
+        # The moves and the next sync run well after the comments were written.
+        later = timezone.now() + timedelta(hours=1)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            token = self.sync(client=client)['sync_token']
+            self.tasks[0].board = other_board
+            self.tasks[0].save()
+            response = self.client.post(reverse('task-bulk'), [
+                {'action': 'update', 'id': self.tasks[1].pk, 'data': {'board': other_board.pk}},
+            ], format='json')
+            self.assertEqual(response.status_code, 200)
+
+        with mock.patch('django.utils.timezone.now', return_value=later + timedelta(minutes=1)):
+            data = self.sync(token, client)
+
+        self.assertEqual(sorted(task['id'] for task in data['tasks']), [self.tasks[0].pk, self.tasks[1].pk])
+        self.assertEqual(sorted(comment['id'] for comment in data['comments']), [self.comment.pk, bulk_comment.pk])
+
+    def test_invalid_and_expired_tokens(self):
+        response = self.client.get(reverse('sync'), {'since': 'not-a-token'})
+        self.assertEqual(response.status_code, 400)
+
+        expired = encode_token(timezone.now() - timedelta(days=31), [self.board.pk])
+        self.assertTrue(self.sync(expired)['full'])
+
+    def test_query_count_does_not_grow_with_changes(self):
+        token = self.sync()['sync_token']
+        for i in range(20):
+            Task.objects.create(board=self.board, title=f'New {i}')
+        with self.assertNumQueries(5):
+            self.sync(token)
+
+
+class SearchTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.board = self.create_board()
+        self.title_hit = Task.objects.create(board=self.board, title='Deploy release', description='')
+        self.description_hit = Task.objects.create(board=self.board, title='Misc', description='deploy notes')
+        self.comment = Comment.objects.create(task=self.description_hit, author=self.user, content='Deployment done')
+        stranger = User.objects.create_user(username='stranger@example.com', password='secret')
+        self.hidden_board = Board.objects.create(title='Hidden', owner=stranger)
+        Task.objects.create(board=self.hidden_board, title='Deploy secret')
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('search'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def hits(self, q):
+        return [(hit['kind'], hit['id']) for hit in self.search(q)['results']]
+
+    def test_ranks_title_matches_first_and_scopes_to_accessible_boards(self):
+        hits = self.hits('deploy')
+        self.assertEqual(hits[0], ('task', self.title_hit.pk))
+        self.assertEqual(set(hits[1:]), {('task', self.description_hit.pk), ('comment', self.comment.pk)})
+        result = self.search('done')['results'][0]
+        self.assertEqual((result['task'], result['task_title']), (self.description_hit.pk, 'Misc'))
+        self.assertIn('[done]', result['snippet'].lower())
+
+    def test_index_follows_changes(self):
+        self.title_hit.title = 'Ship release'
+        self.title_hit.save()
+        self.assertNotIn(('task', self.title_hit.pk), self.hits('deploy'))
+        self.assertEqual(self.hits('ship'), [('task', self.title_hit.pk)])
+
+        comment_id = self.comment.pk
+        self.comment.delete()
+        self.assertNotIn(('comment', comment_id), self.hits('deployment'))
+
+        self.description_hit.delete()
+        self.assertEqual(self.hits('notes'), [])
+
+    def test_comments_move_with_their_task(self):
+        self.description_hit.board = self.hidden_board
+        self.description_hit.save()
+        self.assertEqual(self.hits('deployment'), [])
+
+    def test_pagination(self):
+        first = self.search('deploy', page_size=2)
+        self.assertEqual(len(first['results']), 2)
+        self.assertIn('offset=2', first['next'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next'])
+        hits = [(hit['kind'], hit['id']) for hit in first['results'] + second['results']]
+        self.assertEqual(hits, self.hits('deploy'))
+
+    def test_requires_query(self):
+        self.assertEqual(self.client.get(reverse('search')).status_code, 400)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM kanmind_search')
+        self.assertEqual(self.hits('deploy'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.hits('deploy')), 3)
+
+    @override_settings(KANMIND_SEARCH_BACKEND='kanmind_app.search.DatabaseBackend')
+    def test_database_backend(self):
+        self.assertEqual(
+            sorted(self.hits('deploy')),
+            [('comment', self.comment.pk), ('task', self.title_hit.pk), ('task', self.description_hit.pk)],
+        )
+
+
+class TaskFilterTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(username='member@example.com', password='secret')
+        self.board = self.create_board(members=[self.other])
+        self.second_board = self.create_board(title='Second')
+        today = timezone.localdate()
+        self.overdue = Task.objects.create(
+            board=self.board, title='B overdue', priority='high', due_date=today - timedelta(days=2),
+            assignee=self.user,
+        )
+        self.done = Task.objects.create(
+            board=self.board, title='C done', status='done', priority='low', due_date=today - timedelta(days=2),
+        )
+        self.upcoming = Task.objects.create(
+            board=self.second_board, title='A upcoming', status='review', due_date=today + timedelta(days=3),
+            assignee=self.user, reviewer=self.other,
+        )
+
+    def ids(self, url=None, **params):
+        response = self.client.get(url or reverse('task-list-create'), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        return [task['id'] for task in (data['results'] if 'results' in data else data)]
+
+    def test_filters(self):
+        self.assertEqual(sorted(self.ids(status='to-do,review')), [self.overdue.pk, self.upcoming.pk])
+        self.assertEqual(self.ids(priority='low'), [self.done.pk])
+        self.assertEqual(self.ids(board=self.second_board.pk), [self.upcoming.pk])
+        self.assertEqual(self.ids(due_date_after=timezone.localdate().isoformat()), [self.upcoming.pk])
+        self.assertEqual(sorted(self.ids(due_date_before=timezone.localdate().isoformat())), [self.overdue.pk, self.done.pk])
+        self.assertEqual(self.ids(overdue='true'), [self.overdue.pk])
+        self.assertEqual(self.ids(reviewer=self.other.pk), [self.upcoming.pk])
+        self.assertEqual(self.ids(assignee='none'), [self.done.pk])
+        self.assertEqual(self.ids(reverse('tasks-assigned-to-me'), status='review'), [self.upcoming.pk])
+
+    def test_invalid_filters_are_rejected(self):
+        for params in ({'status': 'later'}, {'board': 'x'}, {'due_date_after': '17.10.2026'},
+                       {'ordering': 'assignee'}, {'fields': 'id,secret'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('task-list-create'), params).status_code, 400)
+
+    def test_ordering(self):
+        self.assertEqual(self.ids(ordering='title'), [self.upcoming.pk, self.overdue.pk, self.done.pk])
+        self.assertEqual(self.ids(ordering='-priority,title'), [self.overdue.pk, self.upcoming.pk, self.done.pk])
+        self.assertEqual(self.ids(ordering='-title', page_size=2), [self.done.pk, self.overdue.pk])
+        response = self.client.get(reverse('task-list-create'), {'ordering': 'due_date', 'page_size': 2})
+        self.assertEqual(response.status_code, 400)
+
+    def test_ordered_pages_follow_the_ordering(self):
+        first = self.client.get(reverse('task-list-create'), {'ordering': 'title', 'page_size': 2}).json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual([task['id'] for task in first['results'] + second['results']],
+                         [self.upcoming.pk, self.overdue.pk, self.done.pk])
+
+    def test_sparse_fields_skip_columns_and_joins(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('task-list-create'), {'fields': 'id,title,status', 'ordering': 'title'})
+        self.assertEqual(response.json()[0], {'id': self.upcoming.pk, 'title': 'A upcoming', 'status': 'review'})
+        task_query = queries[-1]['sql']
+        self.assertNotIn('description', task_query)
+        self.assertNotIn('auth_user', task_query)
+        self.assertNotIn('kanmind_app_comment', task_query)
+
+        response = self.client.get(reverse('task-list-create'), {'fields': 'id,assignee', 'ordering': 'title'})
+        self.assertEqual(response.json()[0]['assignee']['id'], self.user.pk)
+
+    @override_settings(TIME_ZONE='Pacific/Kiritimati')
+    def test_overdue_uses_the_current_time_zone(self):
+        # 20:00 UTC on the 1st is already the 2nd in Kiritimati (UTC+14).
+        now = datetime(2026, 1, 1, 20, 0, tzinfo=dt_timezone.utc)
+        self.overdue.due_date = now.date()
+        self.overdue.save()
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            self.assertEqual(self.ids(overdue='true'), [self.overdue.pk])
+            with self.settings(TIME_ZONE='UTC'):
+                self.assertEqual(self.ids(overdue='true'), [])
+
+
+class CommentThreadTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.member = User.objects.create_user(username='member@example.com', password='secret')
+        self.board = self.create_board(members=[self.member], tasks=1)
+        self.task = self.board.tasks.get()
+        self.url = reverse('task-comments-list', args=[self.task.pk])
+
+    def add_comments(self, count):
+        for i in range(count):
+            Comment.objects.create(task=self.task, author=self.member if i % 2 else self.user, content=f'Comment {i}')
+
+    def count_list_queries(self, client=None, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = (client or self.client).get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_list_query_count_is_constant(self):
+        self.add_comments(2)
+        few = self.count_list_queries()
+        self.add_comments(10)
+        self.assertEqual(self.count_list_queries(), few)
+        # The task with its board and the comments with their authors.
+        self.assertEqual(few, 2)
+
+        member_client = APIClient()
+        member_client.force_authenticate(user=self.member)
+        self.assertEqual(self.count_list_queries(member_client), self.count_list_queries(member_client, page_size=5))
+
+    def test_thread_is_time_ordered_and_paginated(self):
+        self.add_comments(5)
+        first = self.client.get(self.url, {'page_size': 3}).json()
+        second = self.client.get(first['next']).json()
+        contents = [comment['content'] for comment in first['results'] + second['results']]
+        self.assertEqual(contents, [f'Comment {i}' for i in range(5)])
+        self.assertEqual([comment['content'] for comment in self.client.get(self.url).json()], contents)
+
+    def test_create_loads_the_task_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'content': 'New'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        task_selects = [q for q in queries if q['sql'].startswith('SELECT') and 'FROM "kanmind_app_task"' in q['sql']]
+        self.assertEqual(len(task_selects), 1)
+
+    def test_only_authors_can_edit(self):
+        self.add_comments(2)
+        comment = Comment.objects.get(content='Comment 1')
+        response = self.client.patch(reverse('task-comments-detail', args=[self.task.pk, comment.pk]), {'content': 'x'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_missing_task_and_strangers(self):
+        self.assertEqual(self.client.get(reverse('task-comments-list', args=[0])).status_code, 404)
+        stranger = User.objects.create_user(username='stranger@example.com', password='secret')
+        self.client.force_authenticate(user=stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class InstrumentationTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.board = self.create_board(tasks=3)
+        reset_route_stats()
+
+    def test_server_timing_log_and_route_stats(self):
+        with self.settings(KANMIND_INSTRUMENTATION={'ENABLED': True}):
+            with self.assertLogs('kanmind.performance', 'INFO') as logs:
+                response = APIClient().get(reverse('task-list-create'), HTTP_AUTHORIZATION=self.token_header())
+
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", view;dur=.*total;dur=')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['route'], record['method'], record['status']), ('task-list-create', 'GET', 200))
+        self.assertEqual(record['bytes'], len(response.content))
+        self.assertGreater(record['queries'], 0)
+        self.assertEqual(route_stats()['task-list-create']['requests'], 1)
+
+    def test_budget_from_settings_raises(self):
+        with self.settings(KANMIND_INSTRUMENTATION={
+            'ENABLED': True, 'LOG': False, 'RAISE_ON_BUDGET': True, 'QUERY_BUDGETS': {'task-list-create': 1},
+        }):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'GET task-list-create ran'):
+                APIClient().get(reverse('task-list-create'), HTTP_AUTHORIZATION=self.token_header())
+
+    def test_view_budget_logs_a_warning(self):
+        with self.settings(KANMIND_INSTRUMENTATION={'ENABLED': True, 'LOG': False}):
+            with mock.patch.object(BoardDetailView, 'query_budget', {'GET': 1}):
+                with self.assertLogs('kanmind.performance', 'WARNING') as logs:
+                    response = APIClient().get(
+                        reverse('board-detail', args=[self.board.pk]), HTTP_AUTHORIZATION=self.token_header()
+                    )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('GET board-detail ran', logs.output[0])
+
+    def test_streamed_body_counts_towards_the_budget(self):
+        with self.settings(KANMIND_INSTRUMENTATION={'ENABLED': True}):
+            with self.assertLogs('kanmind.performance', 'INFO') as logs:
+                response = APIClient().get(
+                    reverse('board-export', args=[self.board.pk]), HTTP_AUTHORIZATION=self.token_header()
+                )
+                self.assertEqual(logs.records, [])
+                body = b''.join(response.streaming_content)
+
+            with mock.patch.object(BoardExportView, 'query_budget', {'GET': 3}):
+                with self.assertLogs('kanmind.performance', 'WARNING') as warnings:
+                    b''.join(APIClient().get(
+                        reverse('board-export', args=[self.board.pk]), HTTP_AUTHORIZATION=self.token_header()
+                    ).streaming_content)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['route'], record['bytes']), ('board-export', len(body)))
+        self.assertGreaterEqual(record['queries'], 6)
+        self.assertNotIn('Server-Timing', response)
+        self.assertIn('GET board-export ran', warnings.output[0])
+
+    def test_disabled_middleware_is_removed(self):
+        with self.settings(KANMIND_INSTRUMENTATION={'ENABLED': False}):
+            response = APIClient().get(reverse('task-list-create'), HTTP_AUTHORIZATION=self.token_header())
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(route_stats(), {})
+
+    def token_header(self):
+        return f'Token {Token.objects.get_or_create(user=self.user)[0].key}'
+
+
+class BenchmarkCommandTests(TestCase):
+
+    def test_generate_data_and_run_benchmarks(self):
+        call_command('generate_kanmind_data', users=5, boards=3, tasks_per_board=4, comments_per_task=2, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Board.objects.count(), 3)
+        self.assertEqual(BoardStats.rebuild(dry_run=True), [])
+        with self.assertRaisesMessage(CommandError, 'exist already'):
+            call_command('generate_kanmind_data', users=1, stdout=StringIO())
+
+        output = StringIO()
+        call_command('run_benchmarks', iterations=1, stdout=output, stderr=StringIO())
+        report = json.loads(output.getvalue())
+        self.assertEqual(report['dataset']['boards'], 3)
+        self.assertEqual(report['endpoints']['GET board-list-create']['status'], 200)
+        self.assertEqual(report['endpoints']['DELETE board-detail']['status'], 204)
+        self.assertEqual(
+            set(report['endpoints']['GET task-list-create']), {'status', 'p50_ms', 'p95_ms', 'queries', 'peak_memory_kb'}
+        )
+        self.assertEqual(report['throughput']['export']['rows'], report['throughput']['import']['rows'])
+        self.assertIn('rows_per_second', report['throughput']['import'])
+        # Writes are rolled back.
+        self.assertEqual(Board.objects.count(), 3)
+
+
+class PortabilityTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.member = User.objects.create_user(username='member@example.com', email='member@example.com', password='secret')
+        self.board = self.create_board(title='Launch', members=[self.member])
+        self.task = Task.objects.create(
+            board=self.board, title='Deploy', status=Task.Status.REVIEW, priority=Task.Priority.HIGH,
+            due_date='2026-05-01', created_by=self.user, assignee=self.member, reviewer=self.user,
+        )
+        Task.objects.create(board=self.board, title='Write notes', created_by=self.member)
+        Comment.objects.create(task=self.task, author=self.member, content='Deployment notes')
+        Task.objects.filter(pk=self.task.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+    def export(self):
+        response = self.client.get(reverse('board-export', args=[self.board.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return b''.join(response.streaming_content).decode().splitlines(keepends=True)
+
+    def test_export_lists_board_users_tasks_and_comments(self):
+        rows = [json.loads(line) for line in self.export()]
+        self.assertEqual([row['type'] for row in rows], ['board', 'user', 'user', 'task', 'task', 'comment'])
+        self.assertEqual((rows[0]['title'], rows[0]['owner']), ('Launch', self.user.pk))
+        self.assertTrue(all(row['member'] for row in rows[1:3]))
+        self.assertEqual(rows[3]['assignee'], self.member.pk)
+        self.assertEqual((rows[5]['task'], rows[5]['author']), (self.task.pk, self.member.pk))
+
+    def test_export_requires_access(self):
+        stranger = User.objects.create_user(username='stranger@example.com', password='secret')
+        self.client.force_authenticate(user=stranger)
+        response = self.client.get(reverse('board-export', args=[self.board.pk]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_import_recreates_the_board(self):
+        lines = self.export()
+        board, counts = import_board(lines, self.member, title='Copy', batch_size=1)
+
+        self.assertEqual(board.owner, self.member)
+        self.assertEqual(counts, {'members': 2, 'tasks': 2, 'comments': 1, 'unknown_users': 0, 'skipped_comments': 0})
+        self.assertEqual(set(board.members.all()), {self.user, self.member})
+        task = board.tasks.get(title='Deploy')
+        self.assertNotEqual(task.pk, self.task.pk)
+        self.assertEqual(
+            (task.status, task.priority, str(task.due_date), task.assignee, task.reviewer, task.created_by),
+            ('review', 'high', '2026-05-01', self.member, self.user, self.user),
+        )
+        self.assertEqual(task.created_at, Task.objects.get(pk=self.task.pk).created_at)
+        self.assertEqual(task.comments.get().author, self.member)
+        self.assertEqual(BoardStats.rebuild(dry_run=True), [])
+        self.assertIn(('task', task.pk), [(hit['kind'], hit['id']) for hit in search.get_backend().search('deploy', [board.pk], 10)])
+
+    def test_import_matches_users_by_email(self):
+        lines = self.export()
+        User.objects.filter(pk=self.member.pk).update(email='renamed@example.com')
+        board, counts = import_board(lines, self.user)
+
+        self.assertEqual((counts['members'], counts['unknown_users']), (1, 1))
+        task = board.tasks.get(title='Deploy')
+        self.assertIsNone(task.assignee)
+        # Comments of unknown authors are attributed to the new owner.
+        self.assertEqual(task.comments.get().author, self.user)
+
+    def test_invalid_export_leaves_nothing_behind(self):
+        lines = self.export()
+        boards = Board.objects.count()
+        for broken in (lines[1:], lines[:4] + ['{"type": "task"}\n'], lines[:3] + lines[5:] + lines[3:5], lines + ['nonsense\n']):
+            with self.subTest(broken=broken), self.assertRaises(InvalidExport):
+                import_board(broken, self.user)
+        self.assertEqual(Board.objects.count(), boards)
+
+    def test_export_and_import_commands(self):
+        with tempfile.NamedTemporaryFile('w+', suffix='.ndjson') as file:
+            call_command('export_board', self.board.pk, output=file.name, stderr=StringIO())
+            output = StringIO()
+            call_command('import_board', file.name, owner='member@example.com', stdout=output)
+        self.assertIn('2 task(s) and 1 comment(s)', output.getvalue())
+        self.assertEqual(Board.objects.filter(title='Launch', owner=self.member).count(), 1)
+        with self.assertRaisesMessage(CommandError, 'no user'):
+            call_command('import_board', '-', owner='nobody@example.com')
+
+
+class DueTaskTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.board = self.create_board()
+        self.today = timezone.localdate()
+        self.other = User.objects.create_user(username='other@example.com', password='secret')
+
+    def task(self, days, assignee=None, status=Task.Status.TODO, title=None):
+        return Task.objects.create(
+            board=self.board, title=title or f'Due in {days}', status=status,
+            due_date=self.today + timedelta(days=days), assignee=assignee or self.user,
+        )
+
+    def ids(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [task['id'] for task in response.json()]
+
+    def test_due_and_overdue_lists(self):
+        soon, today, later = self.task(3), self.task(0), self.task(20)
+        late, very_late = self.task(-1), self.task(-10)
+        self.task(1, status=Task.Status.DONE)
+        self.task(1, assignee=self.other)
+        Task.objects.create(board=self.board, title='No date', assignee=self.user)
+
+        self.assertEqual(self.ids(reverse('tasks-due')), [today.pk, soon.pk])
+        self.assertEqual(self.ids(reverse('tasks-due'), within='3w'), [today.pk, soon.pk, later.pk])
+        self.assertEqual(self.ids(reverse('tasks-due'), within='0', priority='medium'), [today.pk])
+        self.assertEqual(self.ids(reverse('tasks-overdue')), [very_late.pk, late.pk])
+
+    def test_due_list_uses_the_partial_index(self):
+        self.task(1)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('tasks-due'))
+        sql = next(query['sql'] for query in queries if 'kanmind_app_task' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('task_assignee_open_due_idx', plan)
+
+    def test_within_is_validated(self):
+        for value in ('soon', '-1d', '400d'):
+            with self.subTest(value=value):
+                response = self.client.get(reverse('tasks-due'), {'within': value})
+                self.assertEqual(response.status_code, 400)
+
+    def test_due_list_paginates_by_due_date(self):
+        tasks = [self.task(days) for days in (5, 1, 1, 3)]
+        response = self.client.get(reverse('tasks-due'), {'page_size': 2, 'fields': 'id,title'})
+        first = response.json()
+        self.assertEqual(set(first['results'][0]), {'id', 'title'})
+        second = self.client.get(first['next']).json()
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            [task['id'] for task in first['results'] + second['results']],
+            [tasks[1].pk, tasks[2].pk, tasks[3].pk, tasks[0].pk],
+        )
+
+    def test_digests_are_built_in_batches(self):
+        users = [self.user, self.other] + [
+            User.objects.create_user(username=f'user{i}@example.com', password='secret') for i in range(3)
+        ]
+        self.task(-2, title='Late')
+        self.task(2, title='Soon')
+        self.task(30, title='Later')
+        for user in users[1:]:
+            self.task(1, assignee=user)
+
+        with CaptureQueriesContext(connection) as few:
+            call_command('build_due_digests', batch_size=2, max_tasks=1, stdout=StringIO())
+        for user in users[2:]:
+            for days in (-3, -1, 0, 4):
+                self.task(days, assignee=user)
+        with CaptureQueriesContext(connection) as many:
+            output = StringIO()
+            call_command('build_due_digests', batch_size=2, max_tasks=1, stdout=output)
+        # The number of queries depends on the number of batches, not of tasks.
+        self.assertEqual(len(few), len(many))
+        self.assertIn('Built 5 digest(s)', output.getvalue())
+
+        digest = DueDigest.objects.get(user=self.user, day=self.today)
+        self.assertEqual((digest.overdue_count, digest.due_soon_count), (1, 1))
+        self.assertEqual(digest.data['overdue'][0]['title'], 'Late')
+        digest = DueDigest.objects.get(user=users[2])
+        self.assertEqual((digest.overdue_count, digest.due_soon_count, len(digest.data['overdue'])), (2, 3, 1))
+
+        response = self.client.get(reverse('due-digest'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task['title'] for task in response.json()['due_soon']], ['Soon'])
+
+        # A rebuild on the same day drops the digests of users without due tasks.
+        Task.objects.filter(assignee=self.user).update(status=Task.Status.DONE)
+        call_command('build_due_digests', stdout=StringIO())
+        self.assertFalse(DueDigest.objects.filter(user=self.user).exists())
+        self.assertEqual(self.client.get(reverse('due-digest')).status_code, 404)
+
+
+class RecordingRouter(ReadReplicaRouter):
+    """Records the database chosen for every read."""
+
+    def __init__(self):
+        self.reads = []
+
+    def db_for_read(self, model, **hints):
+        alias = super().db_for_read(model, **hints)
+        self.reads.append((model._meta.model_name, alias))
+        return alias
+
+
+class ReadReplicaTests(TransactionTestCase):
+    """
+    The replica alias points to the default database, so the recorded routing
+    decisions can be checked on real requests. This is a TransactionTestCase
+    because reads inside a transaction never go to the replica.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com', password='secret')
+        self.board = Board.objects.create(title='Board', owner=self.user)
+        self.board.members.add(self.user)
+        Task.objects.create(board=self.board, title='Task', created_by=self.user)
+        self.router = RecordingRouter()
+        self.header = f'Token {Token.objects.create(user=self.user).key}'
+
+    def get(self, url):
+        with self.settings(KANMIND_READ_REPLICA='default', DATABASE_ROUTERS=[self.router]):
+            response = APIClient().get(url, HTTP_AUTHORIZATION=self.header)
+        self.assertEqual(response.status_code, 200)
+        return dict(self.router.reads)
+
+    def test_list_views_read_from_the_replica(self):
+        for url in (reverse('task-list-create'), reverse('async-task-list')):
+            self.router.reads.clear()
+            cache.clear()
+            reads = self.get(url)
+            self.assertEqual(reads['task'], 'default')
+            # The access check is read from the primary.
+            self.assertIn(('board', None), self.router.reads)
+
+    def test_search_reads_the_index_from_the_replica(self):
+        self.get(reverse('search') + '?q=task')
+        # The FTS query and the task titles.
+        self.assertEqual(self.router.reads.count(('task', 'default')), 2)
+
+    def test_other_views_and_writes_read_from_the_primary(self):
+        reads = self.get(reverse('board-detail', args=[self.board.pk]))
+        self.assertEqual(set(reads.values()), {None})
+
+        self.router.reads.clear()
+        with self.settings(KANMIND_READ_REPLICA='default', DATABASE_ROUTERS=[self.router]):
+            response = APIClient().post(
+                reverse('task-list-create'),
+                {'board': self.board.pk, 'title': 'New', 'status': 'to-do', 'priority': 'low'},
+                format='json', HTTP_AUTHORIZATION=self.header,
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual({alias for _, alias in self.router.reads}, {None})
+
+    def test_router(self):
+        router = ReadReplicaRouter()
+        with self.settings(KANMIND_READ_REPLICA='replica'):
+            self.assertIsNone(router.db_for_read(Task))
+            with replica_reads():
+                self.assertEqual(router.db_for_read(Task), 'replica')
+                self.assertIsNone(router.db_for_read(User))
+                with transaction.atomic():
+                    self.assertIsNone(router.db_for_read(Task))
+                router.db_for_write(Task)
+                self.assertIsNone(router.db_for_read(Task))
+        with replica_reads():
+            self.assertIsNone(router.db_for_read(Task))
+
+
+class ActivityTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.member = User.objects.create_user(username='member@example.com', email='member@example.com', password='x')
+        self.board = self.create_board(members=[self.member], tasks=1)
+        self.task = self.board.tasks.get()
+
+    def activity(self, **params):
+        response = self.client.get(reverse('board-activity', args=[self.board.pk]), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_records_changes_with_actor(self):
+        other = self.create_board(title='Other')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('task-detail', args=[self.task.pk]), {'status': 'done'}, format='json')
+            Comment.objects.create(task=self.task, author=self.user, content='Hi')
+            self.board.members.remove(self.member)
+            self.task.refresh_from_db()
+            self.task.board = other
+            self.task.save()
+
+        events = self.activity()['results']
+        self.assertEqual(
+            [event['verb'] for event in events],
+            ['task.updated', 'members.removed', 'comment.created', 'task.updated'],
+        )
+        self.assertEqual(events[-1]['data'], {'changes': {'status': ['to-do', 'done']}})
+        self.assertEqual(events[-1]['actor']['id'], self.user.pk)
+        self.assertEqual(events[1]['data'], {'users': [self.member.pk]})
+        self.assertEqual(events[0]['data'], {'changes': {'board': [self.board.pk, other.pk]}})
+        # The move is recorded on both boards.
+        self.assertEqual(ActivityEvent.objects.filter(board_id=other.pk, verb='task.updated').count(), 1)
+
+    def test_rolled_back_changes_are_not_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Task.objects.create(board=self.board, title='Gone', created_by=self.user)
+                transaction.set_rollback(True)
+        self.assertFalse(ActivityEvent.objects.exists())
+
+    def test_pages_and_access(self):
+        ActivityEvent.objects.bulk_create(
+            ActivityEvent(board_id=self.board.pk, task_id=self.task.pk, verb='task.updated') for _ in range(3)
+        )
+        ActivityEvent.objects.create(board_id=self.board.pk, verb='members.added')
+        page = self.activity(page_size=2)
+        self.assertEqual(len(page['results']), 2)
+        rest = self.client.get(page['next']).json()
+        self.assertEqual(len(rest['results']), 2)
+        self.assertIsNone(rest['next'])
+        self.assertEqual(len(self.activity(task=self.task.pk)['results']), 3)
+
+        stranger = User.objects.create_user(username='stranger@example.com', password='x')
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get(reverse('board-activity', args=[self.board.pk])).status_code, 403)
+
+    def test_compact_activity(self):
+        old = timezone.now() - timedelta(days=100)
+        ActivityEvent.objects.bulk_create([
+            ActivityEvent(board_id=self.board.pk, verb='task.updated', actor=self.user, created_at=old),
+            ActivityEvent(board_id=self.board.pk, verb='task.updated', actor=self.member, created_at=old),
+            ActivityEvent(board_id=self.board.pk, verb='comment.created', created_at=old),
+            ActivityEvent(board_id=self.board.pk, verb='task.updated'),
+            ActivityEvent(board_id=self.board.pk + 100, verb='task.updated', created_at=old),
+        ])
+        call_command('compact_activity', stdout=StringIO())
+        ActivityEvent.objects.create(board_id=self.board.pk, verb='task.deleted', created_at=old)
+        call_command('compact_activity', stdout=StringIO())
+
+        summary = ActivityEvent.objects.get(verb='summary')
+        self.assertEqual(summary.board_id, self.board.pk)
+        self.assertEqual(summary.data, {
+            'events': 4,
+            'verbs': {'task.updated': 2, 'comment.created': 1, 'task.deleted': 1},
+            'actors': {str(self.user.pk): 1, str(self.member.pk): 1},
+        })
+        self.assertEqual(ActivityEvent.objects.exclude(verb='summary').count(), 1)
+
+
+class ActivityWriterTests(TransactionTestCase):
+    """Changes commit during the request here, so the events go through the request buffer."""
+
+    def test_events_are_written_once_after_the_response(self):
+        user = User.objects.create_user(username='owner@example.com', password='secret')
+        board = Board.objects.create(title='Board', owner=user)
+        task = Task.objects.create(board=board, title='Task', created_by=user)
+        ActivityEvent.objects.all().delete()
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with mock.patch.object(ActivityEvent.objects, 'bulk_create', wraps=ActivityEvent.objects.bulk_create) as write:
+            response = client.patch(reverse('task-detail', args=[task.pk]), {'title': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        write.assert_called_once()
+        event = ActivityEvent.objects.get()
+        self.assertEqual((event.verb, event.actor_id), ('task.updated', user.pk))
+        self.assertEqual(event.data, {'changes': {'title': ['Task', 'Renamed']}})
+
+    def test_events_are_written_when_the_response_is_closed(self):
+        user = User.objects.create_user(username='owner@example.com', password='secret')
+        board = Board.objects.create(title='Board', owner=user)
+
+        def view(request):
+            Task.objects.create(board=board, title='Task', created_by=user)
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.user = user
+        response = activity.ActivityMiddleware(view)(request)
+        self.assertFalse(ActivityEvent.objects.exists())
+        response.close()
+        self.assertEqual(ActivityEvent.objects.get().actor_id, user.pk)
+
+    async def test_events_of_async_requests_are_written_when_the_response_is_closed(self):
+        user = await User.objects.acreate(username='owner@example.com')
+        board = await Board.objects.acreate(title='Board', owner=user)
+
+        async def view(request):
+            await sync_to_async(Task.objects.create)(board=board, title='Task', created_by=user)
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.user = user
+        response = await activity.ActivityMiddleware(view)(request)
+        self.assertFalse(await ActivityEvent.objects.aexists())
+        await sync_to_async(response.close)()
+        self.assertEqual((await ActivityEvent.objects.aget()).actor_id, user.pk)
+
+
+@override_settings(
+    DEBUG=True, KANMIND_READ_REPLICA='replica',
+    KANMIND_INSTRUMENTATION={'ENABLED': True, 'RAISE_ON_BUDGET': True},
+)
+class AsyncMiddlewareTests(KanmindTestCase):
+
+    def test_asgi_handler_runs_without_thread_adaptation(self):
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+
+    async def test_async_requests_are_measured(self):
+        token = await Token.objects.acreate(user=self.user)
+        with self.assertLogs('kanmind.performance', 'INFO') as logs:
+            response = await self.async_client.get(
+                reverse('task-list-create'), headers={'Authorization': f'Token {token.key}'}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Server-Timing', response)
+        self.assertGreater(json.loads(logs.records[0].getMessage())['queries'], 0)
+
+
+class JobTests(KanmindTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.member = User.objects.create_user(username='member@example.com', email='member@example.com', password='x')
+
+    def test_large_board_is_deleted_by_a_job(self):
+        board = self.create_board(members=[self.member], tasks=3)
+        Comment.objects.create(task=board.tasks.first(), author=self.user, content='Hi')
+        with self.settings(KANMIND_JOBS={'INLINE_DELETE_LIMIT': 2}):
+            response = self.client.delete(reverse('board-detail', args=[board.pk]))
+        self.assertEqual(response.status_code, 202)
+        job_url = response.json()['url']
+        self.assertEqual(response.json()['status'], 'queued')
+
+        # Hidden from everyone until the job has run.
+        self.assertEqual(self.client.get(reverse('board-list-create')).json(), [])
+        self.assertEqual(self.client.get(reverse('board-detail', args=[board.pk])).status_code, 404)
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(reverse('task-list-create')).json(), [])
+        self.assertEqual(self.client.get(job_url).status_code, 404)
+
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertFalse(Board.objects.filter(pk=board.pk).exists())
+        self.assertFalse(Task.objects.exists())
+        self.client.force_authenticate(self.user)
+        job = self.client.get(job_url).json()
+        self.assertEqual((job['status'], job['attempts']), ('done', 1))
+
+    def test_small_board_is_deleted_right_away(self):
+        board = self.create_board(tasks=2)
+        response = self.client.delete(reverse('board-detail', args=[board.pk]))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Board.objects.filter(pk=board.pk).exists())
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_jobs_are_retried(self):
+        flaky = mock.Mock(side_effect=[RuntimeError('Try again'), {'ok': True}])
+        with mock.patch.dict(jobs._registry, {'flaky': flaky}), self.assertLogs('kanmind.jobs', 'ERROR'):
+            job = jobs.enqueue('flaky', value=1)
+            self.assertEqual(jobs.run_pending(), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.error), ('queued', 'RuntimeError: Try again'))
+            self.assertGreater(job.run_after, timezone.now())
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result), ('done', 2, {'ok': True}))
+        flaky.assert_called_with(value=1)
+
+    def test_lost_jobs_are_queued_again(self):
+        job = jobs.enqueue('index_tasks', task_ids=[])
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.Status.RUNNING, attempts=1, started_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 2))
+
+    def test_eager_jobs_run_on_commit(self):
+        with self.settings(KANMIND_JOBS={'EAGER': True}), self.captureOnCommitCallbacks(execute=True):
+            job = jobs.enqueue('index_tasks', task_ids=[])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+
+
+@override_settings(KANMIND_JOBS={'EAGER': True})
+class EagerJobTests(TransactionTestCase):
+    """Changes commit during the request here, so eager jobs are held back by the middleware."""
+
+    def test_jobs_of_a_request_run_when_the_response_is_closed(self):
+        user = User.objects.create_user(username='owner@example.com', password='secret')
+        board = Board.objects.create(title='Board', owner=user)
+
+        def view(request):
+            with transaction.atomic():
+                jobs.enqueue('delete_board', board_id=board.pk)
+            return HttpResponse()
+
+        response = jobs.EagerJobsMiddleware(view)(RequestFactory().delete('/'))
+        self.assertEqual(Job.objects.get().status, 'queued')
+        self.assertTrue(Board.objects.filter(pk=board.pk).exists())
+        response.close()
+        self.assertEqual(Job.objects.get().status, 'done')
+        self.assertFalse(Board.objects.filter(pk=board.pk).exists())
+
+    def test_large_board_is_deleted_after_the_response(self):
+        user = User.objects.create_user(username='owner@example.com', password='secret')
+        board = Board.objects.create(title='Board', owner=user)
+        Task.objects.bulk_create(Task(board=board, title=f'Task {i}', created_by=user) for i in range(3))
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with self.settings(KANMIND_JOBS={'EAGER': True, 'INLINE_DELETE_LIMIT': 2}):
+            response = client.delete(reverse('board-detail', args=[board.pk]))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], 'queued')
+        self.assertFalse(Board.objects.filter(pk=board.pk).exists())
+        self.assertEqual(client.get(response.json()['url']).json()['status'], 'done')
+
+
+@override_settings(KANMIND_JOBS={'EAGER': False})
+class JobWorkerTests(TransactionTestCase):
+
+    def test_run_jobs_once(self):
+        user = User.objects.create_user(username='owner@example.com', password='secret')
+        boards = [Board.objects.create(title=f'Board {i}', owner=user) for i in range(3)]
+        for board in boards:
+            jobs.enqueue('delete_board', board_id=board.pk)
+        output = StringIO()
+        call_command('run_jobs', '--once', '--threads', '1', stdout=output)
+        self.assertIn('Ran 3 job(s)', output.getvalue())
+        self.assertFalse(Board.objects.exists())
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {'done'})
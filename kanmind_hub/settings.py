@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'kanmind_app.instrumentation.PerformanceMiddleware',
+    'kanmind_app.replicas.ReadReplicaMiddleware',
+    'kanmind_app.activity.ActivityMiddleware',
+    'kanmind_app.jobs.EagerJobsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -83,10 +88,76 @@ WSGI_APPLICATION = 'kanmind_hub.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+#
+# Configured with environment variables. By default SQLite in db.sqlite3,
+# tuned for concurrent requests. KANMIND_DB_ENGINE selects a server database
+# instead (e.g. django.db.backends.postgresql), with KANMIND_DB_NAME, _USER,
+# _PASSWORD, _HOST and _PORT. KANMIND_DB_REPLICA adds a read replica, see
+# kanmind_app.replicas: for SQLite the path of a second database file, for a
+# server database the host of the replica.
+
+db_engine = os.environ.get('KANMIND_DB_ENGINE', 'django.db.backends.sqlite3')
+db_replica = os.environ.get('KANMIND_DB_REPLICA')
+
+if db_engine == 'django.db.backends.sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': db_engine,
+            'NAME': os.environ.get('KANMIND_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Seconds to wait for the write lock (busy_timeout) before
+                # failing with "database is locked".
+                'timeout': 20,
+                # Take the write lock when a transaction starts. A transaction
+                # that reads first cannot wait for it later and fails at once.
+                'transaction_mode': 'IMMEDIATE',
+                # With WAL, reads don't wait for writes. synchronous=NORMAL is
+                # safe with WAL and only syncs at checkpoints.
+                'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA mmap_size=268435456',
+            },
+        }
+    }
+    if db_replica:
+        # Refreshed from the primary with 'manage.py refresh_sqlite_replica'.
+        DATABASES['replica'] = {
+            'ENGINE': db_engine,
+            'NAME': db_replica,
+            'OPTIONS': {'init_command': 'PRAGMA query_only=ON; PRAGMA mmap_size=268435456'},
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': db_engine,
+            'NAME': os.environ.get('KANMIND_DB_NAME', 'kanmind'),
+            'USER': os.environ.get('KANMIND_DB_USER', ''),
+            'PASSWORD': os.environ.get('KANMIND_DB_PASSWORD', ''),
+            'HOST': os.environ.get('KANMIND_DB_HOST', ''),
+            'PORT': os.environ.get('KANMIND_DB_PORT', ''),
+            # Keep connections open across requests, checked before reuse.
+            'CONN_MAX_AGE': int(os.environ.get('KANMIND_DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+    if os.environ.get('KANMIND_DB_POOL') == 'true':
+        # PostgreSQL with psycopg 3 only. The pool replaces persistent connections.
+        DATABASES['default'].update(CONN_MAX_AGE=0, OPTIONS={'pool': True})
+    if db_replica:
+        DATABASES['replica'] = {**DATABASES['default'], 'HOST': db_replica, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['kanmind_app.replicas.ReadReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The local-memory cache is per process. Deployments with several worker
+# processes should use a shared backend (e.g. Redis or Memcached), otherwise
+# cached access data is only invalidated in the process that made the change.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'kanmind',
     }
 }
 
@@ -139,6 +210,90 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'user_auth_app.api.authentication.CachedTokenAuthentication',
     ],
-}
\ No newline at end of file
+
+    # Keyset pagination, used when a client sends 'page_size' or 'cursor'.
+    'DEFAULT_PAGINATION_CLASS': 'kanmind_app.api.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 50,
+}
+
+# Kanmind
+
+# Seconds to cache board access checks across requests. None only memoizes
+# them per request. Only used with a shared cache, see below.
+KANMIND_BOARD_ACCESS_CACHE_TIMEOUT = None
+
+# Whether the default cache is shared by all processes (e.g. Redis or
+# Memcached). None guesses from the backend: LocMemCache is not. Cached
+# access data and the response cache are only used with a shared cache, see
+# kanmind_app.access. Set it to True when running a single process.
+KANMIND_SHARED_CACHE = None
+
+# Seconds to cache the ids of the boards each user can access. Only used
+# with a shared cache, see above.
+KANMIND_ACCESSIBLE_BOARDS_CACHE_TIMEOUT = 300
+
+# Cache of rendered board detail responses, see kanmind_app.response_cache.
+# Only used with a shared cache (KANMIND_SHARED_CACHE). Set to None to
+# disable it. 'timeout' is in seconds.
+KANMIND_RESPONSE_CACHE = {
+    'BACKEND': 'kanmind_app.response_cache.LRUMemoryBackend',
+    'OPTIONS': {'max_bytes': 32 * 1024 * 1024, 'timeout': 300},
+}
+
+# In-process cache of token lookups used by CachedTokenAuthentication.
+# TIMEOUT (seconds) bounds how long other processes may accept a revoked token.
+KANMIND_TOKEN_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TIMEOUT': 60,
+}
+
+# Publish/subscribe hub of the board change feed, see kanmind_app.feed.
+# The in-memory hub only reaches clients connected to the same process.
+KANMIND_CHANGE_FEED_HUB = 'kanmind_app.feed.InMemoryHub'
+
+# Delta sync, see kanmind_app.sync. Changes are read from this many seconds
+# before the sync token, to cover transactions still open at the last sync.
+KANMIND_SYNC_OVERLAP = 5
+
+# Days a sync token stays valid. Tombstones older than this can be removed
+# with 'manage.py prune_tombstones'.
+KANMIND_SYNC_TOMBSTONE_RETENTION = 30
+
+# Full-text search backend, see kanmind_app.search. SQLiteFTSBackend needs
+# SQLite with FTS5 (its table is only created there), so server databases use
+# DatabaseBackend.
+KANMIND_SEARCH_BACKEND = (
+    'kanmind_app.search.SQLiteFTSBackend'
+    if db_engine == 'django.db.backends.sqlite3'
+    else 'kanmind_app.search.DatabaseBackend'
+)
+
+# Per-request query counts and timings, see kanmind_app.instrumentation.
+# Disabled, the middleware removes itself at startup.
+KANMIND_INSTRUMENTATION = {
+    'ENABLED': False,
+    'SERVER_TIMING': True,
+    'LOG': True,
+    'QUERY_BUDGETS': {},
+    'RAISE_ON_BUDGET': False,
+}
+
+# Database alias that read-only views read from, see kanmind_app.replicas.
+# None reads everything from the default database.
+KANMIND_READ_REPLICA = 'replica' if db_replica else None
+
+# Days the activity log keeps every event. 'manage.py compact_activity' rolls
+# older events up into one summary per board and day.
+KANMIND_ACTIVITY_RETENTION = 90
+
+# Background jobs run by 'manage.py run_jobs', see kanmind_app.jobs for all
+# options. EAGER runs them in the web process once the response of the request
+# that enqueued them has been sent. That is the default, so nothing waits for a worker that does not
+# run; set KANMIND_JOBS_WORKER=true when 'run_jobs' runs next to the server.
+KANMIND_JOBS = {
+    'EAGER': os.environ.get('KANMIND_JOBS_WORKER') != 'true',
+    'MAX_ATTEMPTS': 3,
+    'INLINE_DELETE_LIMIT': 200,
+}
@@ -0,0 +1,84 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """
+    Bounded in-process cache of token key -> (user, token) with a time to live.
+    The least recently used entry is dropped when the cache is full.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @property
+    def config(self):
+        return getattr(settings, 'KANMIND_TOKEN_CACHE', {})
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[2] < time.monotonic():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def set(self, key, user, token):
+        max_entries = self.config.get('MAX_ENTRIES', 10000)
+        expires_at = time.monotonic() + self.config.get('TIMEOUT', 60)
+        with self.lock:
+            self.entries[key] = (user, token, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate_key(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        with self.lock:
+            for key in [key for key, entry in self.entries.items() if entry[0].pk == user_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for TokenAuthentication that keeps recent token
+    lookups in an in-process LRU cache, so authenticated requests cost no
+    query on a cache hit.
+
+    Entries are dropped by the signal handlers in user_auth_app.signals when
+    a token is deleted or regenerated or its user is changed or deactivated.
+    Other worker processes only notice such changes once their entry
+    expires, which is why the time to live (KANMIND_TOKEN_CACHE['TIMEOUT'])
+    is kept short.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            user, token = cached
+            # Each request gets its own copy, so changes to request.user do not leak.
+            return copy.copy(user), token
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, copy.copy(user), token)
+        return user, token
@@ -49,16 +49,14 @@ class RegistrationSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
+        fullname = validated_data.get('fullname', '').split()
         account = User.objects.create_user(
             email=validated_data['email'],
             username=validated_data['email'],
-            password=validated_data['password']
+            password=validated_data['password'],
+            first_name=fullname[0] if fullname else '',
+            last_name=' '.join(fullname[1:]) if len(fullname) > 1 else '',
         )
-
-        fullname = validated_data.get('fullname', '').split()
-        account.first_name = fullname[0] if fullname else ''
-        account.last_name = ' '.join(fullname[1:]) if len(fullname) > 1 else ''
-        account.save()
         
         UserProfile.objects.create(
             user=account,
@@ -13,6 +13,8 @@ User = get_user_model()
 class UserProfileList(generics.ListCreateAPIView):
     queryset = UserProfile.objects.all()
     serializer_class = UserProfileSerializer
+    # Profiles have no creation timestamp, so pages are keyed on the id only.
+    cursor_ordering = ('id',)
 
 class UserProfileDetail(generics.RetrieveUpdateDestroyAPIView):
     queryset = UserProfile.objects.all()
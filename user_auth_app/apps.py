@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class UserAuthAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user_auth_app'
+
+    def ready(self):
+        # Registers the signal handlers that invalidate cached tokens.
+        from . import signals  # noqa: F401
@@ -0,0 +1,50 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from user_auth_app.api.authentication import CachedTokenAuthentication, token_cache
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compares queries and time per authenticated request of TokenAuthentication and CachedTokenAuthentication.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # The benchmark user and token are rolled back at the end.
+        with transaction.atomic():
+            user = User.objects.create_user(username='benchmark-token-auth', password=None)
+            token = Token.objects.create(user=user)
+            request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {token.key}')
+
+            token_cache.clear()
+            results = {
+                'iterations': options['iterations'],
+                'TokenAuthentication': self.measure(TokenAuthentication(), request, options['iterations']),
+                'CachedTokenAuthentication': self.measure(CachedTokenAuthentication(), request, options['iterations']),
+            }
+            transaction.set_rollback(True)
+
+        token_cache.clear()
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def measure(self, authenticator, request, iterations):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                authenticator.authenticate(request)
+            elapsed = time.perf_counter() - start
+        return {
+            'queries_per_request': round(len(queries) / iterations, 3),
+            'mean_us': round(elapsed * 1_000_000 / iterations, 1),
+        }
@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .api.authentication import token_cache
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+@receiver(post_save, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    """A deleted or regenerated token must not authenticate from the cache anymore."""
+    token_cache.invalidate_key(instance.key)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drops the cached tokens of a changed, deactivated or deleted user."""
+    token_cache.invalidate_user(instance.pk)
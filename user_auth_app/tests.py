@@ -1,3 +1,44 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .api.authentication import token_cache
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username='user@example.com', email='user@example.com', password='secret')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('email-check') + '?email=user@example.com'
+
+    def test_cache_hit_needs_no_authentication_query(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        # Only the user and profile lookups of the view itself.
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(self.url)
+        self.token.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_cache_is_bounded(self):
+        with self.settings(KANMIND_TOKEN_CACHE={'MAX_ENTRIES': 1, 'TIMEOUT': 60}):
+            other = User.objects.create_user(username='other@example.com', password='secret')
+            other_token = Token.objects.create(user=other)
+            self.client.get(self.url)
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {other_token.key}')
+            self.client.get(self.url)
+        self.assertEqual(list(token_cache.entries), [other_token.key])